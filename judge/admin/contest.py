@@ -11,6 +11,7 @@ from django.shortcuts import get_object_or_404
 from django.urls import path, reverse, reverse_lazy
 from django.utils import timezone
 from django.utils.html import format_html
+from django.utils.translation import gettext
 from django.utils.translation import gettext_lazy as _
 from django.utils.translation import ngettext
 from grappelli.forms import GrappelliSortableHiddenMixin
@@ -20,7 +21,8 @@ from django_ace import AceWidget
 from judge.models import (Contest, ContestProblem, ContestSubmission, Problem,
                           Profile, Rating, SampleContest, Submission)
 from judge.models.contest import ContestLevel, SampleContestProblem
-from judge.tasks import rate_contest
+from judge.tasks import rate_contest, recompute_participations, rejudge_submissions
+from judge.utils.celery import redirect_to_task_status
 from judge.utils.views import NoBatchDeleteMixin
 from judge.widgets import (AdminHeavySelect2MultipleWidget,
                            AdminHeavySelect2Widget, AdminMartorWidget)
@@ -352,14 +354,11 @@ class ContestAdmin(NoBatchDeleteMixin, VersionAdmin):
         return response
 
     def rejudge_view(self, request, contest_id, problem_id):
-        queryset = ContestSubmission.objects.filter(problem_id=problem_id).select_related('submission')
-        for model in queryset:
-            model.submission.judge(rejudge=True)
-
-        self.message_user(request, ngettext('%d submission was successfully scheduled for rejudging.',
-                                            '%d submissions were successfully scheduled for rejudging.',
-                                            len(queryset)) % len(queryset))
-        return HttpResponseRedirect(reverse('admin:judge_contest_change', args=(contest_id,)))
+        submission_ids = list(ContestSubmission.objects.filter(problem_id=problem_id)
+                              .values_list('submission_id', flat=True))
+        status = rejudge_submissions.delay(submission_ids)
+        return redirect_to_task_status(status, message=gettext('Rejudging contest problem submissions...'),
+                                       redirect=reverse('admin:judge_contest_change', args=(contest_id,)))
 
     def rate_all_view(self, request):
         if not request.user.has_perm('judge.contest_rating'):
@@ -582,13 +581,9 @@ class ContestParticipationAdmin(admin.ModelAdmin):
             obj.set_disqualified(obj.is_disqualified)
 
     def recalculate_results(self, request, queryset):
-        count = 0
-        for participation in queryset:
-            participation.recompute_results()
-            count += 1
-        self.message_user(request, ngettext('%d participation recalculated.',
-                                            '%d participations recalculated.',
-                                            count) % count)
+        status = recompute_participations.delay(list(queryset.values_list('id', flat=True)))
+        return redirect_to_task_status(status, message=gettext('Recalculating participation results...'),
+                                       redirect=request.get_full_path())
     recalculate_results.short_description = _('Recalculate results')
 
     def username(self, obj):
@@ -3,7 +3,6 @@ from operator import itemgetter
 
 from django.conf import settings
 from django.contrib import admin, messages
-from django.core.cache import cache
 from django.core.exceptions import PermissionDenied
 from django.db.models import Q
 from django.http import HttpResponseRedirect
@@ -12,12 +11,14 @@ from django.urls import path
 from django.utils.html import format_html
 from django.utils.translation import gettext
 from django.utils.translation import gettext_lazy as _
-from django.utils.translation import ngettext, pgettext
+from django.utils.translation import pgettext
 
 from django_ace import AceWidget
 from judge.models import (ContestParticipation, ContestProblem,
-                          ContestSubmission, Profile, Submission,
-                          SubmissionSource, SubmissionTestCase)
+                          ContestSubmission, Submission, SubmissionSource,
+                          SubmissionTestCase)
+from judge.tasks import rejudge_submissions, rescore_submissions
+from judge.utils.celery import redirect_to_task_status
 from judge.utils.raw_sql import use_straight_join
 
 
@@ -188,12 +189,9 @@ class SubmissionAdmin(admin.ModelAdmin):
         if not request.user.has_perm('judge.edit_all_problem'):
             id = request.profile.id
             queryset = queryset.filter(Q(problem__authors__id=id) | Q(problem__curators__id=id))
-        judged = len(queryset)
-        for model in queryset:
-            model.judge(rejudge=True, batch_rejudge=True)
-        self.message_user(request, ngettext('%d submission was successfully scheduled for rejudging.',
-                                            '%d submissions were successfully scheduled for rejudging.',
-                                            judged) % judged)
+        status = rejudge_submissions.delay(list(queryset.values_list('id', flat=True).distinct()))
+        return redirect_to_task_status(status, message=gettext('Rejudging selected submissions...'),
+                                       redirect=request.get_full_path())
     judge.short_description = _('Rejudge the selected submissions')
 
     def recalculate_score(self, request, queryset):
@@ -201,28 +199,9 @@ class SubmissionAdmin(admin.ModelAdmin):
             self.message_user(request, gettext('You do not have the permission to rejudge submissions.'),
                               level=messages.ERROR)
             return
-        submissions = list(queryset.defer(None).select_related(None).select_related('problem')
-                           .only('points', 'case_points', 'case_total', 'problem__partial', 'problem__points'))
-        for submission in submissions:
-            submission.points = round(submission.case_points / submission.case_total * submission.problem.points
-                                      if submission.case_total else 0, 1)
-            if not submission.problem.partial and submission.points < submission.problem.points:
-                submission.points = 0
-            submission.save()
-            submission.update_contest()
-
-        for profile in Profile.objects.filter(id__in=queryset.values_list('user_id', flat=True).distinct()):
-            profile.calculate_points()
-            cache.delete('user_complete:%d' % profile.id)
-            cache.delete('user_attempted:%d' % profile.id)
-
-        for participation in ContestParticipation.objects.filter(
-                id__in=queryset.values_list('contest__participation_id')).prefetch_related('contest'):
-            participation.recompute_results()
-
-        self.message_user(request, ngettext('%d submission were successfully rescored.',
-                                            '%d submissions were successfully rescored.',
-                                            len(submissions)) % len(submissions))
+        status = rescore_submissions.delay(list(queryset.values_list('id', flat=True)))
+        return redirect_to_task_status(status, message=gettext('Rescoring selected submissions...'),
+                                       redirect=request.get_full_path())
     recalculate_score.short_description = _('Rescore the selected submissions')
 
     def problem_code(self, obj):
@@ -20,6 +20,11 @@ class JudgeAppConfig(AppConfig):
 
         from . import jinja2, signals  # noqa: F401, imported for side effects
 
+        from django.conf import settings
+
+        from judge.utils.queue_logging import enable_queue_logging
+        enable_queue_logging(settings.DMOJ_QUEUED_LOGGERS, **settings.DMOJ_LOG_QUEUE_OPTIONS)
+
         # Change timezone from Asia/SaiGon to Asia/Ho_Chi_Minh
         # from judge.models import Profile
         # Profile.objects.filter(timezone='Asia/SaiGon').update(timezone='Asia/Ho_Chi_Minh')
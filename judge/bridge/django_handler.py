@@ -14,6 +14,7 @@ class DjangoHandler(ZlibPacketHandler):
 
         self.handlers = {
             'submission-request': self.on_submission,
+            'batch-submission-request': self.on_batch_submission,
             'terminate-submission': self.on_termination,
             'disconnect-judge': self.on_disconnect_request,
         }
@@ -44,6 +45,19 @@ class DjangoHandler(ZlibPacketHandler):
         self.judges.judge(id, problem, language, source, judge_id, priority)
         return {'name': 'submission-received', 'submission-id': id}
 
+    def on_batch_submission(self, data):
+        judge_id = data['judge-id']
+        priority = data['priority']
+        if not self.judges.check_priority(priority):
+            return {'name': 'bad-request'}
+        ids = []
+        for submission in data['submissions']:
+            id = submission['submission-id']
+            self.judges.judge(id, submission['problem-id'], submission['language'], submission['source'],
+                              judge_id, priority)
+            ids.append(id)
+        return {'name': 'batch-submission-received', 'submission-ids': ids}
+
     def on_termination(self, data):
         return {'name': 'submission-received', 'judge-aborted': self.judges.abort(data['submission-id'])}
 
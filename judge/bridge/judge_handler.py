@@ -11,6 +11,7 @@ from time import time as time_func
 from asgiref.sync import async_to_sync
 from channels.layers import get_channel_layer
 from django import db
+from django.db import transaction
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.core.validators import URLValidator
@@ -19,7 +20,8 @@ from django.utils import timezone
 from judge.bridge.base_handler import ZlibPacketHandler, proxy_list
 from judge.caching import finished_submission
 from judge.models import (Judge, Language, LanguageLimit, Problem,
-                          RuntimeVersion, Submission, SubmissionTestCase)
+                          RuntimeVersion, Submission, SubmissionResultCount,
+                          SubmissionTestCase)
 
 logger = logging.getLogger('judge.bridge')
 json_log = logging.getLogger('judge.json.bridge')
@@ -36,6 +38,14 @@ SubmissionData = namedtuple(
 channel_layer = get_channel_layer()
 
 
+class JsonLogMessage:
+    def __init__(self, data):
+        self.data = data
+
+    def __str__(self):
+        return json.dumps(self.data)
+
+
 def send_detailsubmission_update(secret, message):
     async_to_sync(channel_layer.group_send)(
         'async_sub_%s' % secret,
@@ -132,7 +142,8 @@ class JudgeHandler(ZlibPacketHandler):
 
         json_log.info(self._make_json_log(action='disconnect', info='judge disconnected'))
         if self._working:
-            Submission.objects.filter(id=self._working).update(status='IE', result='IE', error='')
+            SubmissionResultCount.update_submissions(Submission.objects.filter(id=self._working),
+                                                     status='IE', result='IE', error='')
             json_log.error(self._make_json_log(sub=self._working, action='close', info='IE due to shutdown on grading'))
 
     def _authenticate(self, id, key):
@@ -322,8 +333,10 @@ class JudgeHandler(ZlibPacketHandler):
 
     def on_submission_wrong_acknowledge(self, packet, expected, got):
         json_log.error(self._make_json_log(packet, action='processing', info='wrong-acknowledge', expected=expected))
-        Submission.objects.filter(id=expected).update(status='IE', result='IE', error=None)
-        Submission.objects.filter(id=got, status='QU').update(status='IE', result='IE', error=None)
+        SubmissionResultCount.update_submissions(Submission.objects.filter(id=expected),
+                                                 status='IE', result='IE', error=None)
+        SubmissionResultCount.update_submissions(Submission.objects.filter(id=got, status='QU'),
+                                                 status='IE', result='IE', error=None)
 
     def on_submission_acknowledged(self, packet):
         if not packet.get('submission-id', None) == self._working:
@@ -454,7 +467,17 @@ class JudgeHandler(ZlibPacketHandler):
         submission.memory = memory
         submission.points = sub_points
         submission.result = status_codes[status]
-        submission.save()
+        with transaction.atomic():
+            # The stored result is read under a row lock, in case a rejudge reset it since the submission was loaded.
+            old_result = Submission.objects.select_for_update().filter(id=submission.id) \
+                .values_list('result', flat=True).first()
+            submission.save()
+
+            if old_result != submission.result:
+                SubmissionResultCount.add(submission.problem_id, submission.contest_object_id,
+                                          submission.language_id, old_result, -1)
+                SubmissionResultCount.add(submission.problem_id, submission.contest_object_id,
+                                          submission.language_id, submission.result)
 
         json_log.info(self._make_json_log(
             packet, action='grading-end', time=time, memory=memory,
@@ -492,7 +515,8 @@ class JudgeHandler(ZlibPacketHandler):
         logger.info('%s: Submission failed to compile: %s', self.name, packet['submission-id'])
         self._free_self(packet)
 
-        if Submission.objects.filter(id=packet['submission-id']).update(status='CE', result='CE', error=packet['log']):
+        if SubmissionResultCount.update_submissions(Submission.objects.filter(id=packet['submission-id']),
+                                                    status='CE', result='CE', error=packet['log']):
             socket_messages_logger.info('Submission %s failed to compile', packet['submission-id'])
             send_detailsubmission_update(Submission.get_id_secret(packet['submission-id']), {
                 'type': 'compile.error',
@@ -531,7 +555,8 @@ class JudgeHandler(ZlibPacketHandler):
         self._free_self(packet)
 
         id = packet['submission-id']
-        if Submission.objects.filter(id=id).update(status='IE', result='IE', error=packet['message']):
+        if SubmissionResultCount.update_submissions(Submission.objects.filter(id=id),
+                                                    status='IE', result='IE', error=packet['message']):
             socket_messages_logger.info('Submission %s failed with internal error', id)
             send_detailsubmission_update(Submission.get_id_secret(id), {
                 'type': 'internal.error',
@@ -549,7 +574,8 @@ class JudgeHandler(ZlibPacketHandler):
         logger.info('%s: Submission aborted: %s', self.name, packet['submission-id'])
         self._free_self(packet)
 
-        if Submission.objects.filter(id=packet['submission-id']).update(status='AB', result='AB', points=0):
+        if SubmissionResultCount.update_submissions(Submission.objects.filter(id=packet['submission-id']),
+                                                    status='AB', result='AB', points=0):
             socket_messages_logger.info('Submission %s aborted', packet['submission-id'])
             send_detailsubmission_update(Submission.get_id_secret(packet['submission-id']), {
                 'type': 'aborted.submission',
@@ -680,6 +706,7 @@ class JudgeHandler(ZlibPacketHandler):
             raise
 
     def _make_json_log(self, packet=None, sub=None, **kwargs):
+        # Encoded to JSON only when formatted, which a queued logger does off the packet handling thread.
         data = {
             'judge': self.name,
             'address': self.judge_address,
@@ -689,7 +716,7 @@ class JudgeHandler(ZlibPacketHandler):
         if sub is not None:
             data['submission'] = sub
         data.update(kwargs)
-        return json.dumps(data)
+        return JsonLogMessage(data)
 
     def _post_update_submission(self, id, state, done=False):
         if self._submission_cache_id == id:
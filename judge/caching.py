@@ -1,4 +1,44 @@
+import hashlib
+
 from django.core.cache import cache
+from django.utils.crypto import get_random_string
+
+
+def submission_count_version_keys(sub):
+    keys = ['sub_count_version:problem:%d' % sub.problem_id, 'sub_count_version:user:%d' % sub.user_id]
+    if sub.contest_object_id is not None:
+        keys.append('sub_count_version:contest:%d' % sub.contest_object_id)
+    return keys
+
+
+def _key_parts(filters, args):
+    parts = ['%s=%s' % item for item in sorted(filters.items())]
+    parts += [','.join(sorted(arg)) if isinstance(arg, (set, frozenset)) else str(arg) for arg in args]
+    return parts
+
+
+def submission_count_key(filters, *args):
+    # Counts are cached under a version that is dropped whenever a submission in the narrowest of the filtered
+    # scopes is created, deleted or finishes grading, so stale counts are simply never looked up again.
+    for scope in ('problem', 'user', 'contest'):
+        if filters.get(scope) is not None:
+            break
+    else:
+        return None
+
+    version = cache.get_or_set('sub_count_version:%s:%d' % (scope, filters[scope]),
+                               lambda: get_random_string(8), None)
+    parts = [version] + _key_parts(filters, args)
+    return 'sub_count:%s:%d:%s' % (scope, filters[scope], hashlib.sha1(':'.join(parts).encode()).hexdigest())
+
+
+def submission_results_key(filters, *args):
+    # Result histograms of a list are cached like its count. Lists not narrowed to a problem, user or contest have
+    # no version to follow, and are only left to expire.
+    key = submission_count_key(filters, 'results', *args)
+    if key is None:
+        key = 'sub_results:%s' % hashlib.sha1(':'.join(_key_parts(filters, args)).encode()).hexdigest()
+    return key
 
 
 def finished_submission(sub):
@@ -7,4 +47,5 @@ def finished_submission(sub):
         participation = sub.contest.participation
         keys += ['contest_complete:%d' % participation.id]
         keys += ['contest_attempted:%d' % participation.id]
+    keys += submission_count_version_keys(sub)
     cache.delete_many(keys)
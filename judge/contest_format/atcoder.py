@@ -41,7 +41,7 @@ class AtCoderContestFormat(DefaultContestFormat):
         self.config.update(config or {})
         self.contest = contest
 
-    def update_participation(self, participation):
+    def update_participation(self, participation, commit=True):
         cumtime = 0
         penalty = 0
         points = 0
@@ -90,7 +90,8 @@ class AtCoderContestFormat(DefaultContestFormat):
         participation.score = round(points, self.contest.points_precision)
         participation.tiebreaker = 0
         participation.format_data = format_data
-        participation.save()
+        if commit:
+            participation.save()
 
     def display_user_problem(self, participation, contest_problem):
         format_data = (participation.format_data or {}).get(str(contest_problem.id))
@@ -38,12 +38,13 @@ class BaseContestFormat(six.with_metaclass(ABCMeta)):
         raise NotImplementedError()
 
     @abstractmethod
-    def update_participation(self, participation):
+    def update_participation(self, participation, commit=True):
         """
-        Updates a ContestParticipation object's score, cumtime, and format_data fields based on this contest format.
-        Implementations should call ContestParticipation.save().
+        Updates a ContestParticipation object's score, cumtime, tiebreaker and format_data fields based on this
+        contest format. Implementations should call ContestParticipation.save() unless commit is False.
 
         :param participation: A ContestParticipation object.
+        :param commit: Whether to save the participation, rather than leaving it to the caller to save in bulk.
         :return: None
         """
         raise NotImplementedError()
@@ -24,7 +24,7 @@ class DefaultContestFormat(BaseContestFormat):
     def __init__(self, contest, config):
         super(DefaultContestFormat, self).__init__(contest, config)
 
-    def update_participation(self, participation):
+    def update_participation(self, participation, commit=True):
         cumtime = 0
         points = 0
         format_data = {}
@@ -42,7 +42,8 @@ class DefaultContestFormat(BaseContestFormat):
         participation.score = round(points, self.contest.points_precision)
         participation.tiebreaker = 0
         participation.format_data = format_data
-        participation.save()
+        if commit:
+            participation.save()
 
     def display_user_problem(self, participation, contest_problem):
         format_data = (participation.format_data or {}).get(str(contest_problem.id))
@@ -9,7 +9,7 @@ from judge.contest_format.registry import register_contest_format
 class DefaultLimitContestFormat(DefaultContestFormat):
     name = gettext_lazy('Default Limit')
 
-    def update_participation(self, participation):
+    def update_participation(self, participation, commit=True):
         cumtime = 0
         points = 0
         format_data = {}
@@ -38,4 +38,5 @@ class DefaultLimitContestFormat(DefaultContestFormat):
         participation.score = round(points, self.contest.points_precision)
         participation.tiebreaker = 0
         participation.format_data = format_data
-        participation.save()
+        if commit:
+            participation.save()
@@ -46,7 +46,7 @@ class ECOOContestFormat(DefaultContestFormat):
         self.config.update(config or {})
         self.contest = contest
 
-    def update_participation(self, participation):
+    def update_participation(self, participation, commit=True):
         cumtime = 0
         score = 0
         format_data = {}
@@ -96,7 +96,8 @@ class ECOOContestFormat(DefaultContestFormat):
         participation.score = round(score, self.contest.points_precision)
         participation.tiebreaker = 0
         participation.format_data = format_data
-        participation.save()
+        if commit:
+            participation.save()
 
     def display_user_problem(self, participation, contest_problem):
         format_data = (participation.format_data or {}).get(str(contest_problem.id))
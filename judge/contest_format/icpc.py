@@ -41,7 +41,7 @@ class ICPCContestFormat(DefaultContestFormat):
         self.config.update(config or {})
         self.contest = contest
 
-    def update_participation(self, participation):
+    def update_participation(self, participation, commit=True):
         cumtime = 0
         last = 0
         penalty = 0
@@ -92,7 +92,8 @@ class ICPCContestFormat(DefaultContestFormat):
         participation.score = round(score, self.contest.points_precision)
         participation.tiebreaker = last  # field is sorted from least to greatest
         participation.format_data = format_data
-        participation.save()
+        if commit:
+            participation.save()
 
     def display_user_problem(self, participation, contest_problem):
         format_data = (participation.format_data or {}).get(str(contest_problem.id))
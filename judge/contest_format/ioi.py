@@ -14,7 +14,7 @@ class IOIContestFormat(LegacyIOIContestFormat):
         cumtime: Specify True if time penalties are to be computed. Defaults to False.
     '''
 
-    def update_participation(self, participation):
+    def update_participation(self, participation, commit=True):
         cumtime = 0
         score = 0
         format_data = {}
@@ -90,4 +90,5 @@ class IOIContestFormat(LegacyIOIContestFormat):
         participation.score = round(score, self.contest.points_precision)
         participation.tiebreaker = 0
         participation.format_data = format_data
-        participation.save()
+        if commit:
+            participation.save()
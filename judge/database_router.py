@@ -1,20 +1,83 @@
+import random
+from contextlib import ContextDecorator
+
+from asgiref.local import Local
+from django.conf import settings
+from django.db import connections
+
+_state = Local()
+
+
+def reads_from_primary():
+    # Only requests that ReplicaPinningMiddleware has cleared may read from a replica. Everything else, such as
+    # Celery tasks, the bridge and management commands, stays on the primary.
+    return getattr(_state, 'pinned', True)
+
+
+def pin_to_primary():
+    """Send the remaining reads of this request to the primary."""
+    _state.pinned = True
+
+
+def start_request(pinned):
+    _state.pinned = pinned
+    _state.wrote = False
+
+
+def finish_request():
+    # Returns whether the request wrote to the database.
+    wrote = getattr(_state, 'wrote', False)
+    _state.pinned = True
+    _state.wrote = False
+    return wrote
+
+
+class use_primary(ContextDecorator):
+    """Read from the primary inside the block, or for the whole of a decorated view."""
+
+    def __enter__(self):
+        self.pinned = reads_from_primary()
+        pin_to_primary()
+
+    def __exit__(self, *exc):
+        # A write inside the block keeps the rest of the request on the primary.
+        if not getattr(_state, 'wrote', False):
+            _state.pinned = self.pinned
+
+
+class untracked_writes(ContextDecorator):
+    """Writes inside the block, such as access bookkeeping, do not pin the client to the primary afterwards."""
+
+    def __enter__(self):
+        self.wrote = getattr(_state, 'wrote', False)
+
+    def __exit__(self, *exc):
+        _state.wrote = self.wrote
+
+
 class MasterSlaveRouter:
     """
     Database router that directs:
     - All writes (INSERT, UPDATE, DELETE) to Master.
-    - All reads (SELECT) to Slave.
+    - Reads to one of DATABASE_READ_REPLICAS, unless the request has written to the database, pinned itself to the
+      primary or is inside a transaction, in which case they go to Master as well.
     """
 
     TABLES_READ_FROM_MASTER = ['judge_judge', 'judge_submissiontestcase']
 
     def db_for_read(self, model, **hints):
         """Chỉ đọc từ Slave"""
-        if model._meta.db_table in self.TABLES_READ_FROM_MASTER:
+        replicas = settings.DATABASE_READ_REPLICAS
+        if not replicas or model._meta.db_table in self.TABLES_READ_FROM_MASTER or reads_from_primary() or \
+                connections['default'].in_atomic_block:
             return 'default'
-        return 'default'
+        return random.choice(replicas)
 
     def db_for_write(self, model, **hints):
         """Ghi vào Master"""
+        # Read-your-writes: once a request writes, the replicas may lag behind it.
+        _state.pinned = True
+        _state.wrote = True
         return 'default'
 
     def allow_relation(self, obj1, obj2, **hints):
@@ -11,7 +11,10 @@ from judge.jinja2 import registry
 from judge.jinja2.markdown.bleach_whitelist import (all_styles, mathml_attrs,
                                                     mathml_tags)
 from judge.jinja2.markdown.lazy_load import lazy_load as lazy_load_processor
+from judge.jinja2.markdown.texoid import texoid as texoid_processor
+from judge.jinja2.markdown.texoid import with_latex_fence
 from judge.utils.camo import client as camo_client
+from judge.utils.texoid import TEXOID_ENABLED
 
 logger = logging.getLogger('judge.html')
 
@@ -64,14 +67,17 @@ def markdown(value, style, math_engine=None, lazy_load=False):
     styles = settings.MARKDOWN_STYLES.get(style, settings.MARKDOWN_DEFAULT_STYLE)
     bleach_params = styles.get('bleach', {})
 
+    extension_configs = settings.MARKDOWN_EXTENSIONS_CONFIG
     post_processors = []
+    if styles.get('texoid', False) and TEXOID_ENABLED:
+        extension_configs = with_latex_fence(extension_configs)
+        post_processors.append(texoid_processor)
     if styles.get('use_camo', False) and camo_client is not None:
         post_processors.append(camo_client.update_tree)
     if lazy_load:
         post_processors.append(lazy_load_processor)
 
-    result = md.markdown(value, extensions=settings.MARKDOWN_EXTENSIONS,
-                         extension_configs=settings.MARKDOWN_EXTENSIONS_CONFIG)
+    result = md.markdown(value, extensions=settings.MARKDOWN_EXTENSIONS, extension_configs=extension_configs)
 
     if post_processors:
         tree = fragments_to_tree(result)
@@ -0,0 +1,95 @@
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from jinja2 import nodes
+from jinja2.ext import Extension
+from lxml import html
+from markupsafe import Markup
+from pymdownx.superfences import fence_code_format
+
+from judge.utils.texoid import TexoidRenderer
+
+# ```latex fences become <pre class="texoid"><code>...</code></pre>, so that they can be found after rendering.
+LATEX_FENCE = {'name': 'latex', 'class': 'texoid', 'format': fence_code_format}
+
+
+# Formulas left as placeholders while rendering the body of the innermost {% texoidcache %}.
+pending_fragment = ContextVar('texoid_pending_fragment', default=None)
+
+
+def with_latex_fence(extension_configs):
+    configs = dict(extension_configs)
+    superfences = configs['pymdownx.superfences'] = dict(configs.get('pymdownx.superfences', {}))
+    superfences['custom_fences'] = list(superfences.get('custom_fences', [])) + [LATEX_FENCE]
+    return configs
+
+
+def texoid(tree):
+    # All formulas of the document are looked up, and the missing ones queued, together. Until they are rendered,
+    # the LaTeX source is shown in their place.
+    blocks = [block for block in tree.xpath('.//pre[contains(concat(" ", normalize-space(@class), " "), " texoid ")]')
+              if block.text_content().strip()]
+    if not blocks:
+        return
+
+    formulas = [block.text_content().strip() for block in blocks]
+    for block, formula, result in zip(blocks, formulas, TexoidRenderer().get_results(formulas)):
+        if result is None:
+            block.set('class', 'texoid texoid-pending')
+            pending = pending_fragment.get()
+            if pending is not None:
+                pending.append(formula)
+            continue
+
+        img = html.Element('img', {'class': 'tex-image', 'src': result['svg'], 'alt': formula})
+        for dimension in ('width', 'height'):
+            if dimension in result['meta']:
+                img.set(dimension, str(result['meta'][dimension]))
+        span = html.Element('span', {'class': 'tex-image'})
+        span.append(img)
+        span.tail = block.tail
+        block.getparent().replace(block, span)
+
+
+class TexoidCacheExtension(Extension):
+    """
+    {% texoidcache timeout name vary_on... %} caches its body like {% cache %}, under the same fragment key. If the
+    body left some formulas as placeholders, it is cached for only TEXOID_PENDING_CACHE_TIMEOUT seconds instead, so
+    that the images replace them once Texoid is done.
+    """
+
+    tags = {'texoidcache'}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        timeout = parser.parse_expression()
+        name = parser.parse_expression()
+        vary_on = []
+        while not parser.stream.current.test('block_end'):
+            vary_on.append(parser.parse_expression())
+        body = parser.parse_statements(['name:endtexoidcache'], drop_needle=True)
+        return nodes.CallBlock(
+            self.call_method('_cache', [timeout, name, nodes.List(vary_on)]),
+            [], [], body,
+        ).set_lineno(lineno)
+
+    def _cache(self, timeout, name, vary_on, caller):
+        key = make_template_fragment_key(name, vary_on)
+        value = cache.get(key)
+        if value is None:
+            pending = []
+            token = pending_fragment.set(pending)
+            try:
+                value = str(caller())
+            finally:
+                pending_fragment.reset(token)
+
+            if pending:
+                timeout = settings.TEXOID_PENDING_CACHE_TIMEOUT
+                outer = pending_fragment.get()
+                if outer is not None:
+                    outer.extend(pending)
+            cache.set(key, value, int(timeout))
+        return Markup(value)
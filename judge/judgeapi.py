@@ -7,6 +7,7 @@ import zlib
 from asgiref.sync import async_to_sync
 from channels.layers import get_channel_layer
 from django.conf import settings
+from django.db import transaction
 from django.utils import timezone
 
 # from judge import event_poster as event
@@ -16,6 +17,14 @@ size_pack = struct.Struct('!I')
 socket_messages_logger = logging.getLogger('channels')
 channel_layer = get_channel_layer()
 
+CONTEST_SUBMISSION_PRIORITY = 0
+DEFAULT_PRIORITY = 1
+REJUDGE_PRIORITY = 2
+BATCH_REJUDGE_PRIORITY = 3
+
+# Uncompressed source bytes sent to the bridge per batch-submission-request, well below its packet size limit.
+BATCH_REQUEST_SOURCE_SIZE = 2 * 1024 * 1024
+
 
 def _post_update_submission(submission, done=False):
     # if submission.problem.is_public:
@@ -67,12 +76,8 @@ def judge_request(packet, reply=True):
 
 
 def judge_submission(submission, rejudge=False, batch_rejudge=False, judge_id=None):
-    from .models import ContestSubmission, Submission, SubmissionTestCase
-
-    CONTEST_SUBMISSION_PRIORITY = 0
-    DEFAULT_PRIORITY = 1
-    REJUDGE_PRIORITY = 2
-    BATCH_REJUDGE_PRIORITY = 3
+    from .models import (ContestSubmission, Submission, SubmissionResultCount,
+                         SubmissionTestCase)
 
     updates = {'time': None, 'memory': None, 'points': None, 'result': None, 'case_points': 0, 'case_total': 0,
                'error': None, 'rejudged_date': timezone.now() if rejudge or batch_rejudge else None, 'status': 'QU'}
@@ -94,7 +99,8 @@ def judge_submission(submission, rejudge=False, batch_rejudge=False, judge_id=No
     # as that would prevent people from knowing a submission is being scheduled for rejudging.
     # It is worth noting that this mechanism does not prevent a new rejudge from being scheduled
     # while already queued, but that does not lead to data corruption.
-    if not Submission.objects.filter(id=submission.id).exclude(status__in=('P', 'G')).update(**updates):
+    if not SubmissionResultCount.update_submissions(
+            Submission.objects.filter(id=submission.id).exclude(status__in=('P', 'G')), **updates):
         return False
 
     SubmissionTestCase.objects.filter(submission_id=submission.id).delete()
@@ -111,16 +117,88 @@ def judge_submission(submission, rejudge=False, batch_rejudge=False, judge_id=No
         })
     except BaseException:
         logger.exception('Failed to send request to judge')
-        Submission.objects.filter(id=submission.id).update(status='IE', result='IE')
+        SubmissionResultCount.update_submissions(Submission.objects.filter(id=submission.id),
+                                                 status='IE', result='IE')
         success = False
     else:
         if response['name'] != 'submission-received' or response['submission-id'] != submission.id:
-            Submission.objects.filter(id=submission.id).update(status='IE', result='IE')
+            SubmissionResultCount.update_submissions(Submission.objects.filter(id=submission.id),
+                                                     status='IE', result='IE')
         _post_update_submission(submission)
         success = True
     return success
 
 
+def _batch_judge_request(submissions):
+    from .models import Submission, SubmissionResultCount
+
+    try:
+        response = judge_request({
+            'name': 'batch-submission-request',
+            'submissions': [{'submission-id': id, 'problem-id': problem, 'language': language, 'source': source}
+                            for id, problem, language, source in submissions],
+            'judge-id': None,
+            'priority': BATCH_REJUDGE_PRIORITY,
+        })
+        received = set(response.get('submission-ids', ()))
+    except BaseException:
+        logger.exception('Failed to send batch request to judge')
+        received = set()
+
+    failed = [submission[0] for submission in submissions if submission[0] not in received]
+    if failed:
+        SubmissionResultCount.update_submissions(Submission.objects.filter(id__in=failed), status='IE', result='IE')
+    return len(submissions) - len(failed)
+
+
+def batch_rejudge_submissions(submission_ids):
+    # Rejudges a set of submissions with a fixed number of queries, and one bridge request per few megabytes of
+    # source, instead of both per submission. Returns the number of submissions queued.
+    from .models import Submission, SubmissionResultCount, SubmissionTestCase
+
+    # Same double-rejudge protection as judge_submission: only touch submissions that are not being graded. The rows
+    # stay locked until the reset commits, so a submission a judge picks up in the meantime is neither reset nor queued.
+    with transaction.atomic():
+        ids = list(Submission.objects.filter(id__in=submission_ids).exclude(status__in=('P', 'G'))
+                   .select_for_update().values_list('id', flat=True))
+        if not ids:
+            return 0
+
+        SubmissionResultCount.update_submissions(
+            Submission.objects.filter(id__in=ids),
+            time=None, memory=None, points=None, result=None, case_points=0, case_total=0, error=None,
+            rejudged_date=timezone.now(), status='QU', is_pretested=False,
+        )
+        Submission.objects.filter(id__in=ids, contest__problem__is_pretested=True,
+                                  contest__problem__contest__run_pretests_only=True).update(is_pretested=True)
+        SubmissionTestCase.objects.filter(submission_id__in=ids).delete()
+
+    # Status updates reach the browser when the judge starts grading, so none are posted here.
+    queued = 0
+    batch = []
+    batch_size = 0
+    missing_source = []
+    submissions = Submission.objects.filter(id__in=ids).order_by('id') \
+        .values_list('id', 'problem__code', 'language__key', 'source__source')
+    for submission in submissions.iterator():
+        if submission[3] is None:
+            missing_source.append(submission[0])
+            continue
+        batch.append(submission)
+        batch_size += len(submission[3])
+        if batch_size >= BATCH_REQUEST_SOURCE_SIZE:
+            queued += _batch_judge_request(batch)
+            batch = []
+            batch_size = 0
+    if batch:
+        queued += _batch_judge_request(batch)
+    if missing_source:
+        logger.error('Cannot rejudge submissions without source: %s', missing_source)
+        SubmissionResultCount.update_submissions(Submission.objects.filter(id__in=missing_source),
+                                                 status='IE', result='IE')
+    return queued
+
+
 def disconnect_judge(judge, force=False):
     judge_request({'name': 'disconnect-judge', 'judge-id': judge.name, 'force': force}, reply=False)
 
@@ -136,12 +214,13 @@ def send_abort_message(submission_secret):
 
 
 def abort_submission(submission):
-    from .models import Submission
+    from .models import Submission, SubmissionResultCount
     response = judge_request({'name': 'terminate-submission', 'submission-id': submission.id})
     # This defaults to true, so that in the case the JudgeList fails to remove the submission from the queue,
     # and returns a bad-request, the submission is not falsely shown as "Aborted" when it will still be judged.
     if not response.get('judge-aborted', True):
-        Submission.objects.filter(id=submission.id).update(status='AB', result='AB', points=0)
+        SubmissionResultCount.update_submissions(Submission.objects.filter(id=submission.id),
+                                                 status='AB', result='AB', points=0)
         # socket_messages_logger.info('Submission %s aborted', submission.id)
         send_abort_message(Submission.get_id_secret(submission.id))
         _post_update_submission(submission, done=True)
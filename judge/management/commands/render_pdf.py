@@ -8,9 +8,9 @@ from django.template.loader import get_template
 from django.utils import translation
 
 from judge.models import Problem, ProblemTranslation
-from judge.pdf_problems import (DefaultPdfMaker, PhantomJSPdfMaker,
-                                PuppeteerPDFRender, SeleniumPDFRender,
-                                SlimerJSPdfMaker)
+from judge.pdf_problems import (DaemonPdfMaker, DefaultPdfMaker,
+                                PhantomJSPdfMaker, PuppeteerPDFRender,
+                                SeleniumPDFRender, SlimerJSPdfMaker)
 
 
 class Command(BaseCommand):
@@ -27,6 +27,7 @@ class Command(BaseCommand):
         parser.add_argument('-c', '--chrome', '--puppeteer', action='store_const',
                             const=PuppeteerPDFRender, dest='engine')
         parser.add_argument('-S', '--selenium', action='store_const', const=SeleniumPDFRender, dest='engine')
+        parser.add_argument('-d', '--daemon', action='store_const', const=DaemonPdfMaker, dest='engine')
 
     def handle(self, *args, **options):
         try:
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+
+from judge.pdf_daemon import pdf_daemon
+
+
+class Command(BaseCommand):
+    help = 'runs the PDF render daemon, which keeps a headless browser warm between renders'
+
+    def handle(self, *args, **options):
+        pdf_daemon()
@@ -1,15 +1,20 @@
 import logging
-import time
+import math
 import re
 from ipaddress import ip_address
 from urllib.parse import quote as urlquote
 
 from django.conf import settings
-from django.contrib.sessions.models import Session
+from django.core.cache import cache
 from django.http import Http404, HttpResponseRedirect, JsonResponse
 from django.urls import Resolver404, resolve, reverse
+from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
 from django_redis import get_redis_connection
 
+from judge import database_router
+from judge.models import LoggedInUser
+
 logger = logging.getLogger("judge.request")
 
 
@@ -74,14 +79,53 @@ class BlockedIpMiddleware(object):
         return response
 
 
+# Generic cell rate algorithm: each client has one key holding its theoretical arrival time (TAT), in
+# milliseconds. A request is allowed if it would not push the TAT more than a whole window ahead of now, which lets
+# MAX_HITS requests through in a burst and one every WINDOW_SECONDS / MAX_HITS after that. A client that exceeds
+# the limit is refused outright for BLOCK_SECONDS, tracked by a second key. Returns the milliseconds until the next
+# request would be allowed, or 0 if this one is.
+GCRA_SCRIPT = """
+local interval = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+local block = tonumber(ARGV[3])
+
+local blocked = redis.call('PTTL', KEYS[2])
+if blocked > 0 then
+    return blocked
+end
+
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local tat = math.max(tonumber(redis.call('GET', KEYS[1])) or now, now)
+local allow_at = tat + interval - period
+if allow_at <= now then
+    tat = tat + interval
+    redis.call('SET', KEYS[1], string.format('%.3f', tat), 'PX', math.ceil(tat - now))
+    return 0
+end
+
+if block > 0 then
+    redis.call('SET', KEYS[2], '1', 'PX', block)
+    return block
+end
+return math.ceil(allow_at - now)
+"""
+
+
 class RateLimitMiddleware:
     def __init__(self, get_response):
         self.get_response = get_response
         self.r = get_redis_connection("default")
-        self.window = 10
-        self.limit = 80
-        self.block_seconds = 10
-        self.prefix = "rl"
+        self.script = self.r.register_script(GCRA_SCRIPT)
+
+        config = getattr(settings, "RATE_LIMIT", {})
+        self.prefix = config.get("KEY_PREFIX", "rl")
+        self.exempt_paths = tuple(config.get("EXEMPT_PATHS", ()))
+        self.whitelist_ips = frozenset(config.get("WHITELIST_IPS", ()))
+        self.block_seconds = config.get("BLOCK_SECONDS", 10)
+        self.default_limit = (config.get("MAX_HITS", 80), config.get("WINDOW_SECONDS", 10))
+        # Longest prefixes first, so that the most specific route wins.
+        self.routes = sorted(config.get("ROUTES", {}).items(), key=lambda route: len(route[0]), reverse=True)
 
     def __call__(self, request):
         # CHẶN TRƯỚC KHI VÀO VIEW
@@ -93,29 +137,25 @@ class RateLimitMiddleware:
         response = self.get_response(request)
         return response
 
+    def _get_limit(self, path):
+        for prefix, limit in self.routes:
+            if path.startswith(prefix):
+                return prefix, limit
+        return "", self.default_limit
+
     def _check_rate(self, request):
         ip = get_client_ip(request)
-        if not ip:
+        if not ip or ip in self.whitelist_ips:
             return None  # Không lấy được IP thì không chặn
-        now = time.time()
-        zkey = f"{self.prefix}:win:{ip}"
-        bkey = f"{self.prefix}:block:{ip}"
-
-        ttl = self.r.ttl(bkey)
-        if ttl and ttl > 0:
-            return self._too_many(ttl)
-
-        pipe = self.r.pipeline()
-        pipe.zremrangebyscore(zkey, "-inf", now - self.window)
-        pipe.zadd(zkey, {str(now): now})
-        pipe.zcard(zkey)
-        pipe.expire(zkey, self.window + self.block_seconds + 5)
-        _, _, count, _ = pipe.execute()
-
-        if count > self.limit:
-            self.r.set(bkey, "1", ex=self.block_seconds)
-            return self._too_many(self.block_seconds)
-
+        if request.path.startswith(self.exempt_paths):
+            return None
+
+        # Each route has its own bucket, so a busy page does not use up the limit of the rest of the site.
+        route, (limit, window) = self._get_limit(request.path)
+        retry_after = self.script(keys=[f"{self.prefix}:gcra:{route}:{ip}", f"{self.prefix}:block:{route}:{ip}"],
+                                  args=[window * 1000 / limit, window * 1000, int(self.block_seconds * 1000)])
+        if retry_after:
+            return self._too_many(math.ceil(retry_after / 1000))
         return None
 
     def _too_many(self, retry_after):
@@ -128,16 +168,38 @@ class RateLimitMiddleware:
         return resp
 
 
+class ReplicaPinningMiddleware:
+    # Lets safe requests read from DATABASE_READ_REPLICAS. A client that has just written is sent a short-lived
+    # cookie, and reads from the primary until it expires, so it sees its own writes despite replication lag.
+    cookie_name = "db_pin"
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        database_router.start_request(pinned=request.method not in ("GET", "HEAD", "OPTIONS") or
+                                      self.cookie_name in request.COOKIES)
+        try:
+            response = self.get_response(request)
+        finally:
+            wrote = database_router.finish_request()
+        if wrote:
+            response.set_cookie(self.cookie_name, "1", max_age=settings.DMOJ_REPLICA_PIN_SECONDS, httponly=True,
+                                samesite="Lax")
+        return response
+
+
 class LogRequestsMiddleware:
     def __init__(self, get_response):
         self.get_response = get_response
 
     def __call__(self, request):
-        user = "AnonymousUser" if request.user.is_anonymous else request.user.username
-        ip = get_client_ip(request)
-        # Log the user access URL
-        info = f"User {user} in IP:{ip} accessed {request.path} - {request.method}"
-        logger.info(info)
+        # Log the user access URL. The arguments are only formatted if the record is written, which a queued logger
+        # (DMOJ_QUEUED_LOGGERS) does off the request thread.
+        if logger.isEnabledFor(logging.INFO):
+            user = "AnonymousUser" if request.user.is_anonymous else request.user.username
+            logger.info("User %s in IP:%s accessed %s - %s", user, get_client_ip(request), request.path,
+                        request.method)
 
         response = self.get_response(request)
         return response
@@ -145,21 +207,27 @@ class LogRequestsMiddleware:
 
 # One session_key to one Person anytime
 class OneSessionPerUser(object):
+    # The session a user is bound to is cached, so that requests from that session, nearly all of them, need no
+    # queries. The binding is only read from and written to the database when it changes.
+    cache_timeout = 86400
+
     def __init__(self, get_response) -> None:
         self.get_response = get_response
 
     def __call__(self, request):
         if request.user.is_authenticated:
-            current_session_key = request.user.logged_in_user.session_key
+            session_key = request.session.session_key
+            cache_key = "logged_in_session:%d" % request.user.id
+            if cache.get(cache_key) != session_key:
+                current_session_key = request.user.logged_in_user.session_key
 
-            if (
-                current_session_key
-                and current_session_key != request.session.session_key
-            ):
-                Session.objects.filter(session_key=current_session_key).delete()
+                if current_session_key != session_key:
+                    if current_session_key:
+                        # Through the session engine, which also drops the cached copy of the old session.
+                        request.session.__class__().delete(current_session_key)
+                    LoggedInUser.objects.filter(user=request.user).update(session_key=session_key)
 
-            request.user.logged_in_user.session_key = request.session.session_key
-            request.user.logged_in_user.save()
+                cache.set(cache_key, session_key, self.cache_timeout)
 
         return self.get_response(request)
 
@@ -224,15 +292,29 @@ class DMOJImpersonationMiddleware(object):
 
 
 class ContestMiddleware(object):
+    # Checking that the current participation has not ended and that its contest is still joinable loads the
+    # participation and the contest, and can take several more queries, so a passed check is cached until the
+    # participation ends, for at most DMOJ_CONTEST_CHECK_CACHE_TIMEOUT. Joining or leaving a contest changes
+    # current_contest_id, which no longer matches the cached id, so it is checked again right away. Changes to the
+    # participation, the contest or who may access it drop the cached checks in judge.signals.
     def __init__(self, get_response):
         self.get_response = get_response
 
     def __call__(self, request):
         profile = request.profile
-        if profile:
-            profile.update_contest()
-            request.participation = profile.current_contest
-            request.in_contest = request.participation is not None
+        if profile and profile.current_contest_id is not None:
+            cache_key = "contest_check:%d" % profile.id
+            if cache.get(cache_key) != profile.current_contest_id:
+                profile.update_contest()
+                participation = profile.current_contest
+                if participation is not None:
+                    timeout = settings.DMOJ_CONTEST_CHECK_CACHE_TIMEOUT
+                    if participation.end_time is not None:
+                        timeout = min(timeout, (participation.end_time - timezone.now()).total_seconds())
+                    if timeout >= 1:
+                        cache.set(cache_key, participation.id, int(timeout))
+            request.participation = SimpleLazyObject(lambda: profile.current_contest)
+            request.in_contest = profile.current_contest_id is not None
         else:
             request.in_contest = False
             request.participation = None
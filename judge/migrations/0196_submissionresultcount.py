@@ -0,0 +1,45 @@
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def populate_result_counts(apps, schema_editor):
+    Submission = apps.get_model('judge', 'Submission')
+    SubmissionResultCount = apps.get_model('judge', 'SubmissionResultCount')
+
+    rows = (Submission.objects.filter(result__isnull=False)
+            .values('problem_id', 'contest_object_id', 'language_id', 'result')
+            .annotate(count=Count('id')).order_by()
+            .values_list('problem_id', 'contest_object_id', 'language_id', 'result', 'count'))
+    SubmissionResultCount.objects.bulk_create([
+        SubmissionResultCount(problem_id=problem_id, contest_id=contest_id, language_id=language_id,
+                              result=result, count=count)
+        for problem_id, contest_id, language_id, result, count in rows.iterator()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('judge', '0195_contest_delay_contest_alter_contest_forbidden_leave'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SubmissionResultCount',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('result', models.CharField(choices=[('AC', 'Accepted'), ('WA', 'Wrong Answer'), ('TLE', 'Time Limit Exceeded'), ('MLE', 'Memory Limit Exceeded'), ('OLE', 'Output Limit Exceeded'), ('IR', 'Invalid Return'), ('RTE', 'Runtime Error'), ('CE', 'Compile Error'), ('IE', 'Internal Error'), ('SC', 'Short circuit'), ('AB', 'Aborted')], db_index=True, max_length=3, verbose_name='result')),
+                ('count', models.IntegerField(default=0, verbose_name='submission count')),
+                ('contest', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='judge.contest', verbose_name='contest')),
+                ('language', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='judge.language', verbose_name='language')),
+                ('problem', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='judge.problem', verbose_name='problem')),
+            ],
+            options={
+                'verbose_name': 'submission result count',
+                'verbose_name_plural': 'submission result counts',
+                'unique_together': {('problem', 'contest', 'language', 'result')},
+            },
+        ),
+        migrations.RunPython(populate_result_counts, migrations.RunPython.noop, atomic=True),
+    ]
@@ -0,0 +1,17 @@
+import jsonfield.fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('judge', '0196_submissionresultcount'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contestmoss',
+            name='report',
+            field=jsonfield.fields.JSONField(blank=True, null=True),
+        ),
+    ]
@@ -25,7 +25,8 @@ from judge.models.profile import (LoggedInUser, Organization,
                                   WebAuthnCredential)
 from judge.models.runtime import Judge, Language, RuntimeVersion
 from judge.models.submission import (SUBMISSION_RESULT, Submission,
-                                     SubmissionSource, SubmissionTestCase)
+                                     SubmissionResultCount, SubmissionSource,
+                                     SubmissionTestCase)
 from judge.models.ticket import Ticket, TicketMessage
 
 revisions.register(Profile, exclude=['points', 'last_access', 'ip', 'rating'])
@@ -976,6 +976,26 @@ class ContestParticipation(models.Model):
 
     recompute_results.alters_data = True
 
+    @classmethod
+    def bulk_recompute_results(cls, participations):
+        """
+        Recomputes the results of many participations at once.
+
+        The results are computed exactly as recompute_results does, but written back with a single bulk update.
+        """
+        contests = {}
+        participations = list(participations)
+        for participation in participations:
+            # Share one contest, and so one contest format, between its participations.
+            participation.contest = contests.setdefault(participation.contest_id, participation.contest)
+            participation.contest.format.update_participation(participation, commit=False)
+            if participation.is_disqualified:
+                participation.score = -9999
+        with transaction.atomic():
+            cls.objects.bulk_update(participations, ['cumtime', 'score', 'tiebreaker', 'format_data'])
+
+    bulk_recompute_results.alters_data = True
+
     def set_disqualified(self, disqualified):
         """
         Sets the disqualified status of the participation.
@@ -1343,6 +1363,7 @@ class ContestMoss(models.Model):
     language = models.CharField(max_length=10)
     submission_count = models.PositiveIntegerField(default=0)
     url = models.URLField(null=True, blank=True)
+    report = JSONField(null=True, blank=True)
 
     class Meta:
         unique_together = ("contest", "problem", "language")
@@ -1,9 +1,11 @@
 import hashlib
 import hmac
+from collections import Counter
 
 from django.conf import settings
 from django.core.exceptions import ObjectDoesNotExist
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import F
 from django.urls import reverse
 from django.utils import timezone
 from django.utils.functional import cached_property
@@ -15,7 +17,7 @@ from judge.models.profile import Profile
 from judge.models.runtime import Language
 from judge.utils.unicode import utf8bytes
 
-__all__ = ['SUBMISSION_RESULT', 'Submission', 'SubmissionSource', 'SubmissionTestCase']
+__all__ = ['SUBMISSION_RESULT', 'Submission', 'SubmissionResultCount', 'SubmissionSource', 'SubmissionTestCase']
 
 SUBMISSION_RESULT = (
     ('AC', _('Accepted')),
@@ -305,3 +307,64 @@ class SubmissionTestCase(models.Model):
         unique_together = ('submission', 'case')
         verbose_name = _('submission test case')
         verbose_name_plural = _('submission test cases')
+
+
+class SubmissionResultCount(models.Model):
+    problem = models.ForeignKey(Problem, verbose_name=_('problem'), on_delete=models.CASCADE)
+    contest = models.ForeignKey('Contest', verbose_name=_('contest'), null=True, blank=True,
+                                on_delete=models.CASCADE, related_name='+')
+    language = models.ForeignKey(Language, verbose_name=_('language'), on_delete=models.CASCADE)
+    result = models.CharField(verbose_name=_('result'), max_length=3, choices=SUBMISSION_RESULT, db_index=True)
+    count = models.IntegerField(verbose_name=_('submission count'), default=0)
+
+    @classmethod
+    def add(cls, problem_id, contest_id, language_id, result, delta=1):
+        if result is None or not delta:
+            return
+        key = {'problem_id': problem_id, 'contest_id': contest_id, 'language_id': language_id, 'result': result}
+        # Never create a negative bucket; that can only come from a submission that predates the histogram.
+        if cls.objects.filter(**key).update(count=F('count') + delta) or delta < 0:
+            return
+        try:
+            with transaction.atomic():
+                if contest_id is None:
+                    # NULL contests never collide in the unique index, so buckets outside contests are created with
+                    # the problem row locked instead.
+                    list(Problem.objects.select_for_update().filter(id=problem_id).values_list('id', flat=True))
+                    if cls.objects.filter(**key).update(count=F('count') + delta):
+                        return
+                cls.objects.create(count=delta, **key)
+        except IntegrityError:
+            # Another process created the bucket first.
+            cls.objects.filter(**key).update(count=F('count') + delta)
+
+    @classmethod
+    def update_submissions(cls, queryset, **updates):
+        """Apply `updates` to the submissions in `queryset`, moving each one to its new histogram bucket."""
+        # The rows stay locked until the update commits, so a concurrent grader or rejudge cannot change the result
+        # the deltas are computed from.
+        with transaction.atomic():
+            rows = list(queryset.select_for_update()
+                        .values_list('id', 'problem_id', 'contest_object_id', 'language_id', 'result'))
+            if not rows:
+                return 0
+
+            updated = queryset.model.objects.filter(id__in=[row[0] for row in rows]).update(**updates)
+            if not updated:
+                return 0
+
+            deltas = Counter()
+            for _id, problem_id, contest_id, language_id, result in rows:
+                new_contest_id = updates.get('contest_object_id', contest_id)
+                new_result = updates.get('result', result)
+                if (contest_id, result) != (new_contest_id, new_result):
+                    deltas[problem_id, contest_id, language_id, result] -= 1
+                    deltas[problem_id, new_contest_id, language_id, new_result] += 1
+            for key, delta in deltas.items():
+                cls.add(*key, delta=delta)
+            return updated
+
+    class Meta:
+        unique_together = ('problem', 'contest', 'language', 'result')
+        verbose_name = _('submission result count')
+        verbose_name_plural = _('submission result counts')
@@ -1,8 +1,9 @@
+from django.db.models import Sum
 from django.test import TestCase
 from django.utils import timezone
 
 from judge.models import (ContestSubmission, Language, Submission,
-                          SubmissionSource)
+                          SubmissionResultCount, SubmissionSource)
 from judge.models.tests.util import (CommonDataMixin, create_contest,
                                      create_contest_participation,
                                      create_contest_problem, create_problem,
@@ -191,3 +192,62 @@ class SubmissionTestCase(CommonDataMixin, TestCase):
             },
         }
         self._test_object_methods_with_users(self.ie_submission, data)
+
+
+class SubmissionResultCountTestCase(CommonDataMixin, TestCase):
+    @classmethod
+    def setUpTestData(self):
+        super().setUpTestData()
+        self.problem = create_problem(code='result_count')
+
+    def count(self, **kwargs):
+        return SubmissionResultCount.objects.filter(problem=self.problem, **kwargs) \
+            .aggregate(count=Sum('count'))['count'] or 0
+
+    def create_submission(self, result):
+        return Submission.objects.create(
+            user=self.users['normal'].profile,
+            problem=self.problem,
+            language=Language.get_python3(),
+            result=result,
+            status='D' if result else 'QU',
+        )
+
+    def test_create_and_delete(self):
+        submission = self.create_submission('AC')
+        self.create_submission('WA')
+        self.create_submission(None)
+        self.assertEqual(self.count(result='AC'), 1)
+        self.assertEqual(self.count(result='WA'), 1)
+        self.assertEqual(self.count(), 2)
+
+        submission.delete()
+        self.assertEqual(self.count(result='AC'), 0)
+
+    def test_update_submissions(self):
+        submission = self.create_submission('WA')
+        queryset = Submission.objects.filter(id=submission.id)
+
+        self.assertEqual(SubmissionResultCount.update_submissions(queryset, status='QU', result=None), 1)
+        self.assertEqual(self.count(), 0)
+
+        self.assertEqual(SubmissionResultCount.update_submissions(queryset, status='CE', result='CE'), 1)
+        self.assertEqual(self.count(result='CE'), 1)
+
+        contest = create_contest(key='result_count')
+        SubmissionResultCount.update_submissions(queryset, contest_object_id=contest.id)
+        self.assertEqual(self.count(result='CE', contest=contest), 1)
+        self.assertEqual(self.count(result='CE'), 1)
+
+        self.assertEqual(SubmissionResultCount.update_submissions(queryset.exclude(status='CE'), result='AC'), 0)
+        self.assertEqual(self.count(result='AC'), 0)
+
+    def test_add_single_bucket(self):
+        language = Language.get_python3()
+        for _ in range(2):
+            SubmissionResultCount.add(self.problem.id, None, language.id, 'TLE')
+        SubmissionResultCount.add(self.problem.id, None, language.id, 'MLE', delta=-1)
+
+        self.assertEqual(SubmissionResultCount.objects.filter(problem=self.problem, result='TLE').count(), 1)
+        self.assertEqual(self.count(result='TLE'), 2)
+        self.assertFalse(SubmissionResultCount.objects.filter(problem=self.problem, result='MLE').exists())
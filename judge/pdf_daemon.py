@@ -0,0 +1,142 @@
+import base64
+import json
+import logging
+import os
+import queue
+import signal
+import socketserver
+import threading
+
+from django.conf import settings
+from selenium import webdriver
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+from judge.pdf_problems import SeleniumPDFRender
+
+logger = logging.getLogger('judge.problem.pdf')
+
+
+class WarmBrowser:
+    # A headless Chrome that is kept running between renders. It is restarted after PDF_RENDER_DAEMON_MAX_PAGES
+    # pages, to bound its memory growth, and whenever the driver reports an error.
+    def __init__(self, max_pages):
+        self.max_pages = max_pages
+        self.browser = None
+        self.pages = 0
+
+    def start(self):
+        options = webdriver.ChromeOptions()
+        options.add_argument('--headless')
+        options.add_argument('--no-sandbox')
+        if settings.SELENIUM_CUSTOM_CHROME_PATH:
+            options.binary_location = settings.SELENIUM_CUSTOM_CHROME_PATH
+        self.browser = webdriver.Chrome(service=Service(settings.SELENIUM_CHROMEDRIVER_PATH), options=options)
+        self.pages = 0
+        logger.info('Started headless browser for PDF rendering')
+
+    def stop(self):
+        if self.browser is not None:
+            try:
+                self.browser.quit()
+            except Exception:
+                logger.exception('Failed to quit headless browser')
+            self.browser = None
+
+    def render(self, html, pdf, title):
+        if self.browser is None:
+            self.start()
+
+        try:
+            self.browser.get('file://%s' % html)
+            try:
+                WebDriverWait(self.browser, 15).until(EC.presence_of_element_located((By.CLASS_NAME, 'math-loaded')))
+            except TimeoutException:
+                return False, 'PDF math rendering timed out'
+
+            # Chrome takes the PDF's title from the document, which saves running exiftool afterwards.
+            if title:
+                self.browser.execute_script('document.title = arguments[0];', title)
+            response = self.browser.execute_cdp_cmd('Page.printToPDF', SeleniumPDFRender.template)
+        except WebDriverException as e:
+            logger.exception('Headless browser failed, restarting')
+            self.stop()
+            return False, str(e)
+        finally:
+            self.pages += 1
+            if self.pages >= self.max_pages:
+                self.stop()
+
+        if not response:
+            return False, 'Browser returned no PDF'
+        with open(pdf, 'wb') as f:
+            f.write(base64.b64decode(response['data']))
+        return True, ''
+
+
+class RenderHandler(socketserver.StreamRequestHandler):
+    # Each connection carries one job: a JSON line naming the input and output files. Once a browser is free to
+    # take the job, the daemon answers {"started": true}, and then a JSON line with the result. A job that finds no
+    # free browser within PDF_RENDER_DAEMON_QUEUE_TIMEOUT fails without starting.
+    def handle(self):
+        try:
+            job = json.loads(self.rfile.readline())
+            try:
+                browser = self.server.browsers.get(timeout=settings.PDF_RENDER_DAEMON_QUEUE_TIMEOUT)
+            except queue.Empty:
+                logger.error('No browser became free to render %s', job['output'])
+                self.wfile.write(json.dumps({'success': False, 'log': 'PDF render daemon is busy'})
+                                 .encode('utf-8') + b'\n')
+                return
+            try:
+                self.wfile.write(json.dumps({'started': True}).encode('utf-8') + b'\n')
+                success, log = browser.render(job['input'], job['output'], job.get('title'))
+            finally:
+                self.server.browsers.put(browser)
+        except Exception as e:
+            logger.exception('Failed to handle PDF render job')
+            success, log = False, str(e)
+        self.wfile.write(json.dumps({'success': success, 'log': log}).encode('utf-8') + b'\n')
+
+
+class RenderServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path, max_pages, browsers):
+        if os.path.exists(path):
+            os.unlink(path)
+        super().__init__(path, RenderHandler)
+        os.chmod(path, 0o660)
+        # Jobs wait for one of the pool's browsers, each of which renders one page at a time.
+        self.pool = [WarmBrowser(max_pages) for _ in range(browsers)]
+        self.browsers = queue.Queue()
+        for browser in self.pool:
+            self.browsers.put(browser)
+
+
+def pdf_daemon():
+    server = RenderServer(settings.PDF_RENDER_DAEMON_SOCKET, settings.PDF_RENDER_DAEMON_MAX_PAGES,
+                          settings.PDF_RENDER_DAEMON_BROWSERS)
+    threading.Thread(target=server.serve_forever).start()
+
+    stop = threading.Event()
+
+    def signal_handler(signum, _):
+        logger.info('Exiting due to %s', signal.Signals(signum).name)
+        stop.set()
+
+    signal.signal(signal.SIGINT, signal_handler)
+    signal.signal(signal.SIGQUIT, signal_handler)
+    signal.signal(signal.SIGTERM, signal_handler)
+
+    try:
+        stop.wait()
+    finally:
+        server.shutdown()
+        server.server_close()
+        for browser in server.pool:
+            browser.stop()
+        os.unlink(settings.PDF_RENDER_DAEMON_SOCKET)
@@ -5,6 +5,7 @@ import json
 import logging
 import os
 import shutil
+import socket
 import subprocess
 import uuid
 
@@ -33,8 +34,10 @@ NODE_PATH = settings.NODEJS
 PUPPETEER_MODULE = settings.PUPPETEER_MODULE
 HAS_PUPPETEER = os.access(NODE_PATH, os.X_OK) and os.path.isdir(PUPPETEER_MODULE)
 
+HAS_PDF_DAEMON = bool(settings.PDF_RENDER_DAEMON_SOCKET)
+
 HAS_PDF = (os.path.isdir(settings.PDF_PROBLEM_CACHE) and
-           (HAS_PHANTOMJS or HAS_SLIMERJS or HAS_PUPPETEER or HAS_SELENIUM))
+           (HAS_PDF_DAEMON or HAS_PHANTOMJS or HAS_SLIMERJS or HAS_PUPPETEER or HAS_SELENIUM))
 
 EXIFTOOL = settings.EXIFTOOL
 HAS_EXIFTOOL = os.access(EXIFTOOL, os.X_OK)
@@ -316,7 +319,40 @@ class SeleniumPDFRender(BasePdfMaker):
         self.success = True
 
 
-if HAS_PUPPETEER:
+class DaemonPdfMaker(BasePdfMaker):
+    # Hands the render to the long-running daemon started by `manage.py runpdfd`, which keeps a browser warm.
+    success = False
+
+    def make(self, debug=False):
+        # The daemon sets the title itself, so exiftool is not needed.
+        self._make(debug)
+
+    def _make(self, debug):
+        request = {'input': self.htmlfile, 'output': self.pdffile, 'title': self.title}
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.connect(settings.PDF_RENDER_DAEMON_SOCKET)
+                sock.sendall(json.dumps(request).encode('utf-8') + b'\n')
+                with sock.makefile('rb') as f:
+                    # The daemon gives up on a job that waited too long for a free browser by itself; this timeout
+                    # only guards against a daemon that stopped answering. Once started, the render is timed alone.
+                    sock.settimeout(settings.PDF_RENDER_DAEMON_QUEUE_TIMEOUT + settings.PDF_RENDER_DAEMON_TIMEOUT)
+                    result = json.loads(f.readline())
+                    if result.get('started'):
+                        sock.settimeout(settings.PDF_RENDER_DAEMON_TIMEOUT)
+                        result = json.loads(f.readline())
+        except (OSError, ValueError) as e:
+            logger.error('Failed to reach PDF render daemon: %s', e)
+            self.log = 'Failed to reach PDF render daemon: %s' % e
+            return
+
+        self.success = result['success']
+        self.log = result['log']
+
+
+if HAS_PDF_DAEMON:
+    DefaultPdfMaker = DaemonPdfMaker
+elif HAS_PUPPETEER:
     DefaultPdfMaker = PuppeteerPDFRender
 elif HAS_SELENIUM:
     DefaultPdfMaker = SeleniumPDFRender
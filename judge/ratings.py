@@ -2,10 +2,11 @@ import math
 from bisect import bisect
 from operator import attrgetter, itemgetter
 
+import numpy as np
 from django.db import transaction
-from django.db.models import Count, IntegerField, OuterRef, Subquery
-from django.db.models.functions import Coalesce
+from django.db.models import Count
 from django.utils import timezone
+from numpy.polynomial import chebyshev
 
 
 def tie_ranker(iterable, key=attrgetter('points')):
@@ -54,6 +55,57 @@ def WP(RA, RB, VA, VB):
     return (math.erf((RB - RA) / math.sqrt(2 * (VA * VA + VB * VB))) + 1) / 2.0
 
 
+def _erf_coefficients():
+    # Piecewise Chebyshev interpolants of math.erf over [0, ERF_LIMIT); they agree with it to a few ulps.
+    nodes = chebyshev.chebpts1(ERF_DEGREE + 1)
+    return np.array([
+        chebyshev.chebfit(nodes, [math.erf(start + (node + 1) * ERF_STEP / 2) for node in nodes], ERF_DEGREE)
+        for start in np.arange(0, ERF_LIMIT, ERF_STEP)
+    ]).T
+
+
+ERF_STEP = 0.125
+ERF_LIMIT = 6.0  # erf(6) rounds to exactly 1.0 in double precision
+ERF_DEGREE = 8
+ERF_COEFFICIENTS = _erf_coefficients()
+
+
+def erf(x):
+    x_abs = np.abs(x)
+    piece = np.minimum((x_abs / ERF_STEP).astype(np.intp), ERF_COEFFICIENTS.shape[1] - 1)
+    t = (x_abs - piece * ERF_STEP) * (2 / ERF_STEP) - 1
+
+    # Clenshaw's recurrence, picking each element's coefficients by the piece it falls in.
+    t2 = 2 * t
+    b1 = np.zeros_like(t)
+    b2 = np.zeros_like(t)
+    for coefficients in ERF_COEFFICIENTS[:0:-1]:
+        b1, b2 = coefficients[piece] + t2 * b1 - b2, b1
+    result = ERF_COEFFICIENTS[0][piece] + t * b1 - b2
+
+    return np.copysign(np.where(x_abs >= ERF_LIMIT, 1.0, result), x)
+
+
+def normal_CDF_inverse_array(p):
+    low = p < 0.5
+    return np.where(low, -1.0, 1.0) * rational_approximation(np.sqrt(-2.0 * np.log(np.where(low, p, 1.0 - p))))
+
+
+def expected_ranks(rating, volatility, block_size=1 << 16):
+    # ERank[i] = 0.5 + sum(WP(rating[i], rating[j], volatility[i], volatility[j]) for j in range(N)),
+    # computed a few rows at a time so that the pairwise matrix never exceeds block_size elements.
+    N = len(rating)
+    rows = max(1, block_size // N)
+    variance = volatility * volatility
+    result = np.empty(N)
+    for start in range(0, N, rows):
+        end = min(start + rows, N)
+        pairwise = erf((rating[None, :] - rating[start:end, None]) /
+                       np.sqrt(2 * (variance[start:end, None] + variance[None, :])))
+        result[start:end] = 0.5 + ((pairwise + 1) / 2.0).sum(axis=1)
+    return result
+
+
 def recalculate_ratings(old_rating, old_volatility, actual_rank, times_rated, is_disqualified):
     # actual_rank: 1 is first place, N is last place
     # if there are ties, use the average of places (if places 2, 3, 4, 5 tie, use 3.5 for all of them)
@@ -64,85 +116,82 @@ def recalculate_ratings(old_rating, old_volatility, actual_rank, times_rated, is
     if N <= 5:
         return new_rating, new_volatility
 
-    ranking = list(range(N))
-    ranking.sort(key=old_rating.__getitem__, reverse=True)
-
+    # The O(N) aggregates are summed in plain Python, in the same order as before vectorization.
     ave_rating = float(sum(old_rating)) / N
     sum1 = sum(i * i for i in old_volatility) / N
     sum2 = sum((i - ave_rating) ** 2 for i in old_rating) / (N - 1)
     CF = math.sqrt(sum1 + sum2)
 
-    for i in range(N):
-        ERank = 0.5
-        for j in range(N):
-            ERank += WP(old_rating[i], old_rating[j], old_volatility[i], old_volatility[j])
-
-        EPerf = -normal_CDF_inverse((ERank - 0.5) / N)
-        APerf = -normal_CDF_inverse((actual_rank[i] - 0.5) / N)
-        PerfAs = old_rating[i] + CF * (APerf - EPerf)
-        Weight = 1.0 / (1 - (0.42 / (times_rated[i] + 1) + 0.18)) - 1.0
-        if old_rating[i] > 2500:
-            Weight *= 0.8
-        elif old_rating[i] >= 2000:
-            Weight *= 0.9
-
-        Cap = 150.0 + 1500.0 / (times_rated[i] + 2)
-
-        new_rating[i] = (old_rating[i] + Weight * PerfAs) / (1.0 + Weight)
-
-        if times_rated[i] == 0:
-            new_volatility[i] = 385
-        else:
-            new_volatility[i] = math.sqrt(((new_rating[i] - old_rating[i]) ** 2) / Weight +
-                                          (old_volatility[i] ** 2) / (Weight + 1))
-
-        if is_disqualified[i]:
-            # DQed users can manipulate TopCoder ratings to get higher volatility in order to increase their rating
-            # later on, prohibit this by ensuring their volatility never increases in this situation
-            new_volatility[i] = min(new_volatility[i], old_volatility[i])
-
-        if abs(old_rating[i] - new_rating[i]) > Cap:
-            if old_rating[i] < new_rating[i]:
-                new_rating[i] = old_rating[i] + Cap
-            else:
-                new_rating[i] = old_rating[i] - Cap
+    old_rating = np.array(old_rating, dtype=float)
+    old_volatility = np.array(old_volatility, dtype=float)
+    actual_rank = np.array(actual_rank, dtype=float)
+    times_rated = np.array(times_rated, dtype=float)
+    is_disqualified = np.array(is_disqualified, dtype=bool)
+
+    ERank = expected_ranks(old_rating, old_volatility)
+    EPerf = -normal_CDF_inverse_array((ERank - 0.5) / N)
+    APerf = -normal_CDF_inverse_array((actual_rank - 0.5) / N)
+    PerfAs = old_rating + CF * (APerf - EPerf)
+    Weight = 1.0 / (1 - (0.42 / (times_rated + 1) + 0.18)) - 1.0
+    Weight = np.where(old_rating > 2500, Weight * 0.8, np.where(old_rating >= 2000, Weight * 0.9, Weight))
+
+    Cap = 150.0 + 1500.0 / (times_rated + 2)
+
+    new_rating = (old_rating + Weight * PerfAs) / (1.0 + Weight)
+
+    new_volatility = np.where(times_rated == 0, 385.0,
+                              np.sqrt(((new_rating - old_rating) ** 2) / Weight +
+                                      (old_volatility ** 2) / (Weight + 1)))
+
+    # DQed users can manipulate TopCoder ratings to get higher volatility in order to increase their rating
+    # later on, prohibit this by ensuring their volatility never increases in this situation
+    new_volatility = np.where(is_disqualified, np.minimum(new_volatility, old_volatility), new_volatility)
+
+    new_rating = np.clip(new_rating, old_rating - Cap, old_rating + Cap)
 
     # try to keep the sum of ratings constant
-    adjust = float(sum(old_rating) - sum(new_rating)) / N
-    new_rating = list(map(adjust.__add__, new_rating))
+    adjust = float(sum(old_rating.tolist()) - sum(new_rating.tolist())) / N
+    new_rating = new_rating + adjust
     # inflate a little if we have to so people who placed first don't lose rating
-    best_rank = min(actual_rank)
-    for i in range(N):
-        if abs(actual_rank[i] - best_rank) <= 1e-3 and new_rating[i] < old_rating[i] + 1:
-            new_rating[i] = old_rating[i] + 1
-    return list(map(int, map(round, new_rating))), list(map(int, map(round, new_volatility)))
+    best_rank = actual_rank.min()
+    new_rating = np.where((np.abs(actual_rank - best_rank) <= 1e-3) & (new_rating < old_rating + 1),
+                          old_rating + 1, new_rating)
+    return list(map(int, map(round, new_rating.tolist()))), list(map(int, map(round, new_volatility.tolist())))
 
 
-def rate_contest(contest):
-    from judge.models import Profile, Rating
+def rating_history(end_time):
+    # Maps each profile id to its (last rating, last volatility, times rated), as of the contests that ended before
+    # end_time.
+    from judge.models import Rating
+
+    history = {}
+    ratings = Rating.objects.filter(contest__end_time__lt=end_time).order_by('contest__end_time', 'id') \
+        .values_list('user_id', 'rating', 'volatility')
+    for user_id, rating, volatility in ratings.iterator(chunk_size=10000):
+        times = history[user_id][2] + 1 if user_id in history else 1
+        history[user_id] = (rating, volatility, times)
+    return history
+
+
+def replay_contest(contest, history, now):
+    # Rates the contest against the in-memory history, updating it, and returns the unsaved Rating objects.
+    from judge.models import Rating
 
-    rating_subquery = Rating.objects.filter(user=OuterRef('user'))
-    rating_sorted = rating_subquery.order_by('-contest__end_time')
     users = contest.users.order_by('is_disqualified', '-score', 'cumtime', 'tiebreaker') \
-        .annotate(submissions=Count('submission'),
-                  last_rating=Coalesce(Subquery(rating_sorted.values('rating')[:1]), 600,
-                                       output_field=IntegerField()),
-                  volatility=Coalesce(Subquery(rating_sorted.values('volatility')[:1]), 400,
-                                      output_field=IntegerField()),
-                  times=Coalesce(Subquery(rating_subquery.order_by().values('user_id')
-                                          .annotate(count=Count('id')).values('count')), 0,
-                                 output_field=IntegerField())) \
+        .annotate(submissions=Count('submission')) \
         .exclude(user_id__in=contest.rate_exclude.all()) \
-        .filter(virtual=0).values('id', 'user_id', 'score', 'cumtime', 'tiebreaker', 'is_disqualified',
-                                  'last_rating', 'volatility', 'times')
+        .filter(virtual=0).values('id', 'user_id', 'score', 'cumtime', 'tiebreaker', 'is_disqualified')
     if not contest.rate_all:
         users = users.filter(submissions__gt=0)
+
+    users = list(users)
+    for user in users:
+        user['last_rating'], user['volatility'], user['times'] = history.get(user['user_id'], (600, 400, 0))
     if contest.rating_floor is not None:
-        users = users.exclude(last_rating__lt=contest.rating_floor)
+        users = [user for user in users if user['last_rating'] >= contest.rating_floor]
     if contest.rating_ceiling is not None:
-        users = users.exclude(last_rating__gt=contest.rating_ceiling)
+        users = [user for user in users if user['last_rating'] <= contest.rating_ceiling]
 
-    users = list(users)
     participation_ids = list(map(itemgetter('id'), users))
     user_ids = list(map(itemgetter('user_id'), users))
     is_disqualified = list(map(itemgetter('is_disqualified'), users))
@@ -152,15 +201,38 @@ def rate_contest(contest):
     times_ranked = list(map(itemgetter('times'), users))
     rating, volatility = recalculate_ratings(old_rating, old_volatility, ranking, times_ranked, is_disqualified)
 
+    for user_id, r, v, times in zip(user_ids, rating, volatility, times_ranked):
+        history[user_id] = (r, v, times + 1)
+    return [Rating(user_id=i, contest=contest, rating=r, volatility=v, last_rated=now, participation_id=p, rank=z)
+            for i, p, r, v, z in zip(user_ids, participation_ids, rating, volatility, ranking)]
+
+
+def rate_contests(contests, callback=None):
+    # Replaces the ratings of every contest that ended at or after the first of the given contests, which must be
+    # ordered by end_time. The rating history is loaded once and all rows are written in bulk at the end.
+    from judge.models import Profile, Rating
+
+    contests = list(contests)
+    if not contests:
+        return
+    start = contests[0].end_time
+    history = rating_history(start)
+
     now = timezone.now()
-    ratings = [Rating(user_id=i, contest=contest, rating=r, volatility=v, last_rated=now, participation_id=p, rank=z)
-               for i, p, r, v, z in zip(user_ids, participation_ids, rating, volatility, ranking)]
+    ratings = []
+    for contest in contests:
+        ratings += replay_contest(contest, history, now)
+        if callback is not None:
+            callback(contest)
+
+    stale = Rating.objects.filter(contest__end_time__gte=start)
+    user_ids = set(stale.values_list('user_id', flat=True)) | set(map(attrgetter('user_id'), ratings))
+    profiles = [Profile(id=user_id, rating=history[user_id][0] if user_id in history else None)
+                for user_id in user_ids]
     with transaction.atomic():
-        Rating.objects.bulk_create(ratings)
-
-        Profile.objects.filter(contest_history__contest=contest, contest_history__virtual=0).update(
-            rating=Subquery(Rating.objects.filter(user=OuterRef('id'))
-                            .order_by('-contest__end_time').values('rating')[:1]))
+        stale.delete()
+        Rating.objects.bulk_create(ratings, batch_size=1000)
+        Profile.objects.bulk_update(profiles, ['rating'], batch_size=1000)
 
 
 RATING_LEVELS = ['Newbie', 'Amateur', 'Expert', 'Candidate Master', 'Master', 'Grandmaster', 'Target']
@@ -3,25 +3,24 @@ import os
 
 from django.conf import settings
 from django.contrib.auth import user_logged_in
-from django.contrib.sites.models import Site
 from django.core.cache import cache
 from django.core.cache.utils import make_template_fragment_key
-from django.db.models.signals import post_delete, post_save, pre_save
+from django.db.models.signals import m2m_changed, post_delete, post_save
 from django.dispatch import receiver
 
-from .caching import finished_submission
+from .caching import finished_submission, submission_count_version_keys
 from .models import (EFFECTIVE_MATH_ENGINES, BlogPost, Comment, Contest,
-                     ContestSubmission, Judge, Language, License, LoggedInUser,
-                     MiscConfig, Organization, Problem, Profile, Submission,
-                     WebAuthnCredential)
-
-
-def get_pdf_path(basename):
-    return os.path.join(settings.PDF_PROBLEM_CACHE, basename)
-
-
-def get_pdf_contest_path(basename):
-    return os.path.join(settings.PDF_CONTEST_CACHE, basename)
+                     ContestParticipation, ContestSubmission, Judge, Language,
+                     License, LoggedInUser, MiscConfig, NavigationBar,
+                     Organization, Problem, ProblemData, ProblemTranslation,
+                     Profile, SampleContest, SampleContestProblem, Submission,
+                     SubmissionResultCount, WebAuthnCredential)
+from .utils.contest_calendar import bump_contest_calendar_version
+from .utils.pdf import (contest_pdf_path, problem_pdf_path,
+                        sample_contest_pdf_path)
+from .utils.problem_data import problem_data_manifest_key
+from .utils.site_config import bump_site_config_version
+from .utils.texoid import TEXOID_ENABLED, get_formulas, queue_texoid_render
 
 
 def unlink_if_exists(file):
@@ -48,8 +47,30 @@ def problem_update(sender, instance, **kwargs):
                        for lang, _ in settings.LANGUAGES])
     cache.delete_many(['generated-meta-problem:%s:%d' % (lang, instance.id) for lang, _ in settings.LANGUAGES])
 
+    sample_contest_ids = list(SampleContestProblem.objects.filter(problem=instance)
+                              .values_list('contest_id', flat=True).distinct())
     for lang, _ in settings.LANGUAGES:
-        unlink_if_exists(get_pdf_path('%s.%s.pdf' % (instance.code, lang)))
+        unlink_if_exists(problem_pdf_path(instance.code, lang))
+        for contest_id in sample_contest_ids:
+            unlink_if_exists(sample_contest_pdf_path(contest_id, lang))
+
+    if TEXOID_ENABLED:
+        # Render new formulas now rather than on the first view.
+        descriptions = [instance.description] + list(instance.translations.values_list('description', flat=True))
+        queue_texoid_render([formula for description in descriptions for formula in get_formulas(description)])
+
+
+@receiver(post_save, sender=ProblemTranslation)
+def problem_translation_update(sender, instance, **kwargs):
+    # The admin saves translations after the problem itself, so problem_update only sees the old ones.
+    if TEXOID_ENABLED:
+        queue_texoid_render(get_formulas(instance.description))
+
+
+@receiver(post_save, sender=ProblemData)
+@receiver(post_delete, sender=ProblemData)
+def problem_data_update(sender, instance, **kwargs):
+    cache.delete(problem_data_manifest_key(instance.problem_id))
 
 
 @receiver(post_save, sender=Profile)
@@ -77,13 +98,90 @@ def contest_update(sender, instance, **kwargs):
         return
 
     for lang, _ in settings.LANGUAGES:
-        unlink_if_exists(get_pdf_contest_path('%s.%s.pdf' % (instance.key, lang)))
+        unlink_if_exists(contest_pdf_path(instance.key, lang))
 
     cache.delete_many(['generated-meta-contest:%d' % instance.id] +
                       [make_template_fragment_key('contest_html', (instance.id, engine))
                        for engine in EFFECTIVE_MATH_ENGINES])
 
 
+@receiver(post_save, sender=Contest)
+@receiver(post_delete, sender=Contest)
+@receiver(m2m_changed, sender=Contest.organizations.through)
+@receiver(m2m_changed, sender=Contest.private_contestants.through)
+@receiver(m2m_changed, sender=Contest.view_contest_scoreboard.through)
+@receiver(m2m_changed, sender=Contest.authors.through)
+@receiver(m2m_changed, sender=Contest.curators.through)
+@receiver(m2m_changed, sender=Contest.testers.through)
+def contest_calendar_update(sender, instance, **kwargs):
+    # Contests saved only to update statistics keep their dates and visibility.
+    if not hasattr(instance, '_updating_stats_only'):
+        bump_contest_calendar_version()
+
+
+def clear_contest_checks(profile_ids):
+    # Drop the contest checks ContestMiddleware cached for these profiles, so their participation is checked again.
+    cache.delete_many(['contest_check:%d' % profile_id for profile_id in profile_ids])
+
+
+def clear_contest_checks_in(contest_ids):
+    clear_contest_checks(Profile.objects.filter(current_contest__contest_id__in=contest_ids)
+                         .values_list('id', flat=True))
+
+
+@receiver(post_save, sender=ContestParticipation)
+@receiver(post_delete, sender=ContestParticipation)
+def contest_participation_update(sender, instance, **kwargs):
+    clear_contest_checks([instance.user_id])
+
+
+@receiver(post_save, sender=Contest)
+def contest_check_update(sender, instance, **kwargs):
+    # Contest times and access settings decide whether a participation has ended or is still joinable.
+    if not hasattr(instance, '_updating_stats_only'):
+        clear_contest_checks_in([instance.id])
+
+
+@receiver(m2m_changed, sender=Contest.organizations.through)
+@receiver(m2m_changed, sender=Contest.private_contestants.through)
+def contest_access_update(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        clear_contest_checks_in([instance.id])
+    elif isinstance(instance, Profile):
+        clear_contest_checks([instance.id])
+    elif pk_set is not None:
+        clear_contest_checks_in(pk_set)
+    else:
+        clear_contest_checks_in(instance.contest_set.values_list('id', flat=True))
+
+
+@receiver(m2m_changed, sender=Profile.organizations.through)
+def profile_organizations_update(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        clear_contest_checks([instance.id])
+    elif pk_set is not None:
+        clear_contest_checks(pk_set)
+    else:
+        clear_contest_checks(instance.members.values_list('id', flat=True))
+
+
+@receiver(post_save, sender=SampleContest)
+def sample_contest_update(sender, instance, **kwargs):
+    for lang, _ in settings.LANGUAGES:
+        unlink_if_exists(sample_contest_pdf_path(instance.id, lang))
+
+
+@receiver(post_save, sender=SampleContestProblem)
+@receiver(post_delete, sender=SampleContestProblem)
+def sample_contest_problem_update(sender, instance, **kwargs):
+    for lang, _ in settings.LANGUAGES:
+        unlink_if_exists(sample_contest_pdf_path(instance.contest_id, lang))
+
+
 @receiver(post_save, sender=License)
 def license_update(sender, instance, **kwargs):
     cache.delete(make_template_fragment_key('license_html', (instance.id,)))
@@ -115,10 +213,23 @@ def post_update(sender, instance, **kwargs):
     cache.delete_many([make_template_fragment_key('post_content', (instance.id, engine))
                        for engine in EFFECTIVE_MATH_ENGINES])
 
+    if TEXOID_ENABLED:
+        queue_texoid_render(get_formulas(instance.summary) + get_formulas(instance.content))
+
+
+@receiver(post_save, sender=Submission)
+def submission_update(sender, instance, created, **kwargs):
+    if created:
+        cache.delete_many(submission_count_version_keys(instance))
+        SubmissionResultCount.add(instance.problem_id, instance.contest_object_id, instance.language_id,
+                                  instance.result)
+
 
 @receiver(post_delete, sender=Submission)
 def submission_delete(sender, instance, **kwargs):
     finished_submission(instance)
+    SubmissionResultCount.add(instance.problem_id, instance.contest_object_id, instance.language_id,
+                              instance.result, -1)
     instance.user._updating_stats_only = True
     instance.user.calculate_points()
     instance.problem._updating_stats_only = True
@@ -129,7 +240,8 @@ def submission_delete(sender, instance, **kwargs):
 def contest_submission_delete(sender, instance, **kwargs):
     participation = instance.participation
     participation.recompute_results()
-    Submission.objects.filter(id=instance.submission_id).update(contest_object=None)
+    SubmissionResultCount.update_submissions(Submission.objects.filter(id=instance.submission_id),
+                                             contest_object_id=None)
 
 
 @receiver(post_save, sender=Organization)
@@ -138,40 +250,19 @@ def organization_update(sender, instance, **kwargs):
                        for engine in EFFECTIVE_MATH_ENGINES])
 
 
-_misc_config_i18n = [code for code, _ in settings.LANGUAGES]
-_misc_config_i18n.append('')
-
-
-def misc_config_cache_delete(key):
-    cache.delete_many(['misc_config:%s:%s:%s' % (domain, lang, key.split('.')[0])
-                       for lang in _misc_config_i18n
-                       for domain in Site.objects.values_list('domain', flat=True)])
-
-
-@receiver(pre_save, sender=MiscConfig)
-def misc_config_pre_save(sender, instance, **kwargs):
-    try:
-        old_key = MiscConfig.objects.filter(id=instance.id).values_list('key').get()[0]
-    except MiscConfig.DoesNotExist:
-        old_key = None
-    instance._old_key = old_key
-
-
 @receiver(post_save, sender=MiscConfig)
-def misc_config_update(sender, instance, **kwargs):
-    misc_config_cache_delete(instance.key)
-    if instance._old_key is not None and instance._old_key != instance.key:
-        misc_config_cache_delete(instance._old_key)
-
-
 @receiver(post_delete, sender=MiscConfig)
-def misc_config_delete(sender, instance, **kwargs):
-    misc_config_cache_delete(instance.key)
+@receiver(post_save, sender=NavigationBar)
+@receiver(post_delete, sender=NavigationBar)
+def site_config_update(sender, instance, **kwargs):
+    bump_site_config_version()
 
 
 @receiver(post_save, sender=ContestSubmission)
 def contest_submission_update(sender, instance, **kwargs):
-    Submission.objects.filter(id=instance.submission_id).update(contest_object_id=instance.participation.contest_id)
+    SubmissionResultCount.update_submissions(Submission.objects.filter(id=instance.submission_id),
+                                             contest_object_id=instance.participation.contest_id)
+    cache.delete('sub_count_version:contest:%d' % instance.participation.contest_id)
 
 
 @receiver(user_logged_in)
@@ -1,5 +1,8 @@
 from judge.tasks.contest import *
 from judge.tasks.demo import *
+from judge.tasks.pdf import *
 from judge.tasks.rating import *
+from judge.tasks.stats import *
 from judge.tasks.submission import *
+from judge.tasks.texoid import *
 from judge.tasks.user import *
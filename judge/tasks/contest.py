@@ -1,72 +1,198 @@
+import logging
+import os
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
 from celery import shared_task
 from django.conf import settings
-from django.core.exceptions import ImproperlyConfigured
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Max
 from django.utils.translation import gettext as _
-from moss import MOSS
 
-from judge.models import Contest, ContestMoss, ContestParticipation, Submission
+from judge.models import (Contest, ContestMoss, ContestParticipation,
+                          ContestProblem, ContestSubmission, Language, Profile,
+                          Submission, SubmissionSource)
 from judge.utils.celery import Progress
+from judge.utils.moss import get_moss_backend
 
-__all__ = ('rescore_contest', 'run_moss')
+__all__ = ('import_contest_data', 'recompute_participations', 'rescore_contest', 'run_moss')
+logger = logging.getLogger('judge.contest.data')
 
+RECOMPUTE_CHUNK_SIZE = 500
+IMPORT_CHUNK_SIZE = 500
 
-@shared_task(bind=True)
-def rescore_contest(self, contest_key):
-    contest = Contest.objects.get(key=contest_key)
-    participations = contest.users
+CONTEST_DATA_LANGUAGES = {
+    'c': 'C',
+    'cpp': 'CPP17',
+    'java': 'JAVA8',
+    'py': 'PY3',
+    'pas': 'PAS',
+}
 
-    rescored = 0
-    with Progress(self, participations.count(), stage=_('Recalculating contest scores')) as p:
-        for participation in participations.iterator():
-            participation.recompute_results()
-            rescored += 1
-            if rescored % 10 == 0:
-                p.done = rescored
-    return rescored
 
+def recompute_participation_ids(task, participation_ids, stage):
+    participation_ids = sorted(set(participation_ids))
+    with Progress(task, len(participation_ids), stage=stage) as p:
+        for start in range(0, len(participation_ids), RECOMPUTE_CHUNK_SIZE):
+            chunk = participation_ids[start:start + RECOMPUTE_CHUNK_SIZE]
+            ContestParticipation.bulk_recompute_results(
+                ContestParticipation.objects.filter(id__in=chunk).select_related('contest'))
+            p.did(len(chunk))
+    return len(participation_ids)
 
-@shared_task(bind=True)
-def run_moss(self, contest_key):
-    moss_api_key = settings.MOSS_API_KEY
-    if moss_api_key is None:
-        raise ImproperlyConfigured('No MOSS API Key supplied')
 
+@shared_task(bind=True)
+def rescore_contest(self, contest_key):
     contest = Contest.objects.get(key=contest_key)
-    ContestMoss.objects.filter(contest=contest).delete()
+    return recompute_participation_ids(self, contest.users.values_list('id', flat=True),
+                                       _('Recalculating contest scores'))
+
 
-    length = len(ContestMoss.LANG_MAPPING) * contest.problems.count()
-    moss_results = []
+@shared_task(bind=True)
+def recompute_participations(self, participation_ids):
+    return recompute_participation_ids(self, participation_ids, _('Recalculating participation results'))
 
-    with Progress(self, length, stage=_('Running MOSS')) as p:
-        for problem in contest.problems.all():
-            for dmoj_lang, moss_lang in ContestMoss.LANG_MAPPING:
-                result = ContestMoss(contest=contest, problem=problem, language=dmoj_lang)
 
-                subs = Submission.objects.filter(
-                    contest__participation__virtual__in=(ContestParticipation.LIVE, ContestParticipation.SPECTATE),
-                    contest_object=contest,
-                    problem=problem,
-                    language__common_name=dmoj_lang,
-                ).order_by('-points').values_list('user__user__username', 'source__source')
+def moss_pair(backend, contest, problem, dmoj_lang, moss_lang):
+    # Runs in a worker thread, which has its own database connection.
+    try:
+        subs = Submission.objects.filter(
+            contest__participation__virtual__in=(ContestParticipation.LIVE, ContestParticipation.SPECTATE),
+            contest_object=contest,
+            problem=problem,
+            language__common_name=dmoj_lang,
+        ).order_by('-points').values_list('user__user__username', 'source__source')
 
-                if subs.exists():
-                    moss_call = MOSS(moss_api_key, language=moss_lang, matching_file_limit=250,
-                                     comment='%s - %s' % (contest.key, problem.code))
+        sources = {}
+        for username, source in subs:
+            sources.setdefault(username, source)
 
-                    users = set()
+        result = ContestMoss(contest=contest, problem=problem, language=dmoj_lang, submission_count=len(sources))
+        if sources:
+            result.url, result.report = backend.run(sources, moss_lang, '%s - %s' % (contest.key, problem.code))
+        return result
+    finally:
+        connection.close()
 
-                    for username, source in subs:
-                        if username in users:
-                            continue
-                        users.add(username)
-                        moss_call.add_file_from_memory(username, source.encode('utf-8'))
 
-                    result.url = moss_call.process()
-                    result.submission_count = len(users)
+@shared_task(bind=True)
+def run_moss(self, contest_key):
+    backend = get_moss_backend()
+    contest = Contest.objects.get(key=contest_key)
+    ContestMoss.objects.filter(contest=contest).delete()
 
-                moss_results.append(result)
-                p.did(1)
+    pairs = [(problem, dmoj_lang, moss_lang) for problem in contest.problems.all()
+             for dmoj_lang, moss_lang in ContestMoss.LANG_MAPPING]
+
+    # Each check mostly waits on the MOSS service, so they run side by side, and results are saved as they arrive.
+    with Progress(self, len(pairs), stage=_('Running MOSS')) as p, \
+            ThreadPoolExecutor(settings.MOSS_PARALLELISM) as executor:
+        pending = {executor.submit(moss_pair, backend, contest, *pair) for pair in pairs}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            ContestMoss.objects.bulk_create([future.result() for future in done])
+            p.did(len(done))
+
+    return len(pairs)
+
+
+def read_contest_data_members(archive):
+    # Lists the sources in a contest data archive as (profile id, problem order, language key, member name).
+    # Sources are laid out as <profile id>_<anything>/<problem letter>.<extension>.
+    members = []
+    for name in archive.namelist():
+        parts = name.split('/')
+        if len(parts) != 2:
+            continue
+        basename, _sep, ext = parts[1].upper().partition('.')
+        if ext.lower() not in CONTEST_DATA_LANGUAGES or len(basename) != 1:
+            continue
+        try:
+            user_id = int(parts[0].split('_')[0])
+        except ValueError:
+            continue
+        members.append((user_id, ContestProblem.get_order(basename), CONTEST_DATA_LANGUAGES[ext.lower()], name))
+    return members
 
-    ContestMoss.objects.bulk_create(moss_results)
 
-    return len(moss_results)
+@shared_task(bind=True)
+def import_contest_data(self, contest_id, archive_path, clear):
+    contest = Contest.objects.get(id=contest_id)
+    try:
+        with zipfile.ZipFile(archive_path) as archive:
+            members = read_contest_data_members(archive)
+
+            user_ids = set(Profile.objects.filter(id__in={member[0] for member in members})
+                           .values_list('id', flat=True))
+            problems = {problem.order: problem for problem in ContestProblem.objects.filter(contest=contest)}
+            languages = dict(Language.objects.values_list('key', 'id'))
+            # One source is kept per user and problem: the last one in the archive.
+            members = sorted({
+                (member[0], member[1]): member for member in members if member[0] in user_ids and member[1] in problems
+            }.values())
+
+            with transaction.atomic():
+                with Progress(self, 1, stage=_('Clearing old data')) as p:
+                    if clear:
+                        Submission.objects.filter(contest_object=contest).delete()
+                        contest.users.all().delete()
+                    else:
+                        Submission.objects.filter(user_id__in=user_ids, contest_object=contest).delete()
+                        ContestParticipation.objects.filter(user_id__in=user_ids, contest=contest).delete()
+                    p.did(1)
+
+                # bulk_create does not return primary keys on MySQL, so rows are looked up again by their unique
+                # columns: one participation per user, and one submission per user and problem in each chunk, among
+                # those created after the chunk's insert began.
+                ContestParticipation.objects.bulk_create([
+                    ContestParticipation(user_id=user_id, contest=contest) for user_id in user_ids
+                ], batch_size=IMPORT_CHUNK_SIZE)
+                participations = dict(ContestParticipation.objects.filter(contest=contest, user_id__in=user_ids,
+                                                                          virtual=ContestParticipation.LIVE)
+                                      .values_list('user_id', 'id'))
+
+                with Progress(self, len(members), stage=_('Importing submissions')) as p:
+                    for start in range(0, len(members), IMPORT_CHUNK_SIZE):
+                        chunk = members[start:start + IMPORT_CHUNK_SIZE]
+                        sources = {}
+                        submissions = []
+                        for user_id, order, language, name in chunk:
+                            try:
+                                source = archive.read(name).decode('utf-8')
+                            except UnicodeDecodeError:
+                                logger.warning('Skipping %s in contest data for %s: not UTF-8', name, contest.key)
+                                continue
+                            problem = problems[order]
+                            sources[user_id, problem.problem_id] = (source, problem)
+                            submissions.append(Submission(user_id=user_id, problem_id=problem.problem_id,
+                                                          language_id=languages[language], contest_object=contest,
+                                                          date=contest.start_time))
+                        last_id = Submission.objects.aggregate(last_id=Max('id'))['last_id'] or 0
+                        Submission.objects.bulk_create(submissions)
+
+                        source_objects = []
+                        contest_submissions = []
+                        for submission_id, user_id, problem_id in Submission.objects.filter(
+                                id__gt=last_id, contest_object=contest, user_id__in={member[0] for member in chunk},
+                                problem_id__in=[problem_id for _user_id, problem_id in sources],
+                        ).values_list('id', 'user_id', 'problem_id'):
+                            if (user_id, problem_id) not in sources:
+                                continue
+                            source, problem = sources[user_id, problem_id]
+                            source_objects.append(SubmissionSource(submission_id=submission_id, source=source))
+                            contest_submissions.append(ContestSubmission(submission_id=submission_id, problem=problem,
+                                                                         participation_id=participations[user_id]))
+                        SubmissionSource.objects.bulk_create(source_objects)
+                        ContestSubmission.objects.bulk_create(contest_submissions)
+                        p.did(len(chunk))
+    finally:
+        os.unlink(archive_path)
+
+    # bulk_create skips the post_save signals. The new submissions are still queued, with no result, so the
+    # histogram does not change; only the cached submission counts need dropping.
+    cache.delete_many(['sub_count_version:contest:%d' % contest.id] +
+                      ['sub_count_version:user:%d' % user_id for user_id in user_ids] +
+                      ['sub_count_version:problem:%d' % problem.problem_id for problem in problems.values()])
+    contest.update_user_count()
+    return len(members)
@@ -0,0 +1,55 @@
+import os
+from datetime import timedelta
+
+from celery import shared_task
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from judge.models import Contest, ProblemTranslation
+from judge.pdf_problems import HAS_PDF
+from judge.utils.pdf import (PDF_RENDERERS, contest_pdf_path,
+                             pdf_render_failed_key, pdf_render_lock_key,
+                             problem_pdf_path, queue_pdf_render)
+
+__all__ = ('render_pdf_document', 'prewarm_contest_pdfs')
+
+
+@shared_task
+def render_pdf_document(kind, id, language):
+    try:
+        log = PDF_RENDERERS[kind](id, language)
+        if log is not None:
+            if isinstance(log, bytes):
+                log = log.decode('utf-8', 'replace')
+            cache.set(pdf_render_failed_key(kind, id, language), log, settings.DMOJ_PDF_RENDER_FAILURE_TIMEOUT)
+    finally:
+        cache.delete(pdf_render_lock_key(kind, id, language))
+
+
+@shared_task
+def prewarm_contest_pdfs():
+    if not HAS_PDF:
+        return
+
+    now = timezone.now()
+    contests = Contest.objects.filter(start_time__gt=now,
+                                      start_time__lte=now + timedelta(seconds=settings.DMOJ_PDF_PREWARM_WINDOW))
+    for contest in contests:
+        problems = list(contest.problems.values_list('id', 'code'))
+        languages = {settings.LANGUAGE_CODE}
+        languages.update(ProblemTranslation.objects.filter(problem__in=contest.problems.all())
+                         .values_list('language', flat=True))
+
+        for language in languages:
+            if not os.path.exists(contest_pdf_path(contest.key, language)):
+                prewarm_pdf('contest', contest.id, language)
+            for problem_id, code in problems:
+                if not os.path.exists(problem_pdf_path(code, language)):
+                    prewarm_pdf('problem', problem_id, language)
+
+
+def prewarm_pdf(kind, id, language):
+    # A document that just failed to render is left alone until its failure expires, as on a page view.
+    if cache.get(pdf_render_failed_key(kind, id, language)) is None:
+        queue_pdf_render(kind, id, language)
@@ -0,0 +1,11 @@
+from celery import shared_task
+
+from judge.utils.stats import SITE_STATS_PERIODS, update_site_stats
+
+__all__ = ('update_site_stats_snapshots',)
+
+
+@shared_task
+def update_site_stats_snapshots():
+    for period in SITE_STATS_PERIODS:
+        update_site_stats(period)
@@ -3,10 +3,15 @@ from django.core.cache import cache
 from django.utils import timezone
 from django.utils.translation import gettext as _
 
-from judge.models import Problem, Profile, Submission
+from judge.judgeapi import batch_rejudge_submissions
+from judge.models import ContestSubmission, Problem, Profile, Submission
+from judge.tasks.contest import recompute_participation_ids
 from judge.utils.celery import Progress
 
-__all__ = ('apply_submission_filter', 'rejudge_problem_filter', 'rescore_problem')
+__all__ = ('apply_submission_filter', 'rejudge_problem_filter', 'rejudge_submissions', 'rescore_problem',
+           'rescore_submissions')
+
+REJUDGE_CHUNK_SIZE = 1000
 
 
 def apply_submission_filter(queryset, id_range, languages, results):
@@ -22,19 +27,28 @@ def apply_submission_filter(queryset, id_range, languages, results):
     return queryset
 
 
+def _rejudge_ids(task, ids):
+    rejudged = 0
+    with Progress(task, len(ids), stage=_('Rejudging submissions')) as p:
+        for start in range(0, len(ids), REJUDGE_CHUNK_SIZE):
+            chunk = ids[start:start + REJUDGE_CHUNK_SIZE]
+            rejudged += batch_rejudge_submissions(chunk)
+            p.did(len(chunk))
+    return rejudged
+
+
 @shared_task(bind=True)
 def rejudge_problem_filter(self, problem_id, id_range=None, languages=None, results=None):
     queryset = Submission.objects.filter(problem_id=problem_id)
     queryset = apply_submission_filter(queryset, id_range, languages, results)
+    return _rejudge_ids(self, list(queryset.order_by('id').values_list('id', flat=True)))
 
-    rejudged = 0
-    with Progress(self, queryset.count()) as p:
-        for submission in queryset.iterator():
-            submission.judge(rejudge=True, batch_rejudge=True)
-            rejudged += 1
-            if rejudged % 10 == 0:
-                p.done = rejudged
-    return rejudged
+
+@shared_task(bind=True)
+def rejudge_submissions(self, submission_ids):
+    # Locked submissions are never rejudged, as with Submission.judge.
+    queryset = Submission.objects.filter(id__in=submission_ids).exclude(locked_after__lt=timezone.now())
+    return _rejudge_ids(self, list(queryset.order_by('id').values_list('id', flat=True)))
 
 
 @shared_task(bind=True)
@@ -67,3 +81,52 @@ def rescore_problem(self, problem_id):
             if users % 10 == 0:
                 p.done = users
     return rescored
+
+
+def recalculate_user_points(task, user_ids):
+    with Progress(task, len(user_ids), stage=_('Recalculating user points')) as p:
+        for profile in Profile.objects.filter(id__in=user_ids).iterator():
+            profile._updating_stats_only = True
+            profile.calculate_points()
+            cache.delete_many(['user_complete:%d' % profile.id, 'user_attempted:%d' % profile.id])
+            p.did(1)
+
+
+@shared_task(bind=True)
+def rescore_submissions(self, submission_ids):
+    submission_ids = sorted(set(submission_ids))
+    user_ids = set()
+    participation_ids = set()
+
+    with Progress(self, len(submission_ids), stage=_('Modifying submissions')) as p:
+        for start in range(0, len(submission_ids), REJUDGE_CHUNK_SIZE):
+            chunk = submission_ids[start:start + REJUDGE_CHUNK_SIZE]
+            submissions = list(Submission.objects.filter(id__in=chunk).select_related('problem')
+                               .only('user_id', 'points', 'case_points', 'case_total',
+                                     'problem__partial', 'problem__points'))
+            for submission in submissions:
+                submission.points = round(submission.case_points / submission.case_total * submission.problem.points
+                                          if submission.case_total else 0, 1)
+                if not submission.problem.partial and submission.points < submission.problem.points:
+                    submission.points = 0
+                user_ids.add(submission.user_id)
+            Submission.objects.bulk_update(submissions, ['points'])
+
+            # The same as Submission.update_contest, minus recomputing the participation once per submission.
+            contest_submissions = list(ContestSubmission.objects.filter(submission_id__in=chunk)
+                                       .select_related('problem', 'submission')
+                                       .only('points', 'participation_id', 'problem__points', 'problem__partial',
+                                             'submission__case_points', 'submission__case_total'))
+            for contest_submission in contest_submissions:
+                submission, contest_problem = contest_submission.submission, contest_submission.problem
+                contest_submission.points = round(submission.case_points / submission.case_total *
+                                                  contest_problem.points if submission.case_total > 0 else 0, 3)
+                if not contest_problem.partial and contest_submission.points != contest_problem.points:
+                    contest_submission.points = 0
+                participation_ids.add(contest_submission.participation_id)
+            ContestSubmission.objects.bulk_update(contest_submissions, ['points'])
+            p.did(len(chunk))
+
+    recalculate_user_points(self, user_ids)
+    recompute_participation_ids(self, participation_ids, _('Recalculating participation results'))
+    return len(submission_ids)
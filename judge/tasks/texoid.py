@@ -0,0 +1,10 @@
+from celery import shared_task
+
+from judge.utils.texoid import TexoidRenderer
+
+__all__ = ('render_texoid',)
+
+
+@shared_task
+def render_texoid(formulas):
+    TexoidRenderer().render_batch(formulas)
@@ -2,24 +2,39 @@ import fnmatch
 import json
 import os
 import re
+import shutil
+import tempfile
 import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
 
 from celery import shared_task
 from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.db import transaction
+from django.utils import timezone
 from django.utils.translation import gettext as _
 
-from judge.models import Comment, Problem, Submission
+from judge.models import (Comment, Language, Organization, Problem, Profile,
+                          Submission)
 from judge.utils.celery import Progress
 from judge.utils.raw_sql import use_straight_join
 from judge.utils.unicode import utf8bytes
 
-__all__ = ('prepare_user_data',)
+__all__ = ('create_users', 'prepare_user_data')
 rewildcard = re.compile(r'\*+')
 
+CREATE_USERS_CHUNK_SIZE = 200
+CREATED_USERS_TOKEN = re.compile(r'^[0-9a-f]{32}$')
+EXPORT_CHUNK_SIZE = 1000
+
 
 def apply_submission_filter(queryset, options):
     if not options['submission_download']:
-        return []
+        return queryset.none()
 
     use_straight_join(queryset)
 
@@ -34,13 +49,48 @@ def apply_submission_filter(queryset, options):
             problem__in=Problem.objects.filter(code__regex=fnmatch.translate(problem_glob)),
         )
 
-    return list(queryset)
+    return queryset
 
 
 def apply_comment_filter(queryset, options):
     if not options['comment_download']:
-        return []
-    return list(queryset)
+        return queryset.none()
+    return queryset
+
+
+class JSONIndexWriter:
+    # Writes a JSON object one entry at a time to a temporary file, so that the index of a large export is never
+    # held in memory. Given entries in key order, the output is identical to json.dumps(..., sort_keys=True,
+    # indent=4) of the whole dict.
+    def __init__(self):
+        self.file = tempfile.TemporaryFile()
+        self.count = 0
+
+    def add(self, key, value):
+        entry = json.dumps(value, sort_keys=True, indent=4).replace('\n', '\n    ')
+        self.file.write(utf8bytes('%s\n    %s: %s' % (',' if self.count else '{', json.dumps(str(key)), entry)))
+        self.count += 1
+
+    def write_to(self, data_file, name):
+        # Like the rest of the export, the index is left out entirely when it has no entries.
+        if self.count:
+            self.file.write(b'\n}')
+            self.file.seek(0)
+            with data_file.open(name, 'w') as f:
+                shutil.copyfileobj(self.file, f)
+        self.file.close()
+
+
+def export_rows(task, queryset, stage, write):
+    count = queryset.count()
+    if count:
+        with Progress(task, count, stage=stage) as p:
+            interval = max(count // 10, 1)
+            for prepared, row in enumerate(queryset.order_by('id').iterator(chunk_size=EXPORT_CHUNK_SIZE), 1):
+                write(row)
+                if prepared % interval == 0:
+                    p.done = prepared
+    return count
 
 
 @shared_task(bind=True)
@@ -57,65 +107,128 @@ def prepare_user_data(self, profile_id, options):
         comments = apply_comment_filter(Comment.objects.filter(author_id=profile_id), options)
         p.did(1)
 
+    # Rows are read in chunks and each file is written straight into the archive, so memory use does not depend
+    # on the number of submissions or comments.
     with zipfile.ZipFile(os.path.join(settings.DMOJ_USER_DATA_CACHE, '%s.zip' % profile_id), mode='w') as data_file:
-        submission_count = len(submissions)
-        if submission_count:
-            submission_info = {}
-            with Progress(self, submission_count, stage=_('Preparing your submission data')) as p:
-                prepared = 0
-                interval = max(submission_count // 10, 1)
-                for submission in submissions:
-                    submission_info[submission.id] = {
-                        'problem': submission.problem.code,
-                        'date': submission.date.isoformat(),
-                        'time': submission.time,
-                        'memory': submission.memory,
-                        'language': submission.language.key,
-                        'status': submission.status,
-                        'result': submission.result,
-                        'case_points': submission.case_points,
-                        'case_total': submission.case_total,
-                    }
-                    with data_file.open(
-                        'submissions/%s.%s' % (submission.id, submission.language.extension),
-                        'w',
-                    ) as f:
-                        f.write(utf8bytes(submission.source.source))
-
-                    prepared += 1
-                    if prepared % interval == 0:
-                        p.done = prepared
-
-                with data_file.open('submissions/info.json', 'w') as f:
-                    f.write(utf8bytes(json.dumps(submission_info, sort_keys=True, indent=4)))
-
-        comment_count = len(comments)
-        if comment_count:
-            comment_info = {}
-            with Progress(self, comment_count, stage=_('Preparing your comment data')) as p:
-                prepared = 0
-                interval = max(comment_count // 10, 1)
-                for comment in comments:
-                    related_object = {
-                        'b': 'blog post',
-                        'c': 'contest',
-                        'p': 'problem',
-                        's': 'problem editorial',
-                    }
-                    comment_info[comment.id] = {
-                        'date': comment.time.isoformat(),
-                        'related_object': related_object[comment.page[0]],
-                        'page': comment.page[2:],
-                        'score': comment.score,
-                    }
-                    with data_file.open('comments/%s.txt' % comment.id, 'w') as f:
-                        f.write(utf8bytes(comment.body))
-
-                    prepared += 1
-                    if prepared % interval == 0:
-                        p.done = prepared
-
-                with data_file.open('comments/info.json', 'w') as f:
-                    f.write(utf8bytes(json.dumps(comment_info, sort_keys=True, indent=4)))
+        submission_info = JSONIndexWriter()
+
+        def write_submission(submission):
+            submission_info.add(submission.id, {
+                'problem': submission.problem.code,
+                'date': submission.date.isoformat(),
+                'time': submission.time,
+                'memory': submission.memory,
+                'language': submission.language.key,
+                'status': submission.status,
+                'result': submission.result,
+                'case_points': submission.case_points,
+                'case_total': submission.case_total,
+            })
+            with data_file.open('submissions/%s.%s' % (submission.id, submission.language.extension), 'w') as f:
+                f.write(utf8bytes(submission.source.source))
+
+        submission_count = export_rows(self, submissions, _('Preparing your submission data'), write_submission)
+        submission_info.write_to(data_file, 'submissions/info.json')
+
+        comment_info = JSONIndexWriter()
+        related_object = {
+            'b': 'blog post',
+            'c': 'contest',
+            'p': 'problem',
+            's': 'problem editorial',
+        }
+
+        def write_comment(comment):
+            comment_info.add(comment.id, {
+                'date': comment.time.isoformat(),
+                'related_object': related_object[comment.page[0]],
+                'page': comment.page[2:],
+                'score': comment.score,
+            })
+            with data_file.open('comments/%s.txt' % comment.id, 'w') as f:
+                f.write(utf8bytes(comment.body))
+
+        comment_count = export_rows(self, comments, _('Preparing your comment data'), write_comment)
+        comment_info.write_to(data_file, 'comments/info.json')
 
     return submission_count + comment_count
+
+
+@shared_task(bind=True)
+def create_users(self, rows, token):
+    """
+    Creates accounts with random passwords, replacing any existing user with the same username.
+
+    Each row is a dict with the keys index, username, email, name, verified, expire_days and organization. The
+    passwords are kept out of the task result: [index, name, username, password, expiration date, organization name]
+    for each created account is written to created_users_path(token), readable only by the site, and the number of
+    accounts is returned.
+    """
+    for row in rows:
+        row['username'] = User.normalize_username(row['username'])
+        row['organization'] = int(row['organization']) if row['organization'] else None
+    rows = list({row['username']: row for row in rows}.values())
+    passwords = [User.objects.make_random_password() for row in rows]
+
+    # PBKDF2 runs in OpenSSL without holding the GIL, so threads hash in parallel. A process pool cannot be used,
+    # as Celery's prefork workers are daemonic and may not have children.
+    hashes = []
+    with Progress(self, len(rows), stage=_('Hashing passwords')) as p, \
+            ThreadPoolExecutor(settings.DMOJ_PASSWORD_HASH_THREADS) as executor:
+        for start in range(0, len(rows), CREATE_USERS_CHUNK_SIZE):
+            chunk = passwords[start:start + CREATE_USERS_CHUNK_SIZE]
+            hashes += executor.map(make_password, chunk)
+            p.did(len(chunk))
+
+    now = timezone.now()
+    language = Language.get_default_language()
+    organizations = dict(Organization.objects.filter(id__in={row['organization'] for row in rows})
+                         .values_list('id', 'name'))
+    expiration_dates = [now + timedelta(days=row['expire_days']) if row['expire_days'] else None for row in rows]
+
+    with transaction.atomic(), Progress(self, len(rows), stage=_('Creating accounts')) as p:
+        User.objects.filter(username__in=[row['username'] for row in rows]).delete()
+
+        # bulk_create does not return primary keys on MySQL, so the new users and profiles are looked up again.
+        accounts = list(zip(rows, hashes, expiration_dates))
+        memberships = []
+        for start in range(0, len(accounts), CREATE_USERS_CHUNK_SIZE):
+            chunk = accounts[start:start + CREATE_USERS_CHUNK_SIZE]
+            User.objects.bulk_create([
+                User(username=row['username'], email=User.objects.normalize_email(row['email'] or ''),
+                     password=hashed)
+                for row, hashed, expiration_date in chunk
+            ])
+            user_ids = dict(User.objects.filter(username__in=[row['username'] for row, _hash, _date in chunk])
+                            .values_list('username', 'id'))
+            Profile.objects.bulk_create([
+                Profile(user_id=user_ids[row['username']], name=row['name'], language=language,
+                        verified=row['verified'], expiration_date=expiration_date)
+                for row, hashed, expiration_date in chunk
+            ])
+            profile_ids = dict(Profile.objects.filter(user_id__in=user_ids.values()).values_list('user_id', 'id'))
+            memberships += [
+                Profile.organizations.through(profile_id=profile_ids[user_ids[row['username']]],
+                                              organization_id=row['organization'])
+                for row, hashed, expiration_date in chunk if row['organization'] in organizations
+            ]
+            p.did(len(chunk))
+        Profile.organizations.through.objects.bulk_create(memberships)
+
+    cache.delete_many([make_template_fragment_key('org_member_count', (org_id,)) for org_id in organizations])
+
+    accounts = [
+        [row['index'], row['name'] or '', row['username'], password,
+         expiration_date.strftime('%Y-%m-%d %H:%M:%S') if expiration_date else '',
+         organizations.get(row['organization'], '')]
+        for row, password, expiration_date in zip(rows, passwords, expiration_dates)
+    ]
+    with os.fdopen(os.open(created_users_path(token), os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600), 'w') as f:
+        json.dump(accounts, f)
+    return len(accounts)
+
+
+def created_users_path(token):
+    if not CREATED_USERS_TOKEN.match(token):
+        raise ValueError('Invalid created users token')
+    return os.path.join(settings.DMOJ_CREATED_USERS_DIR, 'created_users_%s.json' % token)
@@ -4,13 +4,13 @@ from django.conf import settings
 from django.contrib.auth.context_processors import PermWrapper
 from django.contrib.auth.models import AnonymousUser
 from django.contrib.sites.shortcuts import get_current_site
-from django.core.cache import cache
 from django.urls import reverse
 from django.utils.functional import SimpleLazyObject, new_method_proxy
 from django.utils.translation import gettext_lazy as _
 
-from judge.models import MiscConfig, NavigationBar, Profile
+from judge.models import Profile
 from judge.utils.caniuse import CanIUse
+from judge.utils.site_config import get_site_config
 
 
 class FixedSimpleLazyObject(SimpleLazyObject):
@@ -72,7 +72,7 @@ def general_info(request):
     version = getattr(settings, "STATIC_VERSION", random.randint(1, 1000000000))
     return {
         "nav_tab": __nav_tab(request),
-        "nav_bar": NavigationBar.objects.all(),
+        "nav_bar": get_site_config()["nav_bar"],
         "LOGIN_RETURN_PATH": "" if path.startswith("/accounts/") else path,
         "perms": PermWrapper(getattr(request, "user", AnonymousUser())),
         "HAS_WEBAUTHN": bool(settings.WEBAUTHN_RP_ID),
@@ -93,22 +93,17 @@ class MiscConfigDict(dict):
         super(MiscConfigDict, self).__init__()
 
     def __missing__(self, key):
-        cache_key = "misc_config:%s:%s:%s" % (self.site, self.language, key)
-        value = cache.get(cache_key)
-        if value is None:
-            keys = ["%s.%s" % (key, self.language), key] if self.language else [key]
-            if self.site is not None:
-                keys = ["%s:%s" % (self.site, key) for key in keys] + keys
-            map = dict(
-                MiscConfig.objects.values_list("key", "value").filter(key__in=keys),
-            )
-            for item in keys:
-                if item in map:
-                    value = map[item]
-                    break
-            else:
-                value = ""
-            cache.set(cache_key, value, 86400)
+        # Site and language specific values take precedence, all resolved from the in-memory site config.
+        keys = ["%s.%s" % (key, self.language), key] if self.language else [key]
+        if self.site is not None:
+            keys = ["%s:%s" % (self.site, key) for key in keys] + keys
+        config = get_site_config()["misc_config"]
+        for item in keys:
+            if item in config:
+                value = config[item]
+                break
+        else:
+            value = ""
         self[key] = value
         return value
 
@@ -1 +1,105 @@
-# Create your tests here.
+import math
+import random
+
+from django.test import SimpleTestCase, tag
+
+from judge.ratings import WP, normal_CDF_inverse, recalculate_ratings
+
+
+def reference_recalculate_ratings(old_rating, old_volatility, actual_rank, times_rated, is_disqualified):
+    # The original pure-Python implementation, kept to check the vectorized one against.
+    N = len(old_rating)
+    new_rating = old_rating[:]
+    new_volatility = old_volatility[:]
+    if N <= 5:
+        return new_rating, new_volatility
+
+    ave_rating = float(sum(old_rating)) / N
+    sum1 = sum(i * i for i in old_volatility) / N
+    sum2 = sum((i - ave_rating) ** 2 for i in old_rating) / (N - 1)
+    CF = math.sqrt(sum1 + sum2)
+
+    for i in range(N):
+        ERank = 0.5
+        for j in range(N):
+            ERank += WP(old_rating[i], old_rating[j], old_volatility[i], old_volatility[j])
+
+        EPerf = -normal_CDF_inverse((ERank - 0.5) / N)
+        APerf = -normal_CDF_inverse((actual_rank[i] - 0.5) / N)
+        PerfAs = old_rating[i] + CF * (APerf - EPerf)
+        Weight = 1.0 / (1 - (0.42 / (times_rated[i] + 1) + 0.18)) - 1.0
+        if old_rating[i] > 2500:
+            Weight *= 0.8
+        elif old_rating[i] >= 2000:
+            Weight *= 0.9
+
+        Cap = 150.0 + 1500.0 / (times_rated[i] + 2)
+
+        new_rating[i] = (old_rating[i] + Weight * PerfAs) / (1.0 + Weight)
+
+        if times_rated[i] == 0:
+            new_volatility[i] = 385
+        else:
+            new_volatility[i] = math.sqrt(((new_rating[i] - old_rating[i]) ** 2) / Weight +
+                                          (old_volatility[i] ** 2) / (Weight + 1))
+
+        if is_disqualified[i]:
+            new_volatility[i] = min(new_volatility[i], old_volatility[i])
+
+        if abs(old_rating[i] - new_rating[i]) > Cap:
+            if old_rating[i] < new_rating[i]:
+                new_rating[i] = old_rating[i] + Cap
+            else:
+                new_rating[i] = old_rating[i] - Cap
+
+    adjust = float(sum(old_rating) - sum(new_rating)) / N
+    new_rating = list(map(adjust.__add__, new_rating))
+    best_rank = min(actual_rank)
+    for i in range(N):
+        if abs(actual_rank[i] - best_rank) <= 1e-3 and new_rating[i] < old_rating[i] + 1:
+            new_rating[i] = old_rating[i] + 1
+    return list(map(int, map(round, new_rating))), list(map(int, map(round, new_volatility)))
+
+
+def make_contest(N, seed):
+    rng = random.Random(seed)
+    times_rated = [rng.choice((0, 0, 1, 2, 5, 20)) for _ in range(N)]
+    old_rating = [600 if times == 0 else rng.randint(300, 3200) for times in times_rated]
+    old_volatility = [400 if times == 0 else rng.randint(80, 600) for times in times_rated]
+    is_disqualified = [rng.random() < 0.02 for _ in range(N)]
+
+    # Ranks with ties, averaged the same way tie_ranker does.
+    scores = sorted((rng.randint(0, N // 3) for _ in range(N)), reverse=True)
+    actual_rank = []
+    i = 0
+    while i < N:
+        j = i
+        while j < N and scores[j] == scores[i]:
+            j += 1
+        actual_rank += [(i + 1 + j) / 2.0] * (j - i)
+        i = j
+    return old_rating, old_volatility, actual_rank, times_rated, is_disqualified
+
+
+class RecalculateRatingsTestCase(SimpleTestCase):
+    def assertMatchesReference(self, N, seed):
+        contest = make_contest(N, seed)
+        self.assertEqual(recalculate_ratings(*contest), reference_recalculate_ratings(*contest))
+
+    def test_small_contests(self):
+        for N in (1, 5, 6, 10, 37):
+            for seed in range(5):
+                with self.subTest(N=N, seed=seed):
+                    self.assertMatchesReference(N, seed)
+
+    def test_large_contests(self):
+        for N in (100, 1000):
+            with self.subTest(N=N):
+                self.assertMatchesReference(N, N)
+
+    # The reference is quadratic and takes most of a minute, so this only runs with --tag slow.
+    @tag('slow')
+    def test_huge_contests(self):
+        for N in (3000, 10000):
+            with self.subTest(N=N):
+                self.assertMatchesReference(N, N)
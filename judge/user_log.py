@@ -1,5 +1,6 @@
 from django.utils.timezone import now
 
+from judge.database_router import untracked_writes
 from judge.models import Profile
 
 
@@ -16,6 +17,7 @@ class LogUserAccessMiddleware(object):
             # Decided on using REMOTE_ADDR as nginx will translate it to the external IP that hits it.
             if request.META.get('REMOTE_ADDR'):
                 updates['ip'] = request.META.get('REMOTE_ADDR')
-            Profile.objects.filter(user_id=request.user.pk).update(**updates)
+            with untracked_writes():
+                Profile.objects.filter(user_id=request.user.pk).update(**updates)
 
         return response
@@ -0,0 +1,97 @@
+import hashlib
+import uuid
+from datetime import date, datetime, time, timedelta
+
+from django.core.cache import cache
+from django.db.models import Max, Min, Q
+from django.utils.timezone import make_aware
+
+CONTEST_CALENDAR_VERSION_KEY = 'contest_cal_version'
+CONTEST_CALENDAR_TIMEOUT = 86400
+
+# Every month grid, whatever its first weekday or the viewer's timezone, lies within this many days of the month.
+MONTH_PADDING = timedelta(days=8)
+
+
+def bump_contest_calendar_version():
+    cache.set(CONTEST_CALENDAR_VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def _get_version():
+    version = cache.get(CONTEST_CALENDAR_VERSION_KEY)
+    if version is None:
+        cache.add(CONTEST_CALENDAR_VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(CONTEST_CALENDAR_VERSION_KEY)
+    return version
+
+
+def _get_scopes(user):
+    # The sets of contests that together make up Contest.get_visible_contests(user), named by who can see them.
+    public = Q(is_visible=True) & (Q(is_organization_private=False, is_private=False) | Q(is_public_contest=True))
+    if not user.is_authenticated:
+        return {'public': public}
+    if user.has_perm('judge.see_private_contest') or user.has_perm('judge.edit_all_contest'):
+        return {'all': Q()}
+
+    profile = user.profile
+    org_ids = sorted(profile.organizations.filter(is_hidden=False).values_list('id', flat=True))
+    scopes = {'public': public}
+    for org_id in org_ids:
+        scopes['org:%d' % org_id] = Q(is_visible=True, is_organization_private=True, is_private=False,
+                                      organizations=org_id)
+
+    # Contests the user was added to. Private organization contests also depend on the user's organizations, so
+    # those are part of the name.
+    orgs_digest = hashlib.sha1(','.join(map(str, org_ids)).encode('ascii')).hexdigest()[:12]
+    scopes['user:%d:%s' % (profile.id, orgs_digest)] = Q(is_visible=True) & (
+        Q(view_contest_scoreboard=profile) |
+        Q(is_organization_private=False, is_private=True, private_contestants=profile) |
+        Q(is_organization_private=True, is_private=True, organizations__in=org_ids, private_contestants=profile)
+    ) | Q(authors=profile) | Q(curators=profile) | Q(testers=profile)
+    return scopes
+
+
+def get_calendar_contests(user, year, month):
+    """
+    Return the contests `user` can see that start or end around the given month, as dicts of id, key, name,
+    start_time and end_time, ordered by start time.
+
+    Each set of contests the user's visibility is made of (public contests, those of each of their organizations and
+    those they were personally added to) is cached separately per month, so most visitors share the same entries.
+    All of them are named after a version token, which is replaced whenever a contest changes.
+    """
+    from judge.models import Contest
+
+    version = _get_version()
+    scopes = _get_scopes(user)
+    keys = {'contest_cal:%s:%d-%02d:%s' % (version, year, month, scope): scope for scope in scopes}
+    cached = cache.get_many(keys.keys())
+
+    first = date(year, month, 1)
+    start = make_aware(datetime.combine(first - MONTH_PADDING, time.min))
+    end = make_aware(datetime.combine(first + timedelta(days=31) + MONTH_PADDING, time.min))
+
+    missing = {}
+    for key, scope in keys.items():
+        if key not in cached:
+            contests = Contest.objects.filter(scopes[scope]) \
+                .filter(Q(start_time__gte=start, start_time__lt=end) | Q(end_time__gte=start, end_time__lt=end)) \
+                .values('id', 'key', 'name', 'start_time', 'end_time').distinct()
+            missing[key] = cached[key] = list(contests)
+    if missing:
+        cache.set_many(missing, CONTEST_CALENDAR_TIMEOUT)
+
+    contests = {contest['id']: contest for entries in cached.values() for contest in entries}
+    return sorted(contests.values(), key=lambda contest: (contest['start_time'], contest['key']))
+
+
+def get_contest_month_bounds():
+    """Return the earliest start_time and the latest end_time of any contest, as {'min': ..., 'max': ...}."""
+    from judge.models import Contest
+
+    key = 'contest_cal:%s:bounds' % _get_version()
+    bounds = cache.get(key)
+    if bounds is None:
+        bounds = Contest.objects.aggregate(min=Min('start_time'), max=Max('end_time'))
+        cache.set(key, bounds, CONTEST_CALENDAR_TIMEOUT)
+    return bounds
@@ -1,13 +1,18 @@
+import inspect
 import math
 from functools import reduce
 
+from django.core.cache import cache
 from django.core.paginator import InvalidPage, Page, Paginator
+from django.utils.functional import cached_property
+from django.utils.inspect import method_has_no_args
 
 __all__ = (
     'InvalidPage',
     'ExPaginator',
     'DiggPaginator',
     'QuerySetDiggPaginator',
+    'CountCachedDiggPaginator',
 )
 
 
@@ -284,6 +289,74 @@ class DiggPage(Page):
 
 QuerySetDiggPaginator = DiggPaginator
 
+
+class CountCachedDiggPaginator(DiggPaginator):
+    """A ``DiggPaginator`` that avoids counting the whole object list.
+
+    If ``count_key`` is given, the total is read from (and stored into) the
+    cache under that key for ``count_timeout`` seconds. Otherwise, the total
+    is counted only up to ``count_cap`` items, or up to the page after the
+    requested one if that is further; if the list is longer than that,
+    ``is_capped`` is set and the paginator switches to ``align_left`` mode,
+    since the last page is not actually known.
+
+    >>> paginator = CountCachedDiggPaginator(range(1, 1000), 10, count_cap=100)
+    >>> paginator.count, paginator.is_capped
+    (100, True)
+    >>> paginator.page(50), paginator.count
+    (<Page 50 of 51>, 510)
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.count_key = kwargs.pop('count_key', None)
+        self.count_timeout = kwargs.pop('count_timeout', 600)
+        self.count_cap = kwargs.pop('count_cap', None)
+        self.is_capped = False
+        super(CountCachedDiggPaginator, self).__init__(*args, **kwargs)
+
+    def _count(self, object_list):
+        c = getattr(object_list, 'count', None)
+        if callable(c) and not inspect.isbuiltin(c) and method_has_no_args(c):
+            return c()
+        return len(object_list)
+
+    @cached_property
+    def count(self):
+        if self.count_key is not None:
+            count = cache.get(self.count_key)
+            if count is None:
+                count = self._count(self.object_list)
+                cache.set(self.count_key, count, self.count_timeout)
+            return count
+
+        if self.count_cap is not None:
+            count = self._count(self.object_list[:self.count_cap + 1])
+            if count > self.count_cap:
+                self.is_capped = True
+                self.align_left = True
+                return self.count_cap
+            return count
+
+        return self._count(self.object_list)
+
+    def page(self, number, *args, **kwargs):
+        if self.count_key is None and self.count_cap is not None:
+            try:
+                cap = (int(number) + 1) * self.per_page
+            except (TypeError, ValueError):
+                pass  # validate_number reports it.
+            else:
+                # Count far enough to know whether the requested page and the one after it exist, so that pages past
+                # the cap can still be reached.
+                if cap > self.count_cap:
+                    self.count_cap = cap
+                    self.__dict__.pop('count', None)
+                    self.__dict__.pop('num_pages', None)
+        # Evaluate the count first, so that ``align_left`` is known before the page ranges are built.
+        self.count
+        return super(CountCachedDiggPaginator, self).page(number, *args, **kwargs)
+
+
 if __name__ == "__main__":
     import doctest
 
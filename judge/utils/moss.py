@@ -0,0 +1,41 @@
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+from moss import MOSS, MOSS_LANG_PYTHON
+
+from judge.utils.winnowing import compare
+
+
+class RemoteMossBackend:
+    # Submits the sources to the MOSS service at Stanford, which hosts the report.
+    @classmethod
+    def is_available(cls):
+        return settings.MOSS_API_KEY is not None
+
+    def __init__(self):
+        if settings.MOSS_API_KEY is None:
+            raise ImproperlyConfigured('No MOSS API Key supplied')
+
+    def run(self, sources, language, comment):
+        moss_call = MOSS(settings.MOSS_API_KEY, language=language, matching_file_limit=250, comment=comment)
+        for username, source in sources.items():
+            moss_call.add_file_from_memory(username, source.encode('utf-8'))
+        return moss_call.process(), None
+
+
+class LocalMossBackend:
+    # Compares the sources on this host with judge.utils.winnowing. The matching pairs are kept as the report.
+    @classmethod
+    def is_available(cls):
+        return True
+
+    def run(self, sources, language, comment):
+        return None, compare(sources, comments='python' if language == MOSS_LANG_PYTHON else 'c')
+
+
+def get_moss_backend():
+    return import_string(settings.MOSS_BACKEND)()
+
+
+def moss_available():
+    return import_string(settings.MOSS_BACKEND).is_available()
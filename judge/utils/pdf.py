@@ -0,0 +1,147 @@
+import logging
+import os
+import shutil
+import tempfile
+from urllib.parse import urljoin
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.template.loader import get_template
+from django.urls import reverse
+from django.utils import translation
+from django.utils.translation import gettext as _
+
+from judge.models import Contest, Problem, ProblemTranslation, SampleContest
+from judge.pdf_problems import DefaultPdfMaker
+from judge.utils.views import generic_message
+
+logger = logging.getLogger('judge.problem.pdf')
+
+PDF_ASSETS = ['full_style.css', 'pygment-github.css', 'icons/logo.svg']
+
+
+def problem_pdf_path(code, language):
+    return os.path.join(settings.PDF_PROBLEM_CACHE, '%s.%s.pdf' % (code, language))
+
+
+def contest_pdf_path(key, language):
+    return os.path.join(settings.PDF_CONTEST_CACHE, '%s.%s.pdf' % (key, language))
+
+
+def sample_contest_pdf_path(id, language):
+    return os.path.join(settings.PDF_CONTEST_CACHE, 'sample.%d.%s.pdf' % (id, language))
+
+
+def get_translation(problem, language):
+    try:
+        return problem.translations.get(language=language)
+    except ProblemTranslation.DoesNotExist:
+        return None
+
+
+def render_pdf(name, path, template, context, title, assets=PDF_ASSETS):
+    # Returns None on success, or the maker's log if the render failed.
+    logger.info('Rendering: %s', os.path.basename(path))
+    with DefaultPdfMaker() as maker:
+        maker.html = get_template(template).render(dict(context, math_engine=maker.math_engine)) \
+            .replace('"//', '"https://').replace("'//", "'https://")
+        maker.title = title
+
+        if maker.math_engine == 'jax':
+            assets = assets + ['mathjax_config.js']
+        for file in assets:
+            maker.load(os.path.basename(file), os.path.join(settings.RESOURCES, file))
+        maker.make()
+        if not maker.success:
+            logger.error('Failed to render PDF for %s', name)
+            return maker.log
+
+        # Move into place atomically, so that a half-copied file is never served. Each render gets its own temporary
+        # file, since the same document may be rendered twice at once.
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=os.path.basename(path) + '.', suffix='.tmp')
+        os.close(fd)
+        try:
+            shutil.move(maker.pdffile, tmp)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+
+
+def render_problem_pdf(problem_id, language):
+    problem = Problem.objects.get(id=problem_id)
+    trans = get_translation(problem, language)
+    problem_name = problem.name if trans is None else trans.name
+    with translation.override(language):
+        return render_pdf(problem.code, problem_pdf_path(problem.code, language), 'problem/raw.html', {
+            'problem': problem,
+            'problem_name': problem_name,
+            'description': problem.description if trans is None else trans.description,
+            'url': urljoin(settings.SITE_FULL_URL, reverse('problem_pdf', args=(problem.code, language))),
+        }, problem_name)
+
+
+def get_contest_problems(contest, language):
+    problems = []
+    for cproblem in contest.contest_problems.select_related('problem').order_by('order'):
+        trans = get_translation(cproblem.problem, language)
+        problems.append((cproblem.problem, cproblem.problem.name if trans is None else trans.name,
+                         cproblem.problem.description if trans is None else trans.description))
+    return problems
+
+
+def render_contest_pdf(contest_id, language):
+    contest = Contest.objects.get(id=contest_id)
+    with translation.override(language):
+        return render_pdf(contest.key, contest_pdf_path(contest.key, language), 'contest/raw.html', {
+            'contest': contest,
+            'problems': get_contest_problems(contest, language),
+            'url': urljoin(settings.SITE_FULL_URL, reverse('contest_pdf', args=(contest.key,))),
+        }, contest.name)
+
+
+def render_sample_contest_pdf(contest_id, language):
+    contest = SampleContest.objects.get(id=contest_id)
+    with translation.override(language):
+        return render_pdf(contest.key, sample_contest_pdf_path(contest.id, language), 'contest/raw.html', {
+            'contest': contest,
+            'problems': get_contest_problems(contest, language),
+            'url': urljoin(settings.SITE_FULL_URL, reverse('sample_contest_pdf', args=(contest.id,))),
+        }, contest.name, assets=['style.css', 'pygment-github.css'])
+
+
+PDF_RENDERERS = {
+    'problem': render_problem_pdf,
+    'contest': render_contest_pdf,
+    'sample': render_sample_contest_pdf,
+}
+
+
+def pdf_render_lock_key(kind, id, language):
+    return 'pdf_render:%s:%d:%s' % (kind, id, language)
+
+
+def pdf_render_failed_key(kind, id, language):
+    return 'pdf_render_failed:%s:%d:%s' % (kind, id, language)
+
+
+def queue_pdf_render(kind, id, language):
+    # Renders of the same document are deduplicated while one is queued or running.
+    from judge.tasks import render_pdf_document
+
+    if cache.add(pdf_render_lock_key(kind, id, language), True, settings.DMOJ_PDF_RENDER_LOCK_TIMEOUT):
+        render_pdf_document.delay(kind, id, language)
+
+
+def pdf_pending_response(request, kind, id, language):
+    log = cache.get(pdf_render_failed_key(kind, id, language))
+    if log is not None:
+        return HttpResponse(log, status=500, content_type='text/plain')
+
+    queue_pdf_render(kind, id, language)
+    response = generic_message(request, _('Rendering PDF'),
+                               _('The PDF is being rendered. This page will refresh once it is ready.'), status=202)
+    response['Refresh'] = str(settings.DMOJ_PDF_RENDER_REFRESH)
+    return response
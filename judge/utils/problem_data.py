@@ -5,6 +5,7 @@ import zipfile
 
 import yaml
 from django.conf import settings
+from django.core.cache import cache
 from django.core.files.base import ContentFile
 from django.core.files.storage import FileSystemStorage
 from django.urls import reverse
@@ -64,30 +65,31 @@ def get_testcase_data(archive, case):
     }
 
 
-def get_problem_testcases_data(problem):
-    """ Read test data of a problem and store
-    result in a dictionary.
-
-    If an error occurs, this method will return an empty dict.
-    """
+def open_init_archive(problem):
     from judge.models import problem_data_storage
 
     init_path = '%s/init.yml' % problem.code
     if not problem_data_storage.exists(init_path):
-        return {}
+        return None
 
     init_content = yaml.safe_load(problem_data_storage.open(init_path).read())
     archive_path = init_content.get('archive', None)
     if not archive_path:
-        return {}
+        return None
 
     archive_path = '%s/%s' % (problem.code, archive_path)
     if not problem_data_storage.exists(archive_path):
-        return {}
+        return None
 
     try:
-        archive = zipfile.ZipFile(problem_data_storage.open(archive_path))
+        return zipfile.ZipFile(problem_data_storage.open(archive_path))
     except zipfile.BadZipfile:
+        return None
+
+
+def read_testcases_data(problem):
+    archive = open_init_archive(problem)
+    if archive is None:
         return {}
 
     testcases_data = {}
@@ -95,17 +97,67 @@ def get_problem_testcases_data(problem):
     # - Support manually managed problems
     # - Support pretest
     order = 0
-    for case in problem.cases.all().order_by('order'):
-        try:
-            if not case.input_file:
-                continue
-            order += 1
-            testcases_data[order] = get_testcase_data(archive, case)
-        except Exception:
-            return {}
+    with archive:
+        for case in problem.cases.all().order_by('order'):
+            try:
+                if not case.input_file:
+                    continue
+                order += 1
+                testcases_data[order] = get_testcase_data(archive, case)
+            except Exception:
+                return {}
     return testcases_data
 
 
+def read_archive_files(problem):
+    from judge.models import ProblemData
+
+    try:
+        data = problem.data_files
+    except ProblemData.DoesNotExist:
+        return []
+    if not data.zipfile:
+        return []
+
+    try:
+        with zipfile.ZipFile(data.zipfile.path) as archive:
+            return [(info.filename, info.file_size) for info in archive.infolist()]
+    except (zipfile.BadZipfile, OSError):
+        return []
+
+
+def problem_data_manifest_key(problem_id):
+    return 'problem_data_manifest:%d' % problem_id
+
+
+def build_problem_data_manifest(problem):
+    """ Read the problem's test data archive once, recording the names and
+    sizes of its members and the previews of every test case, and cache
+    the result until the problem data changes again.
+    """
+    manifest = {
+        'files': read_archive_files(problem),
+        'cases': read_testcases_data(problem),
+    }
+    cache.set(problem_data_manifest_key(problem.id), manifest, None)
+    return manifest
+
+
+def get_problem_data_manifest(problem):
+    manifest = cache.get(problem_data_manifest_key(problem.id))
+    if manifest is None:
+        manifest = build_problem_data_manifest(problem)
+    return manifest
+
+
+def get_problem_testcases_data(problem):
+    """ Get the previews of a problem's test cases, keyed by case order.
+
+    If an error occurs while reading the archive, this will be an empty dict.
+    """
+    return get_problem_data_manifest(problem)['cases']
+
+
 class ProblemDataCompiler(object):
     def __init__(self, problem, data, cases, files):
         self.problem = problem
@@ -115,8 +167,13 @@ class ProblemDataCompiler(object):
 
         self.generator = data.generator
 
+    normalized_case_fields = ('is_pretest', 'input_file', 'output_file', 'generator_args', 'checker', 'checker_args')
+
     def make_init(self):
+        from judge.models import ProblemTestCase
+
         cases = []
+        updated_cases = []
         batch = None
 
         def end_batch():
@@ -205,7 +262,7 @@ class ProblemDataCompiler(object):
                     data['checker'] = make_checker(case)
                 else:
                     case.checker_args = ''
-                case.save(update_fields=('checker_args', 'is_pretest'))
+                updated_cases.append(case)
                 (batch['batched'] if batch else cases).append(data)
             elif case.type == 'S':
                 if batch:
@@ -229,7 +286,7 @@ class ProblemDataCompiler(object):
                     case.checker_args = ''
                 case.input_file = ''
                 case.output_file = ''
-                case.save(update_fields=('checker_args', 'input_file', 'output_file'))
+                updated_cases.append(case)
             elif case.type == 'E':
                 if not batch:
                     raise ProblemDataError(_('Attempt to end batch outside of one in case #%d') % i)
@@ -239,12 +296,15 @@ class ProblemDataCompiler(object):
                 case.generator_args = ''
                 case.checker = ''
                 case.checker_args = ''
-                case.save()
+                updated_cases.append(case)
                 end_batch()
                 batch = None
         if batch:
             end_batch()
 
+        # Write back the normalized cases in one go rather than a query per case.
+        ProblemTestCase.objects.bulk_update(updated_cases, self.normalized_case_fields, batch_size=1000)
+
         init = {}
 
         if self.data.zipfile:
@@ -297,6 +357,7 @@ class ProblemDataCompiler(object):
                 # judge-server#670 will not update cache on empty init.yml,
                 # but will do so if there is no init.yml, so we delete the init.yml
                 problem_data_storage.delete(yml_file)
+        build_problem_data_manifest(self.problem)
 
     @classmethod
     def generate(cls, *args, **kwargs):
@@ -2,15 +2,16 @@ from collections import defaultdict
 from math import e
 
 from django.core.cache import cache
-from django.db.models import Case, Count, ExpressionWrapper, F, Max, When
+from django.db.models import Case, Count, ExpressionWrapper, F, Max, Sum, When
 from django.db.models.fields import FloatField
 from django.utils import timezone
 from django.utils.translation import gettext as _
 from django.utils.translation import gettext_noop
 
-from judge.models import Problem, Submission
+from judge.models import Problem, Submission, SubmissionResultCount
 
-__all__ = ['contest_completed_ids', 'get_result_data', 'user_completed_ids', 'user_editable_ids', 'user_tester_ids']
+__all__ = ['contest_completed_ids', 'get_result_data', 'get_precomputed_result_data', 'user_completed_ids',
+           'user_editable_ids', 'user_tester_ids']
 
 
 def user_tester_ids(profile):
@@ -94,6 +95,21 @@ def get_result_data(*args, **kwargs):
     return _get_result_data(defaultdict(int, raw))
 
 
+def get_cached_result_data(queryset, key, timeout):
+    result = cache.get(key)
+    if result is None:
+        result = get_result_data(queryset)
+        cache.set(key, result, timeout)
+    return result
+
+
+def get_precomputed_result_data(**kwargs):
+    # Same as get_result_data, but reads the histogram maintained by the bridge; kwargs filter SubmissionResultCount.
+    raw = (SubmissionResultCount.objects.filter(**kwargs).values('result').annotate(count=Sum('count'))
+           .order_by().values_list('result', 'count'))
+    return _get_result_data(defaultdict(int, raw))
+
+
 def hot_problems(duration, limit):
     cache_key = 'hot_problems:%d:%d' % (duration.total_seconds(), limit)
     qs = cache.get(cache_key)
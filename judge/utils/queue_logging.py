@@ -0,0 +1,131 @@
+import logging
+import os
+import queue
+import threading
+from logging.handlers import QueueHandler
+
+_STOP = object()
+
+
+class BatchingQueueHandler(QueueHandler):
+    """
+    Hand records to a background thread, which writes them to `handlers` in batches.
+
+    The queue holds at most `maxsize` records. When it is full, records are dropped rather than blocking the caller,
+    and the number dropped is logged once there is room again. The thread is started on first use in each process,
+    so a handler created before a server forks still works in its workers.
+    """
+
+    def __init__(self, handlers, maxsize=10000, batch_size=256, flush_interval=0.5):
+        super().__init__(None)
+        self.handlers = handlers
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._pid = None
+        self._thread = None
+
+    def _start(self):
+        self.queue = queue.Queue(self.maxsize)
+        self.dropped = 0
+        self._thread = threading.Thread(target=self._run, name='log-queue', daemon=True)
+        self._thread.start()
+        self._pid = os.getpid()
+
+    def prepare(self, record):
+        # Unlike QueueHandler, the message is left for the background thread to format. Only the traceback is
+        # rendered here, while its frames are still alive; formatters append exc_text on their own.
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._start()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+
+    def _run(self):
+        while True:
+            try:
+                records = [self.queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                records = []
+            while len(records) < self.batch_size:
+                try:
+                    records.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = _STOP in records
+            records = [record for record in records if record is not _STOP]
+            with self._lock:
+                dropped, self.dropped = self.dropped, 0
+            if dropped:
+                records.append(logging.makeLogRecord({
+                    'name': __name__, 'levelno': logging.WARNING, 'levelname': 'WARNING',
+                    'msg': 'Dropped %d log records because the logging queue was full', 'args': (dropped,),
+                }))
+
+            if records:
+                for handler in self.handlers:
+                    self._write(handler, records)
+            if stop:
+                return
+
+    def _write(self, handler, records):
+        records = [record for record in records if record.levelno >= handler.level and handler.filter(record)]
+        if not records:
+            return
+
+        # Plain stream and file handlers get the whole batch in a single write and flush.
+        if type(handler) not in (logging.StreamHandler, logging.FileHandler):
+            for record in records:
+                handler.handle(record)
+            return
+
+        handler.acquire()
+        try:
+            if handler.stream is None:
+                handler.stream = handler._open()
+            handler.stream.write(''.join(handler.format(record) + handler.terminator for record in records))
+            handler.flush()
+        except Exception:
+            handler.handleError(records[-1])
+        finally:
+            handler.release()
+
+    def close(self):
+        # Drains the queue, so that nothing logged before shutdown is lost.
+        if self._thread is not None and self._pid == os.getpid():
+            try:
+                self.queue.put(_STOP, timeout=self.flush_interval)
+            except queue.Full:
+                pass
+            self._thread.join(self.flush_interval * 4)
+            self._thread = None
+        super().close()
+
+
+def enable_queue_logging(names, **kwargs):
+    """Route the records of the named loggers through a BatchingQueueHandler to the handlers they had."""
+    for name in names:
+        logger = logging.getLogger(name)
+
+        # Collect the handlers the records would have reached, including those of ancestor loggers.
+        handlers = []
+        current = logger
+        while current is not None:
+            handlers += current.handlers
+            current = current.parent if current.propagate else None
+
+        logger.handlers = [BatchingQueueHandler(handlers, **kwargs)]
+        logger.propagate = False
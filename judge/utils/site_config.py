@@ -0,0 +1,53 @@
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+SITE_CONFIG_VERSION_KEY = 'site_config_version'
+
+_local = threading.local()
+
+
+def bump_site_config_version():
+    cache.set(SITE_CONFIG_VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def load_site_config():
+    from judge.models import MiscConfig, NavigationBar
+
+    return {
+        'misc_config': dict(MiscConfig.objects.values_list('key', 'value')),
+        'nav_bar': list(NavigationBar.objects.all()),
+    }
+
+
+def get_site_config():
+    """
+    Return every MiscConfig value and the NavigationBar tree, as {'misc_config': {key: value}, 'nav_bar': [nodes]}.
+
+    Both tables are small and read on nearly every page, so they are cached together as one blob named after a
+    version token, which is replaced whenever either table changes. Each thread keeps its copy for
+    DMOJ_SITE_CONFIG_REVALIDATE seconds before checking the version again, so most renders need no cache requests.
+    """
+    now = time.monotonic()
+    if getattr(_local, 'checked', None) is not None and now - _local.checked < settings.DMOJ_SITE_CONFIG_REVALIDATE:
+        return _local.config
+
+    version = cache.get(SITE_CONFIG_VERSION_KEY)
+    if version is None:
+        cache.add(SITE_CONFIG_VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(SITE_CONFIG_VERSION_KEY)
+
+    if version != getattr(_local, 'version', None):
+        blob_key = 'site_config:%s' % version
+        config = cache.get(blob_key)
+        if config is None:
+            config = load_site_config()
+            cache.set(blob_key, config, 86400)
+        _local.version = version
+        _local.config = config
+
+    _local.checked = now
+    return _local.config
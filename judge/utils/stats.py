@@ -1,6 +1,21 @@
+from collections import defaultdict
+from datetime import timedelta
 from operator import itemgetter
 
-__all__ = ('chart_colors', 'highlight_colors', 'get_pie_chart', 'get_bar_chart')
+from django.core.cache import cache
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from judge.models import Language, Submission, SubmissionResultCount
+
+__all__ = ('chart_colors', 'highlight_colors', 'get_pie_chart', 'get_bar_chart', 'SITE_STATS_PERIODS',
+           'get_site_stats', 'update_site_stats')
+
+# Maps each snapshot period to how far back it looks; None covers every submission.
+SITE_STATS_PERIODS = {
+    'all': None,
+    '30d': timedelta(days=30),
+}
 
 
 chart_colors = [0x3366CC, 0xDC3912, 0xFF9900, 0x109618, 0x990099, 0x3B3EAC, 0x0099C6, 0xDD4477, 0x66AA00, 0xB82E2E,
@@ -51,3 +66,45 @@ def get_bar_chart(data, **kwargs):
             },
         ],
     }
+
+
+def _site_stats_key(period):
+    return 'site_stats:%s' % period
+
+
+def update_site_stats(period):
+    since = SITE_STATS_PERIODS[period]
+    now = timezone.now()
+    if since is None:
+        rows = (SubmissionResultCount.objects.values('language_id', 'result').annotate(count=Sum('count'))
+                .order_by().values_list('language_id', 'result', 'count'))
+    else:
+        rows = (Submission.objects.filter(date__gte=now - since, result__isnull=False)
+                .values('language_id', 'result').annotate(count=Count('id'))
+                .order_by().values_list('language_id', 'result', 'count'))
+
+    totals, ac_counts, statuses = defaultdict(int), defaultdict(int), defaultdict(int)
+    for language_id, result, count in rows:
+        totals[language_id] += count
+        statuses[result] += count
+        if result == 'AC':
+            ac_counts[language_id] += count
+
+    languages = Language.objects.filter(id__in=totals.keys()).values_list('id', 'key', 'name')
+    stats = {
+        'generated': now,
+        'languages': [{'key': key, 'name': name, 'total': totals[id], 'ac': ac_counts[id]}
+                      for id, key, name in languages if totals[id] > 0],
+        'statuses': sorted(statuses.items(), key=itemgetter(1), reverse=True),
+    }
+    # Keep the snapshot around well past the refresh interval, so that a stalled worker serves stale data
+    # instead of making a page view recompute it.
+    cache.set(_site_stats_key(period), stats, 86400)
+    return stats
+
+
+def get_site_stats(period):
+    stats = cache.get(_site_stats_key(period))
+    if stats is None:
+        stats = update_site_stats(period)
+    return stats
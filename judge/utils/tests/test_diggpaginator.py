@@ -0,0 +1,49 @@
+from django.core.cache import cache
+from django.core.paginator import InvalidPage
+from django.test import SimpleTestCase
+
+from judge.utils.diggpaginator import CountCachedDiggPaginator
+
+
+class CountCachedDiggPaginatorTestCase(SimpleTestCase):
+    def tearDown(self):
+        cache.delete('test_digg_count')
+
+    def test_capped_count(self):
+        paginator = CountCachedDiggPaginator(range(1, 1001), 10, body=5, count_cap=100)
+        self.assertEqual(paginator.count, 100)
+        self.assertTrue(paginator.is_capped)
+        self.assertEqual(paginator.num_pages, 10)
+
+    def test_capped_count_aligns_left(self):
+        page = CountCachedDiggPaginator(range(1, 1001), 10, body=5, count_cap=100).page(1)
+        self.assertEqual(page.trailing_range, [])
+        self.assertEqual(page.main_range, [1, 2, 3, 4, 5])
+
+    def test_pages_past_cap(self):
+        paginator = CountCachedDiggPaginator(range(1, 1001), 10, body=5, count_cap=100)
+        page = paginator.page(20)
+        self.assertEqual(list(page.object_list), list(range(191, 201)))
+        self.assertTrue(page.has_next())
+        self.assertTrue(paginator.is_capped)
+        self.assertEqual(page.main_range, [17, 18, 19, 20, 21])
+
+        page = CountCachedDiggPaginator(range(1, 1001), 10, count_cap=100).page(100)
+        self.assertFalse(page.has_next())
+        with self.assertRaises(InvalidPage):
+            CountCachedDiggPaginator(range(1, 1001), 10, count_cap=100).page(101)
+
+    def test_uncapped_count(self):
+        paginator = CountCachedDiggPaginator(range(1, 51), 10, body=5, count_cap=100)
+        self.assertEqual(paginator.count, 50)
+        self.assertFalse(paginator.is_capped)
+
+        page = paginator.page(1)
+        self.assertEqual(page.main_range, [1, 2, 3, 4, 5])
+
+    def test_cached_count(self):
+        self.assertEqual(CountCachedDiggPaginator(range(1, 1001), 10, count_key='test_digg_count').count, 1000)
+        # The cached count wins over the actual length of the object list.
+        self.assertEqual(CountCachedDiggPaginator(range(1, 11), 10, count_key='test_digg_count').count, 1000)
+        self.assertEqual(CountCachedDiggPaginator(range(1, 11), 10, count_key='test_digg_count', count_cap=5).count,
+                         1000)
@@ -0,0 +1,49 @@
+import io
+import logging
+import os
+import queue
+
+from django.test import SimpleTestCase
+
+from judge.utils.queue_logging import BatchingQueueHandler
+
+
+class BatchingQueueHandlerTest(SimpleTestCase):
+    def setUp(self):
+        self.stream = io.StringIO()
+        stream_handler = logging.StreamHandler(self.stream)
+        stream_handler.setFormatter(logging.Formatter('%(levelname)s %(message)s'))
+        self.handler = BatchingQueueHandler([stream_handler], flush_interval=0.05)
+
+        self.logger = logging.getLogger('judge.tests.queue_logging')
+        self.logger.propagate = False
+        self.logger.setLevel(logging.INFO)
+        self.logger.addHandler(self.handler)
+
+    def tearDown(self):
+        self.logger.removeHandler(self.handler)
+        self.handler.close()
+
+    def test_records_are_written_in_order(self):
+        for i in range(10):
+            self.logger.info('record %d', i)
+        self.handler.close()
+        self.assertEqual(self.stream.getvalue(), ''.join('INFO record %d\n' % i for i in range(10)))
+
+    def test_message_is_formatted_when_written(self):
+        class Message:
+            def __str__(self):
+                return 'formatted'
+
+        self.logger.info(Message())
+        self.handler.close()
+        self.assertEqual(self.stream.getvalue(), 'INFO formatted\n')
+
+    def test_full_queue_drops_records(self):
+        # Without a running writer thread, the second record does not fit.
+        self.handler.queue = queue.Queue(1)
+        self.handler._pid = os.getpid()
+        self.logger.info('kept')
+        self.logger.info('dropped')
+        self.assertEqual(self.handler.dropped, 1)
+        self.assertEqual(self.handler.queue.qsize(), 1)
@@ -0,0 +1,39 @@
+from django.test import SimpleTestCase
+
+from judge.utils.texoid import get_formulas
+
+DOCUMENT = '''\
+Let $n$ be an integer.
+
+```latex
+\\begin{tikzpicture}
+\\draw (0,0) -- (1,1);
+\\end{tikzpicture}
+```
+
+```cpp
+int main() {}
+```
+
+~~~~ latex
+x^2
+~~~~
+'''
+
+
+class GetFormulasTest(SimpleTestCase):
+    def test_latex_fences(self):
+        self.assertEqual(get_formulas(DOCUMENT), [
+            '\\begin{tikzpicture}\n\\draw (0,0) -- (1,1);\n\\end{tikzpicture}',
+            'x^2',
+        ])
+
+    def test_no_formulas(self):
+        self.assertEqual(get_formulas(''), [])
+        self.assertEqual(get_formulas(None), [])
+        self.assertEqual(get_formulas('```\nlatex\n```'), [])
+
+    def test_empty_fence(self):
+        self.assertEqual(get_formulas('```latex\n```'), [])
+        self.assertEqual(get_formulas('```latex\n```\n\nSome text.\n\n```latex\nx^2\n```'), ['x^2'])
+        self.assertEqual(get_formulas('```latex\n\n   \n```'), [])
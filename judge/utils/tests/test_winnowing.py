@@ -0,0 +1,80 @@
+from django.test import SimpleTestCase
+
+from judge.utils.winnowing import compare, fingerprints, tokenize
+
+ORIGINAL = '''
+#include <bits/stdc++.h>
+using namespace std;
+
+int main() {
+    int n, total = 0;
+    cin >> n;
+    for (int i = 0; i < n; i++) {
+        int x;
+        cin >> x;
+        if (x % 2 == 0) total += x;
+    }
+    cout << total << endl;
+}
+'''
+
+RENAMED = '''
+#include <bits/stdc++.h>
+using namespace std;
+
+// Sum of the even numbers.
+int main() {
+    int count, answer = 0;
+    cin >> count;
+    for (int j = 0; j < count; j++) {
+        int value;
+        cin >> value;
+        if (value % 2 == 0) answer += value;  /* even */
+    }
+    cout << answer << endl;
+}
+'''
+
+UNRELATED = '''
+#include <cstdio>
+
+long long power(long long base, long long exp, long long mod) {
+    long long result = 1;
+    while (exp) {
+        if (exp & 1) result = result * base % mod;
+        base = base * base % mod;
+        exp >>= 1;
+    }
+    return result;
+}
+
+int main() {
+    long long a, b;
+    scanf("%lld %lld", &a, &b);
+    printf("%lld\\n", power(a, b, 1000000007));
+}
+'''
+
+
+class WinnowingTestCase(SimpleTestCase):
+    def test_tokenize(self):
+        self.assertEqual(tokenize('int x = 42; // answer\nreturn "s";'),
+                         ['int', 'V', '=', 'N', ';', 'return', 'S', ';'])
+        self.assertEqual(tokenize('x = 1  # one', comments='python'), ['V', '=', 'N'])
+
+    def test_fingerprints(self):
+        tokens = tokenize(ORIGINAL)
+        selected = fingerprints(tokens)
+        self.assertTrue(selected)
+        self.assertLessEqual(len(selected), len(tokens))
+        self.assertEqual(selected, fingerprints(tokenize(RENAMED)))
+        self.assertEqual(fingerprints(['a', 'b']), set())
+
+    def test_compare(self):
+        matches = compare({'alice': ORIGINAL, 'bob': RENAMED, 'carol': UNRELATED})
+        self.assertEqual(matches, [['alice', 'bob', 1.0]])
+
+    def test_limit(self):
+        sources = {'user%d' % i: ORIGINAL for i in range(5)}
+        self.assertEqual(len(compare(sources)), 10)
+        self.assertEqual(len(compare(sources, limit=3)), 3)
@@ -0,0 +1,77 @@
+import io
+import os
+import tempfile
+import zipfile
+
+from django.test import RequestFactory, SimpleTestCase
+
+from judge.utils.views import ranged_file_response
+from judge.utils.zipstream import stream_zip_members
+
+
+class StreamZipMembersTestCase(SimpleTestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix='.zip')
+        with os.fdopen(fd, 'wb') as f, zipfile.ZipFile(f, 'w') as archive:
+            archive.writestr('1.in', os.urandom(100000))
+            archive.writestr('1.out', b'42\n' * 50000)
+            archive.writestr('empty.in', b'')
+
+    def tearDown(self):
+        os.unlink(self.path)
+
+    def test_members(self):
+        members = [('input.txt', '1.in'), ('output.txt', '1.out'), ('empty.txt', 'empty.in')]
+        data = b''.join(stream_zip_members(self.path, members, chunk_size=1000))
+
+        with zipfile.ZipFile(self.path) as source, zipfile.ZipFile(io.BytesIO(data)) as result:
+            self.assertIsNone(result.testzip())
+            self.assertEqual(result.namelist(), ['input.txt', 'output.txt', 'empty.txt'])
+            for arcname, name in members:
+                self.assertEqual(result.read(arcname), source.read(name))
+
+    def test_missing_member(self):
+        with self.assertRaises(KeyError):
+            b''.join(stream_zip_members(self.path, [('input.txt', 'missing.in')]))
+
+
+class RangedFileResponseTestCase(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        fd, self.path = tempfile.mkstemp()
+        with os.fdopen(fd, 'wb') as f:
+            f.write(bytes(range(100)))
+
+    def tearDown(self):
+        os.unlink(self.path)
+
+    def get(self, **headers):
+        return ranged_file_response(self.factory.get('/', **headers), None, self.path)
+
+    def test_full(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), bytes(range(100)))
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+
+    def test_range(self):
+        response = self.get(HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 10-19/100')
+        self.assertEqual(b''.join(response.streaming_content), bytes(range(10, 20)))
+
+    def test_open_and_suffix_ranges(self):
+        self.assertEqual(b''.join(self.get(HTTP_RANGE='bytes=95-').streaming_content), bytes(range(95, 100)))
+        self.assertEqual(b''.join(self.get(HTTP_RANGE='bytes=-3').streaming_content), bytes(range(97, 100)))
+        self.assertEqual(self.get(HTTP_RANGE='bytes=90-500')['Content-Range'], 'bytes 90-99/100')
+
+    def test_unsatisfiable(self):
+        response = self.get(HTTP_RANGE='bytes=100-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */100')
+
+    def test_invalid_range_is_ignored(self):
+        response = self.get(HTTP_RANGE='bytes=5-3')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), bytes(range(100)))
+        self.assertNotIn('Content-Range', response)
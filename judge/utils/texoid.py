@@ -1,6 +1,7 @@
 import hashlib
 import json
 import logging
+import re
 from base64 import b64decode
 
 import requests
@@ -14,6 +15,25 @@ logger = logging.getLogger('judge.texoid')
 
 TEXOID_ENABLED = hasattr(settings, 'TEXOID_URL')
 
+# ```latex fences at the start of a line, which the markdown filter renders with Texoid.
+LATEX_FENCE = re.compile(r'^(?P<fence>`{3,}|~{3,})[ \t]*latex[ \t]*(?:\n(?P<source>.*?))??\n(?P=fence)[ \t]*$',
+                         re.M | re.S)
+
+
+def get_formulas(document):
+    # Line endings are normalized as markdown does, so that the formulas hash the same as the rendered ones.
+    document = (document or '').replace('\r\n', '\n')
+    formulas = [(match.group('source') or '').strip() for match in LATEX_FENCE.finditer(document)]
+    return [formula for formula in formulas if formula]
+
+
+def texoid_hash(formula):
+    return hashlib.sha1(utf8bytes(formula)).hexdigest()
+
+
+def texoid_render_lock_key(hash):
+    return 'texoid:render:' + hash
+
 
 class TexoidRenderer(object):
     def __init__(self):
@@ -23,16 +43,16 @@ class TexoidRenderer(object):
         self.meta_cache = caches[settings.TEXOID_META_CACHE]
         self.meta_cache_ttl = settings.TEXOID_META_CACHE_TTL
 
-    def query_texoid(self, document, hash):
+    def query_texoid(self, document, hash, session=requests):
         self.cache.create(hash)
 
         try:
-            response = requests.post(settings.TEXOID_URL, data=utf8bytes(document), headers={
+            response = session.post(settings.TEXOID_URL, data=utf8bytes(document), headers={
                 'Content-Type': 'application/x-tex',
             })
             response.raise_for_status()
         except requests.HTTPError as e:
-            if e.response.status == 400:
+            if e.response.status_code == 400:
                 logger.error('Texoid failed to render: %s\n%s', document, e.response.text)
             else:
                 logger.exception('Failed to connect to texoid for: %s', document)
@@ -76,10 +96,53 @@ class TexoidRenderer(object):
 
         return result
 
+    def get_cached_result(self, formula):
+        hash = texoid_hash(formula)
+        if self.cache.has_file(hash, 'svg'):
+            return self.query_cache(hash)
+
     def get_result(self, formula):
-        hash = hashlib.sha1(utf8bytes(formula)).hexdigest()
+        hash = texoid_hash(formula)
 
         if self.cache.has_file(hash, 'svg'):
             return self.query_cache(hash)
         else:
             return self.query_texoid(formula, hash)
+
+    def get_results(self, formulas):
+        """
+        Return the cached result of each formula, or None for those not rendered yet.
+
+        The missing formulas are rendered together in the background by queue_texoid_render.
+        """
+        results = [self.get_cached_result(formula) for formula in formulas]
+        queue_texoid_render([formula for formula, result in zip(formulas, results) if result is None])
+        return results
+
+    def render_batch(self, formulas):
+        # One connection is kept alive for the whole batch. The lock of a formula that failed to render is kept until
+        # it expires, so that page views showing it do not queue it again right away.
+        with requests.Session() as session:
+            for formula in formulas:
+                hash = texoid_hash(formula)
+                if not self.cache.has_file(hash, 'svg'):
+                    result = self.query_texoid(formula, hash, session)
+                    if result is None or 'error' in result:
+                        continue
+                self.meta_cache.delete(texoid_render_lock_key(hash))
+
+
+def queue_texoid_render(formulas):
+    """Render the formulas missing from the cache in one background task. Formulas already queued are skipped."""
+    from judge.tasks import render_texoid
+
+    renderer = TexoidRenderer()
+    missing = []
+    for formula in dict.fromkeys(formulas):
+        hash = texoid_hash(formula)
+        if not renderer.cache.has_file(hash, 'svg') and \
+                renderer.meta_cache.add(texoid_render_lock_key(hash), True, settings.TEXOID_RENDER_LOCK_TIMEOUT):
+            missing.append(formula)
+
+    if missing:
+        render_texoid.delay(missing)
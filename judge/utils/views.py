@@ -1,3 +1,7 @@
+import os
+import re
+
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import render
 from django.utils.decorators import method_decorator
 from django.views.generic import FormView
@@ -40,6 +44,59 @@ def add_file_response(request, response, url_path, file_path, file_object=None):
                 response.content = f.read()
 
 
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def _read_file_range(path, start, length, chunk_size=1 << 16):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(chunk_size, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def ranged_file_response(request, url_path, file_path, content_type='application/octet-stream'):
+    """Stream a file from disk, honouring a single-range Range header.
+
+    Like add_file_response, the file is handed to nginx instead when url_path is given.
+    """
+    if url_path is not None and request.META.get('SERVER_SOFTWARE', '').startswith('nginx/'):
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = url_path
+        return response
+
+    size = os.path.getsize(file_path)
+    start, end = 0, size - 1
+    match = RANGE_RE.match(request.META.get('HTTP_RANGE', '').strip())
+    ranged = match is not None and any(match.groups())
+    # A range ending before it starts is invalid rather than unsatisfiable, and is ignored (RFC 7233, section 2.1).
+    if ranged and match.group(1) and match.group(2) and int(match.group(2)) < int(match.group(1)):
+        ranged = False
+    if ranged:
+        first, last = match.groups()
+        if first:
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+        else:
+            start = max(size - int(last), 0)
+        if start > end:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = 'bytes */%d' % size
+            return response
+
+    response = StreamingHttpResponse(_read_file_range(file_path, start, end - start + 1),
+                                     status=206 if ranged else 200,
+                                     content_type=content_type)
+    response['Content-Length'] = str(end - start + 1)
+    response['Accept-Ranges'] = 'bytes'
+    if ranged:
+        response['Content-Range'] = 'bytes %d-%d/%d' % (start, end, size)
+    return response
+
+
 def paginate_query_context(request):
     query = request.GET.copy()
     query.setlist('page', [])
@@ -0,0 +1,87 @@
+import re
+import zlib
+from collections import Counter, defaultdict
+from itertools import combinations
+
+# Winnowing, as described in "Winnowing: Local Algorithms for Document Fingerprinting" (Schleimer, Wilkerson and
+# Aiken), which is also what MOSS is built on. Sources are reduced to token streams in which every identifier,
+# number and string looks alike, so renaming variables or changing constants does not hide a match.
+
+COMMENTS = {
+    'c': re.compile(r'//[^\n]*|/\*.*?\*/', re.S),
+    'python': re.compile(r'#[^\n]*'),
+}
+
+TOKEN = re.compile(r'''
+    (?P<string>"(?:\\.|[^"\\\n])*"|'(?:\\.|[^'\\\n])*')
+  | (?P<number>\d[\w.]*)
+  | (?P<word>[A-Za-z_]\w*)
+  | (?P<symbol>\S)
+''', re.X)
+
+KEYWORDS = frozenset('''
+    and as assert auto bool boolean break case catch char class const continue def default del do double elif else
+    enum except extends extern final finally float for from friend global goto if implements import in inline int
+    interface is lambda long namespace new nonlocal not operator or pass private protected public raise register
+    return short signed sizeof static struct super switch template this throw try typedef typename union unsigned
+    using virtual void volatile while with yield
+'''.split())
+
+
+def tokenize(source, comments='c'):
+    tokens = []
+    for match in TOKEN.finditer(COMMENTS[comments].sub(' ', source)):
+        kind, text = match.lastgroup, match.group()
+        if kind == 'word':
+            tokens.append(text if text in KEYWORDS else 'V')
+        elif kind == 'string':
+            tokens.append('S')
+        elif kind == 'number':
+            tokens.append('N')
+        else:
+            tokens.append(text)
+    return tokens
+
+
+def fingerprints(tokens, k=5, window=4):
+    """Return the set of hashes winnowing selects from the k-grams of `tokens`."""
+    hashes = [zlib.crc32(' '.join(tokens[i:i + k]).encode('utf-8')) for i in range(len(tokens) - k + 1)]
+    if len(hashes) <= window:
+        return set(hashes)
+
+    # In each window, the rightmost minimal hash is selected.
+    selected = set()
+    for start in range(len(hashes) - window + 1):
+        chunk = hashes[start:start + window]
+        selected.add(min(range(window), key=lambda i: (chunk[i], -i)) + start)
+    return {hashes[i] for i in selected}
+
+
+def compare(sources, comments='c', k=5, window=4, threshold=0.5, limit=250):
+    """
+    Find similar pairs among `sources`, a dict of names to source code.
+
+    Returns up to `limit` [name, name, similarity] triples, most similar first. The similarity of two sources is the
+    share of the smaller one's fingerprints that also occur in the other. Fingerprints present in more than half of
+    a large set of sources are shared boilerplate, and are not counted as matches.
+    """
+    prints = {name: fingerprints(tokenize(source, comments), k, window) for name, source in sources.items()}
+
+    holders = defaultdict(list)
+    for name, hashes in prints.items():
+        for value in hashes:
+            holders[value].append(name)
+    common = max(10, len(sources) // 2)
+
+    shared = Counter()
+    for names in holders.values():
+        if len(names) <= common:
+            shared.update(combinations(sorted(names), 2))
+
+    matches = []
+    for (a, b), count in shared.items():
+        similarity = count / min(len(prints[a]), len(prints[b]))
+        if similarity >= threshold:
+            matches.append([a, b, round(similarity, 3)])
+    matches.sort(key=lambda match: (-match[2], match[0], match[1]))
+    return matches[:limit]
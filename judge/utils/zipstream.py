@@ -0,0 +1,47 @@
+import zipfile
+
+CHUNK_SIZE = 1 << 16
+
+
+class _ZipOutput:
+    # A write-only file object. zipfile falls back to data descriptors when it cannot seek or tell, so the archive
+    # can be handed out piece by piece as it is written.
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def stream_zip_members(archive_path, members, chunk_size=CHUNK_SIZE):
+    """Yield a zip archive containing members of another archive.
+
+    `members` is an iterable of (name in the new archive, name in `archive_path`) pairs. Members are recompressed
+    chunk by chunk, so memory use does not depend on their size.
+    """
+    output = _ZipOutput()
+    with zipfile.ZipFile(archive_path) as source:
+        target = zipfile.ZipFile(output, 'w', zipfile.ZIP_DEFLATED)
+        for arcname, name in members:
+            info = source.getinfo(name)
+            with source.open(info) as src, \
+                    target.open(arcname, 'w', force_zip64=info.file_size > zipfile.ZIP64_LIMIT) as dst:
+                while True:
+                    chunk = src.read(chunk_size)
+                    if not chunk:
+                        break
+                    dst.write(chunk)
+                    data = output.pop()
+                    if data:
+                        yield data
+        target.close()
+    yield output.pop()
@@ -15,10 +15,13 @@ from django.utils.translation import gettext as _
 from django.utils.translation import gettext_lazy
 from django.views.generic import ListView
 
+from judge.caching import submission_results_key
 from judge.models import Contest, Language, Problem, Profile, Submission
 from judge.models.contest import ContestProblem
 from judge.utils.infinite_paginator import InfinitePaginationMixin
-from judge.utils.problems import (get_result_data, user_completed_ids,
+from judge.utils.problems import (get_cached_result_data,
+                                  get_precomputed_result_data,
+                                  get_result_data, user_completed_ids,
                                   user_editable_ids, user_tester_ids)
 from judge.utils.raw_sql import use_straight_join
 from judge.utils.views import DiggPaginatorMixin, TitleMixin
@@ -48,6 +51,7 @@ class SubmissionsListBase(LoginRequiredMixin, DiggPaginatorMixin, TitleMixin, Li
     template_name = 'submission/list.html'
     context_object_name = 'submissions'
     first_page_href = None
+    result_cache_timeout = 600
 
     def get_result_data(self):
         result = self._get_result_data()
@@ -56,9 +60,28 @@ class SubmissionsListBase(LoginRequiredMixin, DiggPaginatorMixin, TitleMixin, Li
         return result
 
     def _get_result_data(self, queryset=None):
-        if queryset is None:
-            queryset = self.get_queryset()
-        return get_result_data(queryset.order_by())
+        if queryset is not None:
+            return get_result_data(queryset.order_by())
+
+        # Contest lists have no date window, so unless they are narrowed to a user, the histogram has their counts.
+        filters = self.get_result_filters()
+        if 'user' not in filters:
+            kwargs = {'%s_id' % scope: id for scope, id in filters.items()}
+            if self.selected_languages:
+                kwargs['language__key__in'] = self.selected_languages
+            if self.selected_statuses:
+                kwargs['result__in'] = self.selected_statuses
+            return get_precomputed_result_data(**kwargs)
+
+        key = submission_results_key(filters, type(self).__name__, self.selected_statuses, self.selected_languages)
+        return get_cached_result_data(self.get_queryset().order_by(), key, self.result_cache_timeout)
+
+    def get_result_filters(self):
+        # The contest, problem and user the list is narrowed to.
+        filters = {'contest': self.contest.id}
+        if not self.contest.can_see_full_scoreboard(self.request.user):
+            filters['user'] = self.request.profile.id
+        return filters
 
     def access_check(self, request):
         pass
@@ -171,6 +194,9 @@ class AllUserSubmissions(ConditionalUserTabMixin, UserMixin, SubmissionsListBase
     def get_queryset(self):
         return super(AllUserSubmissions, self).get_queryset().filter(user_id=self.profile.id)
 
+    def get_result_filters(self):
+        return dict(super(AllUserSubmissions, self).get_result_filters(), user=self.profile.id)
+
     def get_title(self):
         if self.is_own:
             return _('All my submissions')
@@ -203,6 +229,9 @@ class ProblemSubmissionsBase(SubmissionsListBase):
             raise Http404()
         return super(ProblemSubmissionsBase, self)._get_queryset().filter(problem_id=self.problem.id)
 
+    def get_result_filters(self):
+        return dict(super(ProblemSubmissionsBase, self).get_result_filters(), problem=self.problem.id)
+
     def get_title(self):
         return _('All submissions for %s') % self.problem_name
 
@@ -267,6 +296,9 @@ class UserContestProblemSubmissions(ConditionalUserTabMixin, UserMixin, ContestP
     def get_queryset(self):
         return super().get_queryset().filter(user_id=self.profile.id)
 
+    def get_result_filters(self):
+        return dict(super().get_result_filters(), user=self.profile.id)
+
     def get_title(self):
         if self.is_own:
             return _("My submissions for %(problem)s") % {'problem': self.problem_name}
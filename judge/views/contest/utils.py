@@ -1,31 +1,22 @@
-import zipfile
+import os
+import tempfile
 from typing import Any
 
 from django import forms
+from django.conf import settings
 from django.contrib.auth.mixins import (LoginRequiredMixin,
                                         PermissionRequiredMixin)
-from django.db import transaction
 from django.http import Http404, HttpRequest, HttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils.translation import gettext
 from django.utils.translation import gettext_lazy as _
 from django.views.generic import FormView
 
-from judge.models import (Contest, ContestParticipation, ContestProblem,
-                          ContestSubmission, Profile, Submission,
-                          SubmissionSource)
-from judge.models.runtime import Language
+from judge.models import Contest
+from judge.tasks import import_contest_data
+from judge.utils.celery import redirect_to_task_status
 from judge.utils.views import TitleMixin, generic_message
 
-EXTS = ('.c', '.cpp', '.java', '.py', '.pas')
-
-LANGS = {
-    'c': 'C',
-    'cpp': 'CPP17',
-    'java': 'JAVA8',
-    'py': 'PY3',
-    'pas': 'PAS',
-}
-
 
 class ContestDataForm(forms.Form):
     # zipfile field
@@ -51,36 +42,6 @@ class ContestDataView(LoginRequiredMixin, PermissionRequiredMixin, TitleMixin, F
     def get_title(self):
         return 'Contest data'
 
-    def get_data(self, upload):
-        data = {}
-        with zipfile.ZipFile(upload, 'r') as zip_ref:
-            for file in zip_ref.namelist():
-                if not file.endswith(EXTS):
-                    continue
-                temp = file.split('/')
-                if len(temp) != 2:
-                    continue
-                id = temp[0].split('_')[0]
-                try:
-                    id = int(id)
-                except ValueError:
-                    continue
-                try:
-                    source = zip_ref.open(file).read().decode('utf-8')
-                except UnicodeDecodeError:
-                    from sys import stderr
-                    print(file, file=stderr)
-
-                ext = file.split('.')[-1]
-                if id not in data:
-                    data[id] = {}
-                basename = temp[1].upper().split('.')[0]
-                if len(basename) != 1:
-                    continue
-                order = ContestProblem.get_order(temp[1].upper().split('.')[0])
-                data[id][order] = (source, LANGS[ext])
-        return data
-
     def post(self, request: HttpRequest, *args: str, **kwargs: Any) -> HttpResponse:
         try:
             self.contest = self.get_contest()
@@ -90,55 +51,13 @@ class ContestDataView(LoginRequiredMixin, PermissionRequiredMixin, TitleMixin, F
         return super().post(request, *args, **kwargs)
 
     def form_valid(self, form: Any) -> HttpResponse:
-        data = self.get_data(form.cleaned_data['upload'])
-
-        user_ids = list(map(int, data.keys()))
-
-        users = Profile.objects.filter(pk__in=user_ids).order_by('pk')
-        problems = ContestProblem.objects.filter(contest=self.contest).order_by('order')
-        languages = Language.objects.all()
-
-        with transaction.atomic():
-            # Clear all old data
-            if form.cleaned_data['clear']:
-                Submission.objects.filter(contest_object=self.contest).delete()
-                self.contest.users.all().delete()
-            else:
-                # Clear old participations in users
-                Submission.objects.filter(user__in=users, contest_object=self.contest).delete()
-                ContestParticipation.objects.filter(user__in=users, contest=self.contest).delete()
-
-            # Create new participations
-            participations = ContestParticipation.objects.bulk_create([
-                ContestParticipation(user=user, contest=self.contest) for user in users
-            ])
-
-            # Create new submissions
-            for participation in participations:
-                for problem in problems:
-                    if problem.order not in data[participation.user.pk]:
-                        continue
-                    source, lang = data[participation.user.pk][problem.order]
-
-                    submission = Submission.objects.create(
-                        user=participation.user,
-                        problem=problem.problem,
-                        language=languages.get(key=lang),
-                        contest_object=self.contest,
-                        date=self.contest.start_time,
-                    )
-
-                    SubmissionSource.objects.create(
-                        submission=submission,
-                        source=source,
-                    )
-
-                    ContestSubmission.objects.create(
-                        submission=submission,
-                        problem=problem,
-                        participation=participation,
-                    )
-
-        self.contest.update_user_count()
-
-        return super().form_valid(form)
+        # The archive is handed to a worker through a shared directory; the task deletes it when done.
+        fd, path = tempfile.mkstemp(prefix='contest_data.%d.' % self.contest.id, suffix='.zip',
+                                    dir=settings.DMOJ_CONTEST_DATA_UPLOAD_DIR)
+        with os.fdopen(fd, 'wb') as f:
+            for chunk in form.cleaned_data['upload'].chunks():
+                f.write(chunk)
+
+        status = import_contest_data.delay(self.contest.id, path, form.cleaned_data['clear'])
+        return redirect_to_task_status(status, message=gettext('Importing contest data...'),
+                                       redirect=self.get_success_url())
@@ -1,13 +1,13 @@
 import json
 import logging
 import os
-import shutil
 from calendar import SUNDAY, Calendar
 from collections import defaultdict, namedtuple
 from datetime import date, datetime, time, timedelta
 from functools import partial
 from itertools import chain
 from operator import attrgetter, itemgetter
+from types import SimpleNamespace
 
 import pandas
 from django import forms
@@ -15,19 +15,15 @@ from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import (LoginRequiredMixin,
                                         PermissionRequiredMixin)
-from django.core.cache import cache
 from django.core.exceptions import ImproperlyConfigured, ObjectDoesNotExist
 from django.db import IntegrityError
-from django.db.models import (Case, Count, F, FloatField, IntegerField, Max,
-                              Min, Q, Value, When)
-from django.db.models.expressions import CombinedExpression
+from django.db.models import F, Max, Min, Q, Sum
 from django.http import (Http404, HttpResponse, HttpResponseBadRequest,
                          HttpResponseRedirect)
 from django.shortcuts import get_object_or_404, render
 from django.template.defaultfilters import date as date_filter
-from django.template.loader import get_template
 from django.urls import reverse
-from django.utils import timezone, translation
+from django.utils import timezone
 from django.utils.functional import cached_property
 from django.utils.html import format_html
 from django.utils.safestring import mark_safe
@@ -43,14 +39,20 @@ from reversion import revisions
 from judge.comments import CommentedDetailView
 from judge.forms import ContestCloneForm
 from judge.models import (Contest, ContestMoss, ContestParticipation,
-                          ContestProblem, ContestTag, Profile, Submission)
+                          ContestProblem, ContestTag, Profile,
+                          SubmissionResultCount)
 from judge.models.contest import SampleContest
 from judge.models.problem import ProblemTranslation
 from judge.models.profile import Organization
-from judge.pdf_problems import HAS_PDF, DefaultPdfMaker
+from judge.pdf_problems import HAS_PDF
 from judge.tasks import run_moss
 from judge.utils.celery import redirect_to_task_status
+from judge.utils.contest_calendar import (get_calendar_contests,
+                                          get_contest_month_bounds)
+from judge.utils.moss import moss_available
 from judge.utils.opengraph import generate_opengraph
+from judge.utils.pdf import (contest_pdf_path, pdf_pending_response,
+                             sample_contest_pdf_path)
 from judge.utils.problems import _get_result_data
 from judge.utils.ranker import ranker
 from judge.utils.stats import get_bar_chart, get_pie_chart
@@ -59,7 +61,8 @@ from judge.utils.views import (DiggPaginatorMixin, QueryStringSortMixin,
                                add_file_response, generic_message)
 
 __all__ = ['ContestList', 'ContestDetail', 'ContestRanking', 'ContestJoin', 'contestLeave', 'ContestCalendar',
-           'ContestClone', 'ContestStats', 'ContestMossView', 'ContestMossDelete', 'contest_ranking_ajax',
+           'CachedContestCalendar', 'ContestClone', 'ContestStats', 'ContestMossView', 'ContestMossReport',
+           'ContestMossDelete', 'contest_ranking_ajax',
            'ContestParticipationList', 'ContestParticipationDisqualify', 'get_contest_ranking_list',
            'base_contest_ranking_list', 'exportExcel']
 
@@ -236,7 +239,7 @@ class ContestMixin(object):
                                           self.object.description, 'contest')
         context['meta_description'] = self.object.summary or metadata[0]
         context['og_image'] = self.object.og_image or metadata[1]
-        context['has_moss_api_key'] = settings.MOSS_API_KEY is not None
+        context['has_moss_api_key'] = moss_available()
         context['logo_override_image'] = self.object.logo_override_image
         if not context['logo_override_image'] and self.object.organizations.count() == 1:
             context['logo_override_image'] = self.object.organizations.first().logo_override_image
@@ -496,12 +499,17 @@ class ContestCalendar(TitleMixin, ContestListMixin, TemplateView):
         context = self.get_context_data()
         return self.render_to_response(context)
 
+    def get_contests(self, start, end):
+        return self.get_queryset().filter(Q(start_time__gte=start, start_time__lt=end) |
+                                          Q(end_time__gte=start, end_time__lt=end))
+
+    def get_contest_bounds(self):
+        return Contest.objects.aggregate(min=Min('start_time'), max=Max('end_time'))
+
     def get_contest_data(self, start, end):
         end += timedelta(days=1)
-        contests = self.get_queryset().filter(Q(start_time__gte=start, start_time__lt=end) |
-                                              Q(end_time__gte=start, end_time__lt=end))
         starts, ends, oneday = (defaultdict(list) for i in range(3))
-        for contest in contests:
+        for contest in self.get_contests(start, end):
             start_date = timezone.localtime(contest.start_time).date()
             end_date = timezone.localtime(contest.end_time - timedelta(seconds=1)).date()
             if start_date == end_date:
@@ -530,7 +538,7 @@ class ContestCalendar(TitleMixin, ContestListMixin, TemplateView):
         else:
             context['title'] = _('Contests in %(month)s') % {'month': date_filter(month, _("F Y"))}
 
-        dates = Contest.objects.aggregate(min=Min('start_time'), max=Max('end_time'))
+        dates = self.get_contest_bounds()
         min_month = (self.today.year, self.today.month)
         if dates['min'] is not None:
             min_month = dates['min'].year, dates['min'].month
@@ -560,15 +568,14 @@ class ContestCalendar(TitleMixin, ContestListMixin, TemplateView):
 
 
 class CachedContestCalendar(ContestCalendar):
-    def render(self):
-        key = 'contest_cal:%d:%d' % (self.year, self.month)
-        cached = cache.get(key)
-        if cached is not None:
-            return HttpResponse(cached)
-        response = super(CachedContestCalendar, self).render()
-        response.render()
-        cached.set(key, response.content)
-        return response
+    # Serves the month from judge.utils.contest_calendar, which contest changes invalidate in judge.signals.
+    def get_contests(self, start, end):
+        contests = get_calendar_contests(self.request.user, self.year, self.month)
+        return [SimpleNamespace(**contest) for contest in contests
+                if start <= contest['start_time'] < end or start <= contest['end_time'] < end]
+
+    def get_contest_bounds(self):
+        return get_contest_month_bounds()
 
 
 class ContestStats(TitleMixin, ContestMixin, DetailView):
@@ -583,30 +590,32 @@ class ContestStats(TitleMixin, ContestMixin, DetailView):
         if not (self.object.ended or self.can_edit):
             raise Http404()
 
-        queryset = Submission.objects.filter(contest_object=self.object)
-
-        ac_count = Count(Case(When(result='AC', then=Value(1)), output_field=IntegerField()))
-        ac_rate = CombinedExpression(ac_count / Count('problem'), '*', Value(100.0), output_field=FloatField())
+        counts = (SubmissionResultCount.objects.filter(contest=self.object)
+                  .values('problem_id', 'language__name', 'result').annotate(count=Sum('count')).order_by()
+                  .values_list('problem_id', 'language__name', 'result', 'count'))
 
-        status_count_queryset = list(
-            queryset.values('problem__code', 'result').annotate(count=Count('result'))
-                    .values_list('problem__code', 'result', 'count'),
-        )
-        labels, codes = [], []
-        contest_problems = self.object.contest_problems.order_by('order').values_list('problem__name', 'problem__code')
+        labels, problem_ids = [], []
+        contest_problems = self.object.contest_problems.order_by('order').values_list('problem__name', 'problem_id')
         if contest_problems:
-            labels, codes = zip(*contest_problems)
+            labels, problem_ids = zip(*contest_problems)
         num_problems = len(labels)
-        status_counts = [[] for i in range(num_problems)]
-        for problem_code, result, count in status_count_queryset:
-            if problem_code in codes:
-                status_counts[codes.index(problem_code)].append((result, count))
+        status_counts = [defaultdict(int) for i in range(num_problems)]
+        language_counts = defaultdict(int)
+        language_ac_counts = defaultdict(int)
+        for problem_id, language, result, count in counts:
+            language_counts[language] += count
+            if result == 'AC':
+                language_ac_counts[language] += count
+            if problem_id in problem_ids:
+                status_counts[problem_ids.index(problem_id)][result] += count
 
         result_data = defaultdict(partial(list, [0] * num_problems))
         for i in range(num_problems):
-            for category in _get_result_data(defaultdict(int, status_counts[i]))['categories']:
+            for category in _get_result_data(status_counts[i])['categories']:
                 result_data[category['code']][i] = category['count']
 
+        problem_totals = [sum(status_counts[i].values()) for i in range(num_problems)]
+
         stats = {
             'problem_status_count': {
                 'labels': labels,
@@ -619,18 +628,18 @@ class ContestStats(TitleMixin, ContestMixin, DetailView):
                     for name, data in result_data.items()
                 ],
             },
-            'problem_ac_rate': get_bar_chart(
-                queryset.values('contest__problem__order', 'problem__name').annotate(ac_rate=ac_rate)
-                        .order_by('contest__problem__order').values_list('problem__name', 'ac_rate'),
-            ),
-            'language_count': get_pie_chart(
-                queryset.values('language__name').annotate(count=Count('language__name'))
-                        .filter(count__gt=0).order_by('-count').values_list('language__name', 'count'),
-            ),
-            'language_ac_rate': get_bar_chart(
-                queryset.values('language__name').annotate(ac_rate=ac_rate)
-                        .filter(ac_rate__gt=0).values_list('language__name', 'ac_rate'),
-            ),
+            'problem_ac_rate': get_bar_chart([
+                (labels[i], 100.0 * status_counts[i]['AC'] / problem_totals[i])
+                for i in range(num_problems) if problem_totals[i]
+            ]),
+            'language_count': get_pie_chart(sorted(
+                ((language, count) for language, count in language_counts.items() if count > 0),
+                key=itemgetter(1), reverse=True,
+            )),
+            'language_ac_rate': get_bar_chart([
+                (language, 100.0 * language_ac_counts[language] / count)
+                for language, count in sorted(language_counts.items()) if language_ac_counts[language] > 0
+            ]),
         }
 
         context['stats'] = mark_safe(json.dumps(stats))
@@ -826,7 +835,7 @@ class ContestMossMixin(ContestMixin, PermissionRequiredMixin):
 
     def get_object(self, queryset=None):
         contest = super().get_object(queryset)
-        if settings.MOSS_API_KEY is None or not contest.is_editable_by(self.request.user):
+        if not moss_available() or not contest.is_editable_by(self.request.user):
             raise Http404()
         return contest
 
@@ -867,6 +876,19 @@ class ContestMossView(ContestMossMixin, TitleMixin, DetailView):
         )
 
 
+class ContestMossReport(ContestMossMixin, TitleMixin, DetailView):
+    template_name = 'contest/moss_report.html'
+
+    def get_title(self):
+        return _('%s MOSS Report') % self.object.name
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['result'] = get_object_or_404(ContestMoss.objects.select_related('problem'), contest=self.object,
+                                              id=self.kwargs['result'], report__isnull=False)
+        return context
+
+
 class ContestMossDelete(ContestMossMixin, SingleObjectMixin, View):
     def post(self, request, *args, **kwargs):
         self.object = self.get_object()
@@ -945,48 +967,9 @@ class ContestPdfView(LoginRequiredMixin, ContestMixin, SingleObjectMixin, View):
             raise Http404()
 
         contest = self.get_object()
-
-        cproblems = contest.contest_problems.order_by('order')
-
-        problems = [c.problem for c in cproblems]
-
-        list_trans = ()
-
-        for problem in problems:
-            try:
-                trans = problem.translations.get(language=language)
-            except ProblemTranslation.DoesNotExist:
-                trans = None
-            list_trans += ((problem, trans),)
-
-        cache = os.path.join(settings.PDF_CONTEST_CACHE, '%s.%s.pdf' % (contest.key, language))
-
+        cache = contest_pdf_path(contest.key, language)
         if not os.path.exists(cache):
-            self.logger.info('Rendering: %s.%s.pdf', contest.key, language)
-            with DefaultPdfMaker() as maker, translation.override(language):
-                maker.html = get_template('contest/raw.html').render({
-                    'contest': contest,
-                    'problems': [(problem, problem.name if trans is None else
-                                  trans.name, problem.description if trans is None else
-                                  trans.description) for problem, trans in list_trans],
-                    'url': request.build_absolute_uri(),
-                    'math_engine': maker.math_engine,
-                }).replace('"//', '"https://').replace("'//", "'https://")
-                maker.title = contest.name
-
-                assets = ['full_style.css', 'pygment-github.css']
-                icons = ['logo.svg']
-                if maker.math_engine == 'jax':
-                    assets.append('mathjax_config.js')
-                for file in assets:
-                    maker.load(file, settings.RESOURCES / file)
-                for file in icons:
-                    maker.load(file, settings.RESOURCES / 'icons' / file)
-                maker.make()
-                if not maker.success:
-                    self.logger.error('Failed to render PDF for %s', contest.key)
-                    return HttpResponse(maker.log, status=500, content_type='text/plain')
-                shutil.move(maker.pdffile, cache)
+            return pdf_pending_response(request, 'contest', contest.id, language)
 
         response = HttpResponse()
 
@@ -1020,53 +1003,14 @@ class SampleContestPDF(SingleObjectMixin, View):
             raise Http404()
 
         contest: SampleContest = self.get_object()
-
-        cproblems = contest.contest_problems.all().order_by('order')
-        problems = [problem.problem for problem in cproblems]
-
-        list_trans = ()
-
-        for problem in problems:
-            try:
-                trans = problem.translations.get(language=language)
-            except ProblemTranslation.DoesNotExist:
-                trans = None
-            list_trans += ((problem, trans),)
-
-        cache = os.path.join(settings.PDF_CONTEST_CACHE, '%s.%s.pdf' % (contest.key, language))
-
-        from judge.signals import unlink_if_exists
-        if os.path.exists(cache):
-            unlink_if_exists(cache)
-
+        cache = sample_contest_pdf_path(contest.id, language)
         if not os.path.exists(cache):
-            self.logger.info('Rendering: %s.%s.pdf', contest.key, language)
-            with DefaultPdfMaker() as maker, translation.override(language):
-                maker.html = get_template('contest/raw.html').render({
-                    'contest': contest,
-                    'problems': [(problem, problem.name if trans is None else
-                                  trans.name, problem.description if trans is None else
-                                  trans.description) for problem, trans in list_trans],
-                    'url': request.build_absolute_uri(),
-                    'math_engine': maker.math_engine,
-                }).replace('"//', '"https://').replace("'//", "'https://")
-                maker.title = contest.name
-
-                assets = ['style.css', 'pygment-github.css']
-                if maker.math_engine == 'jax':
-                    assets.append('mathjax_config.js')
-                for file in assets:
-                    maker.load(file, os.path.join(settings.RESOURCES, file))
-                maker.make()
-                if not maker.success:
-                    self.logger.error('Failed to render PDF for %s', contest.key)
-                    return HttpResponse(maker.log, status=500, content_type='text/plain')
-                shutil.move(maker.pdffile, cache)
+            return pdf_pending_response(request, 'sample', contest.id, language)
 
         response = HttpResponse()
 
         if hasattr(settings, 'DMOJ_PDF_CONTEST_INTERNAL'):
-            url_path = '%s/%s.%s.pdf' % (settings.DMOJ_PDF_CONTEST_INTERNAL, contest.key, language)
+            url_path = '%s/sample.%d.%s.pdf' % (settings.DMOJ_PDF_CONTEST_INTERNAL, contest.id, language)
         else:
             url_path = None
 
@@ -1,6 +1,5 @@
 import logging
 import os
-import shutil
 import zipfile
 from datetime import timedelta
 from operator import itemgetter
@@ -17,7 +16,6 @@ from django.db.utils import ProgrammingError
 from django.http import (Http404, HttpResponse, HttpResponseBadRequest,
                          HttpResponseForbidden, HttpResponseRedirect)
 from django.shortcuts import get_object_or_404
-from django.template.loader import get_template
 from django.urls import reverse
 from django.utils import timezone, translation
 from django.utils.functional import cached_property
@@ -40,9 +38,10 @@ from judge.models import (ContestSubmission, Judge, Language, Problem,
                           SubmissionSource)
 from judge.models.contest import Contest
 from judge.models.problem_data import PublicSolution, SolutionVote
-from judge.pdf_problems import HAS_PDF, DefaultPdfMaker
+from judge.pdf_problems import HAS_PDF
 from judge.utils.diggpaginator import DiggPaginator
 from judge.utils.opengraph import generate_opengraph
+from judge.utils.pdf import pdf_pending_response, problem_pdf_path
 from judge.utils.problems import (contest_attempted_ids, contest_completed_ids,
                                   hot_problems, user_attempted_ids,
                                   user_completed_ids)
@@ -263,39 +262,9 @@ class ProblemPdfView(LoginRequiredMixin, ProblemMixin, SingleObjectMixin, View):
             raise Http404()
 
         problem = self.get_object()
-        try:
-            trans = problem.translations.get(language=language)
-        except ProblemTranslation.DoesNotExist:
-            trans = None
-
-        cache = os.path.join(settings.PDF_PROBLEM_CACHE, '%s.%s.pdf' % (problem.code, language))
-
+        cache = problem_pdf_path(problem.code, language)
         if not os.path.exists(cache):
-            self.logger.info('Rendering: %s.%s.pdf', problem.code, language)
-            with DefaultPdfMaker() as maker, translation.override(language):
-                problem_name = problem.name if trans is None else trans.name
-                maker.html = get_template('problem/raw.html').render({
-                    'problem': problem,
-                    'problem_name': problem_name,
-                    'description': problem.description if trans is None else trans.description,
-                    'url': request.build_absolute_uri(),
-                    'math_engine': maker.math_engine,
-                }).replace('"//', '"https://').replace("'//", "'https://")
-                maker.title = problem_name
-
-                assets = ['full_style.css', 'pygment-github.css']
-                icons = ['logo.svg']
-                if maker.math_engine == 'jax':
-                    assets.append('mathjax_config.js')
-                for file in assets:
-                    maker.load(file, os.path.join(settings.RESOURCES, file))
-                for file in icons:
-                    maker.load(file, settings.RESOURCES / 'icons' / file)
-                maker.make()
-                if not maker.success:
-                    self.logger.error('Failed to render PDF for %s', problem.code)
-                    return HttpResponse(maker.log, status=500, content_type='text/plain')
-                shutil.move(maker.pdffile, cache)
+            return pdf_pending_response(request, 'problem', problem.id, language)
 
         response = HttpResponse()
 
@@ -9,9 +9,11 @@ from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.core.exceptions import ValidationError
+from django.db import transaction
 from django.forms import (BaseModelFormSet, CharField, ChoiceField, ModelForm,
                           Select, formset_factory)
-from django.http import Http404, HttpResponse, HttpResponseRedirect
+from django.http import (Http404, HttpResponseRedirect,
+                         StreamingHttpResponse)
 from django.shortcuts import get_object_or_404, render
 from django.urls import reverse
 from django.utils import timezone
@@ -26,9 +28,11 @@ from judge.highlight_code import highlight_code
 from judge.models import (Log, Problem, ProblemData, ProblemTestCase,
                           Submission, problem_data_storage)
 from judge.models.problem_data import IO_METHODS, LogDownloadTestCase
-from judge.utils.problem_data import ProblemDataCompiler
+from judge.utils.problem_data import (ProblemDataCompiler,
+                                      get_problem_data_manifest)
 from judge.utils.unicode import utf8text
-from judge.utils.views import TitleMixin, add_file_response
+from judge.utils.views import TitleMixin, ranged_file_response
+from judge.utils.zipstream import stream_zip_members
 from judge.views.problem import ProblemMixin
 from judge.widgets.fields import CheckboxInput, HiddenInput, NumberInput
 
@@ -120,6 +124,17 @@ class ProblemCaseFormSet(formset_factory(ProblemCaseForm, formset=BaseModelFormS
         form.valid_files = self.valid_files
         return form
 
+    def bulk_save(self, problem):
+        # Only the forms that changed are written, with one query per kind of change instead of one per case.
+        cases = self.save(commit=False)
+        for case in cases:
+            case.dataset_id = problem.id
+        with transaction.atomic():
+            ProblemTestCase.objects.bulk_create([case for case in cases if case.pk is None], batch_size=1000)
+            ProblemTestCase.objects.bulk_update([case for case in cases if case.pk is not None],
+                                                ProblemCaseForm._meta.fields, batch_size=1000)
+            ProblemTestCase.objects.filter(id__in=[case.pk for case in self.deleted_objects]).delete()
+
 
 class ProblemManagerMixin(LoginRequiredMixin, ProblemMixin, DetailView):
     def get_object(self, queryset=None):
@@ -197,7 +212,7 @@ class ProblemDataView(TitleMixin, ProblemManagerMixin):
             elif post and 'problem-data-zipfile' in self.request.FILES:
                 return ZipFile(self.request.FILES['problem-data-zipfile']).namelist()
             elif data.zipfile:
-                return ZipFile(data.zipfile.path).namelist()
+                return [name for name, size in get_problem_data_manifest(data.problem)['files']]
         except BadZipfile:
             return []
         return []
@@ -229,11 +244,7 @@ class ProblemDataView(TitleMixin, ProblemManagerMixin):
                 object_title=problem.code,
             )
             data = data_form.save()
-            for case in cases_formset.save(commit=False):
-                case.dataset_id = problem.id
-                case.save()
-            for case in cases_formset.deleted_objects:
-                case.delete()
+            cases_formset.bulk_save(problem)
             ProblemDataCompiler.generate(problem, data, problem.cases.order_by('order'), valid_files)
             return HttpResponseRedirect(request.get_full_path())
         return self.render_to_response(self.get_context_data(data_form=data_form, cases_formset=cases_formset,
@@ -262,25 +273,22 @@ def problem_testcase_file(request, problem, path, id):
         raise Http404()
 
     test_case = get_object_or_404(ProblemTestCase, dataset=object, order=id)
-    # Get data file
     zip_path = Path(problem_data_storage.path(problem)) / path
-    input_file = test_case.input_file
-    output_file = test_case.output_file
-    with ZipFile(zip_path) as zf:
-        if input_file:
-            input_file = zf.open(input_file).read()
-        if output_file:
-            output_file = zf.open(output_file).read()
-
-    # Zip two files
-    response = HttpResponse()
-    response['Content-Type'] = 'application/zip'
+    members = []
+    if test_case.input_file:
+        members.append(('input.txt', test_case.input_file))
+    if test_case.output_file:
+        members.append(('output.txt', test_case.output_file))
+    try:
+        with ZipFile(zip_path) as zf:
+            for arcname, name in members:
+                zf.getinfo(name)
+    except (OSError, BadZipfile, KeyError):
+        raise Http404()
+
+    # Stream the two files as a new zip, so that large cases are never held in memory
+    response = StreamingHttpResponse(stream_zip_members(zip_path, members), content_type='application/zip')
     response['Content-Disposition'] = f'attachment; filename={object.code}-test_{id}.zip'
-    with ZipFile(response, 'w') as zf:
-        if input_file:
-            zf.writestr('input.txt', input_file)
-        if output_file:
-            zf.writestr('output.txt', output_file)
 
     # Create LogDownloadTestCase object
     LogDownloadTestCase.objects.create(user=request.user.profile, order=id, problem=object)
@@ -306,15 +314,13 @@ def problem_data_file(request, problem, path):
     if os.path.commonpath((problem_data_storage.path(os.path.join(problem, path)), problem_dir)) != problem_dir:
         raise Http404()
 
-    response = HttpResponse()
-
     if hasattr(settings, 'DMOJ_PROBLEM_DATA_INTERNAL'):
         url_path = '%s/%s/%s' % (settings.DMOJ_PROBLEM_DATA_INTERNAL, problem, path)
     else:
         url_path = None
 
     try:
-        add_file_response(request, response, url_path, os.path.join(problem, path), problem_data_storage)
+        response = ranged_file_response(request, url_path, problem_data_storage.path(os.path.join(problem, path)))
     except IOError:
         raise Http404()
 
@@ -326,7 +332,6 @@ def problem_data_file(request, problem, path):
         object_title=object.code,
     )
 
-    response['Content-Type'] = 'application/octet-stream'
     return response
 
 
@@ -3,7 +3,6 @@ from django.utils.html import format_html
 from django.utils.translation import gettext as _
 
 from judge.models import Language
-from judge.utils.problems import get_result_data
 from judge.utils.raw_sql import join_sql_subquery
 from judge.views.submission import ForceContestMixin, ProblemSubmissions
 
@@ -63,6 +62,16 @@ class RankedSubmissions(ProblemSubmissions):
         else:
             return queryset.order_by('-points', 'time')
 
+    def get_count_filters(self):
+        # Only the best submission of each user is listed, so counts can't be shared with the chronological list.
+        return None
+
+    def get_result_filters(self):
+        return super(RankedSubmissions, self).get_count_filters()
+
+    def get_result_queryset(self):
+        return super(RankedSubmissions, self).get_queryset()
+
     def get_title(self):
         return _('Best solutions for %s') % self.problem_name
 
@@ -70,11 +79,6 @@ class RankedSubmissions(ProblemSubmissions):
         return format_html(_('Best solutions for <a class="content_title" href="{1}">{0}</a>'), self.problem_name,
                            reverse('problem_detail', args=[self.problem.code]))
 
-    def _get_result_data(self, queryset=None):
-        if queryset is None:
-            queryset = super(RankedSubmissions, self).get_queryset()
-        return get_result_data(queryset.order_by())
-
 
 class ContestRankedSubmission(ForceContestMixin, RankedSubmissions):
     def get_title(self):
@@ -25,12 +25,16 @@ from django.views.decorators.cache import never_cache
 from django.views.decorators.http import require_POST
 from django.views.generic import DetailView, ListView
 
+from judge.caching import submission_count_key, submission_results_key
 from judge.highlight_code import highlight_code
 from judge.models import (Contest, ContestSubmission, Language, Log, Problem,
                           ProblemTranslation, Profile, Submission)
+from judge.utils.diggpaginator import CountCachedDiggPaginator
 from judge.utils.infinite_paginator import InfinitePaginationMixin
 from judge.utils.problem_data import get_problem_testcases_data
-from judge.utils.problems import (get_result_data, user_completed_ids,
+from judge.utils.problems import (get_cached_result_data,
+                                  get_precomputed_result_data,
+                                  get_result_data, user_completed_ids,
                                   user_editable_ids, user_tester_ids)
 from judge.utils.raw_sql import use_straight_join
 from judge.utils.views import DiggPaginatorMixin, TitleMixin
@@ -230,6 +234,8 @@ class SubmissionsListBase(DiggPaginatorMixin, TitleMixin, ListView):
     template_name = 'submission/list.html'
     context_object_name = 'submissions'
     first_page_href = None
+    count_cache_timeout = 600
+    count_cap = 10000
 
     def get_result_data(self):
         result = self._get_result_data()
@@ -238,9 +244,36 @@ class SubmissionsListBase(DiggPaginatorMixin, TitleMixin, ListView):
         return result
 
     def _get_result_data(self, queryset=None):
-        if queryset is None:
-            queryset = self.get_queryset()
-        return get_result_data(queryset.order_by())
+        if queryset is not None:
+            return get_result_data(queryset.order_by())
+
+        filters = self.get_result_filters()
+        # The histogram is not kept per user, so lists narrowed to a user are counted from the list itself.
+        if filters is not None and 'user' not in filters and self.result_counts_unrestricted:
+            kwargs = {'%s_id' % scope: id for scope, id in filters.items()}
+            if self.selected_languages:
+                kwargs['language__key__in'] = self.selected_languages
+            if self.selected_statuses:
+                kwargs['result__in'] = self.selected_statuses
+            return get_precomputed_result_data(**kwargs)
+
+        # Otherwise the counts are cached like the list's count, under the same visibility.
+        key = submission_results_key(filters or {}, type(self).__name__, self.get_count_visibility(),
+                                     self.selected_statuses, self.selected_languages)
+        return get_cached_result_data(self.get_result_queryset().order_by(), key, self.count_cache_timeout)
+
+    @cached_property
+    def result_counts_unrestricted(self):
+        # SubmissionResultCount covers every submission ever made. Everyone but superusers sees only the last 30 days,
+        # without hidden scoreboards or invisible problems, so their counts must come from the list itself.
+        user = self.request.user
+        return user.is_authenticated and user.is_superuser
+
+    def get_result_filters(self):
+        return self.get_count_filters()
+
+    def get_result_queryset(self):
+        return self.get_queryset()
 
     def access_check(self, request):
         pass
@@ -297,6 +330,33 @@ class SubmissionsListBase(DiggPaginatorMixin, TitleMixin, ListView):
 
         return queryset
 
+    def get_count_filters(self):
+        # The problem, user and contest the list is narrowed to, or None if the queryset cannot be described
+        # by these alone. Lists with no such filter are counted only up to `count_cap`.
+        filters = {}
+        if self.in_contest:
+            filters['contest'] = self.contest.id
+            if not self.contest.can_see_full_scoreboard(self.request.user):
+                filters['user'] = self.request.profile.id
+        return filters
+
+    def get_count_visibility(self):
+        user = self.request.user
+        if user.is_authenticated and user.is_superuser:
+            return 'all'
+        if self.in_contest or user.has_perm('judge.see_private_contest'):
+            return 'recent'
+        return 'recent:%d' % self.request.profile.id if user.is_authenticated else 'recent:anonymous'
+
+    def get_paginator(self, queryset, per_page, orphans=0, allow_empty_first_page=True, **kwargs):
+        filters = self.get_count_filters()
+        count_key = None if filters is None else submission_count_key(
+            filters, self.get_count_visibility(), self.selected_statuses, self.selected_languages,
+        )
+        return CountCachedDiggPaginator(queryset, per_page, body=6, padding=2, orphans=orphans,
+                                        allow_empty_first_page=allow_empty_first_page, count_key=count_key,
+                                        count_timeout=self.count_cache_timeout, count_cap=self.count_cap, **kwargs)
+
     def get_my_submissions_page(self):
         return None
 
@@ -377,6 +437,11 @@ class AllUserSubmissions(ConditionalUserTabMixin, UserMixin, SubmissionsListBase
     def get_queryset(self):
         return super(AllUserSubmissions, self).get_queryset().filter(user_id=self.profile.id)
 
+    def get_count_filters(self):
+        filters = super(AllUserSubmissions, self).get_count_filters()
+        filters['user'] = self.profile.id
+        return filters
+
     def get_title(self):
         if self.is_own:
             return _('All my submissions')
@@ -409,6 +474,11 @@ class ProblemSubmissionsBase(SubmissionsListBase):
             raise Http404()
         return super(ProblemSubmissionsBase, self)._get_queryset().filter(problem_id=self.problem.id)
 
+    def get_count_filters(self):
+        filters = super(ProblemSubmissionsBase, self).get_count_filters()
+        filters['problem'] = self.problem.id
+        return filters
+
     def get_title(self):
         return _('All submissions for %s') % self.problem_name
 
@@ -469,6 +539,11 @@ class UserProblemSubmissions(ConditionalUserTabMixin, UserMixin, ProblemSubmissi
     def get_queryset(self):
         return super(UserProblemSubmissions, self).get_queryset().filter(user_id=self.profile.id)
 
+    def get_count_filters(self):
+        filters = super(UserProblemSubmissions, self).get_count_filters()
+        filters['user'] = self.profile.id
+        return filters
+
     def get_title(self):
         if self.is_own:
             return _("My submissions for %(problem)s") % {'problem': self.problem_name}
@@ -542,7 +617,7 @@ class AllSubmissions(InfinitePaginationMixin, SubmissionsListBase):
         result = cache.get(key)
         if result:
             return result
-        result = super(AllSubmissions, self)._get_result_data(Submission.objects.all())
+        result = get_precomputed_result_data()
         cache.set(key, result, self.stats_update_interval)
         return result
 
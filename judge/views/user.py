@@ -3,21 +3,21 @@ import datetime as dt
 import itertools
 import json
 import os
-from datetime import datetime, timedelta
+import secrets
+from datetime import datetime
 from operator import attrgetter, itemgetter
 
 from django import forms
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.contrib.auth.models import Permission, User
+from django.contrib.auth.models import Permission
 from django.contrib.auth.views import LoginView
 from django.contrib.auth.views import LogoutView as BaseLogoutView
 from django.contrib.auth.views import PasswordChangeView, redirect_to_login
 from django.contrib.contenttypes.models import ContentType
 from django.core.cache import cache
 from django.core.exceptions import PermissionDenied
-from django.db import transaction
 from django.db.models import Count, Max, Min
 from django.db.models.fields import DateField
 from django.db.models.functions import Cast, ExtractYear
@@ -39,12 +39,14 @@ from unidecode import unidecode
 
 from judge.forms import (CreateManyUserForm, CustomAuthenticationForm,
                          DownloadDataForm, ProfileForm, newsletter_id)
-from judge.models import Language, Profile, Rating, Submission
+from judge.models import Profile, Rating, Submission
 from judge.models.profile import Organization
 from judge.performance_points import get_pp_breakdown
 from judge.ratings import rating_class, rating_progress
-from judge.tasks import prepare_user_data
-from judge.utils.celery import task_status_by_id, task_status_url_by_id
+from judge.tasks import create_users, prepare_user_data
+from judge.tasks.user import created_users_path
+from judge.utils.celery import (redirect_to_task_status, task_status_by_id,
+                                task_status_url_by_id)
 from judge.utils.problems import contest_completed_ids, user_completed_ids
 from judge.utils.ranker import ranker
 from judge.utils.subscription import Subscription
@@ -572,6 +574,16 @@ class UserLogoutView(TitleMixin, BaseLogoutView):
         return super().dispatch(request, *args, **kwargs)
 
 
+def create_users_response(request, rows):
+    # Passwords are hashed in a worker, which writes the new accounts to a file named after a random token. The
+    # session remembers the task and the token, so that SuccessCSVUser can list the accounts.
+    token = secrets.token_hex(16)
+    status = create_users.delay(rows, token)
+    request.session['create_users_task'] = status.id
+    request.session['create_users_token'] = token
+    return redirect_to_task_status(status, message=_('Creating accounts...'), redirect=reverse('success_csv_user'))
+
+
 class CreateManyUser(TitleMixin, FormView):
     form_class = CreateManyUserForm
     template_name: str = 'user/manyuserform.html'
@@ -589,32 +601,20 @@ class CreateManyUser(TitleMixin, FormView):
 
     def form_valid(self, form: CreateManyUserForm) -> HttpResponse:
         prefix = form.cleaned_data['prefix_user']
-        start = form.cleaned_data['start_id']
-        end = form.cleaned_data['end_id']
-        org_id = form.cleaned_data['organization']
-        org = Organization.objects.filter(id=org_id).first() if org_id else None
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename="%s_list_user.csv"' % prefix
-        writer = csv.writer(response)
-        writer.writerow(['Username', 'Password'])
-        language = Language.get_default_language()
-        for id in range(start, end + 1):
-            str_id = str(id)
-            while len(str_id) < 4:
-                str_id = '0' + str_id
+        rows = []
+        for id in range(form.cleaned_data['start_id'], form.cleaned_data['end_id'] + 1):
+            str_id = str(id).zfill(4)
             username = prefix + str_id
-            password = User.objects.make_random_password()
-            email = username + '@tmath.vn'
-            if User.objects.filter(username=username).exists():
-                User.objects.filter(username=username).delete()
-            new_user = User.objects.create_user(username=username, email=email, password=password)
-            new_profile = Profile(user=new_user, language=language)
-            new_profile.save()
-            if org:
-                org.members.add(new_profile)
-            writer.writerow([username, password])
-
-        return response
+            rows.append({
+                'index': str_id,
+                'username': username,
+                'email': username + '@tmath.vn',
+                'name': None,
+                'verified': False,
+                'expire_days': None,
+                'organization': form.cleaned_data['organization'],
+            })
+        return create_users_response(self.request, rows)
 
 
 class CreateCSVUserForm(forms.Form):
@@ -735,52 +735,47 @@ class ConfirmCSVUser(TitleMixin, FormView):
         return self.form_invalid(formset)
 
     def form_valid(self, formset) -> HttpResponse:
-        language = Language.get_default_language()
-        update_list = []
-        now = timezone.now()
-        with transaction.atomic():
-            for form in formset:
-                index = form.cleaned_data['mshv']
-                username = form.cleaned_data['username']
-                password = None  # form.cleaned_data['password']
-                fullname = form.cleaned_data['fullname']
-                day_expire = form.cleaned_data['day_expire']
-                if not day_expire:
-                    day_expire = 365
-                if not password:
-                    password = User.objects.make_random_password()
-                email = form.cleaned_data['email']
-                if User.objects.filter(username=username).exists():
-                    User.objects.filter(username=username).delete()
-                new_user = User.objects.create_user(username=username, email=email, password=password)
-                new_profile = Profile(user=new_user, name=fullname, language=language, verified=True,
-                                      expiration_date=now + timedelta(days=day_expire))
-                new_profile.save()
-                org_id = form.cleaned_data['organization']
-                data = [
-                    index,
-                    fullname,
-                    username,
-                    password,
-                    (now + timedelta(days=day_expire)).strftime("%Y-%m-%d %H:%M:%S"),
-                ]
-                if org_id:
-                    org: Organization = Organization.objects.get(id=org_id)
-                    org.members.add(new_profile)
-                    data.append(org.name)
-                update_list.append(data)
+        rows = [{
+            'index': form.cleaned_data['mshv'],
+            'username': form.cleaned_data['username'],
+            'email': form.cleaned_data['email'],
+            'name': form.cleaned_data['fullname'],
+            'verified': True,
+            'expire_days': form.cleaned_data['day_expire'] or 365,
+            'organization': form.cleaned_data['organization'],
+        } for form in formset]
         del self.request.session['create_csv_user']
-        self.request.session['update_list'] = update_list
-        return super().form_valid(formset)
+        return create_users_response(self.request, rows)
 
 
 class SuccessCSVUser(TitleMixin, TemplateView):
     template_name: str = 'user/success_csv_user.html'
     title = 'Success create many user from csv'
 
+    def get_update_list(self):
+        task_id = self.request.session.get('create_users_task')
+        token = self.request.session.get('create_users_token')
+        if task_id is None or token is None or not task_status_by_id(task_id).successful():
+            return []
+        try:
+            with open(created_users_path(token)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return []
+
+    def forget_update_list(self):
+        # The passwords can be downloaded only once.
+        token = self.request.session.pop('create_users_token', None)
+        self.request.session.pop('create_users_task', None)
+        if token is not None:
+            try:
+                os.unlink(created_users_path(token))
+            except FileNotFoundError:
+                pass
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['update_list'] = self.request.session.get('update_list', [])
+        context['update_list'] = self.get_update_list()
         return context
 
     def get(self, request, *args, **kwargs) -> HttpResponse:
@@ -789,7 +784,7 @@ class SuccessCSVUser(TitleMixin, TemplateView):
         return super().get(request, *args, **kwargs)
 
     def download_data(self):
-        list = self.request.session.get('update_list', [])
+        list = self.get_update_list()
         if not list:
             return Http404()
         response = HttpResponse(content_type='text/csv')
@@ -798,6 +793,7 @@ class SuccessCSVUser(TitleMixin, TemplateView):
         writer.writerow(['MSHV', 'Fullname', 'Username', 'Password', 'Expire', 'Organization'])
         for data in list:
             writer.writerow(data)
+        self.forget_update_list()
         return response
 
 
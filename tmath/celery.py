@@ -25,6 +25,17 @@ if hasattr(settings, 'CELERY_RESULT_BACKEND_SECRET'):
 
 app.conf.broker_connection_retry_on_startup = True
 
+app.conf.beat_schedule = {
+    'update-site-stats-snapshots': {
+        'task': 'judge.tasks.stats.update_site_stats_snapshots',
+        'schedule': settings.DMOJ_STATS_SNAPSHOT_INTERVAL,
+    },
+    'prewarm-contest-pdfs': {
+        'task': 'judge.tasks.pdf.prewarm_contest_pdfs',
+        'schedule': settings.DMOJ_PDF_PREWARM_INTERVAL,
+    },
+}
+
 # Load task modules from all registered Django app configs.
 app.autodiscover_tasks()
 
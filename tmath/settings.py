@@ -81,6 +81,8 @@ DMOJ_PROBLEM_STATEMENT_DISALLOWED_CHARACTERS = {"“", "”", "‘", "’"}
 DMOJ_RATING_COLORS = True
 DMOJ_EMAIL_THROTTLING = (10, 60)
 DMOJ_STATS_LANGUAGE_THRESHOLD = 10
+# How often (in seconds) the site-wide statistics snapshot is recomputed by Celery beat
+DMOJ_STATS_SNAPSHOT_INTERVAL = 900
 DMOJ_SUBMISSIONS_REJUDGE_LIMIT = 10
 # Maximum number of submissions a single user can queue without the `spam_submission` permission
 DMOJ_SUBMISSION_LIMIT = 2
@@ -96,10 +98,35 @@ DMOJ_USER_MAX_ORGANIZATION_COUNT = 3
 DMOJ_USER_DATA_DOWNLOAD = False
 DMOJ_USER_DATA_CACHE = ""
 DMOJ_USER_DATA_DOWNLOAD_RATELIMIT = datetime.timedelta(days=1)
+# Threads used to hash the passwords of accounts created in bulk; None picks a default from the CPU count
+DMOJ_PASSWORD_HASH_THREADS = None
+# Where the passwords of accounts created in bulk wait to be downloaded once; must be shared with the Celery workers
+DMOJ_CREATED_USERS_DIR = tempfile.gettempdir()
+# Longest time, in seconds, that a user's current contest participation is trusted without checking it again
+DMOJ_CONTEST_CHECK_CACHE_TIMEOUT = 60
+# Seconds each worker thread reuses its copy of MiscConfig and the navigation bar before checking for changes
+DMOJ_SITE_CONFIG_REVALIDATE = 5
+# Loggers whose records are written by a background thread instead of the thread that logs them, e.g.
+# ["judge.request", "judge.bridge", "judge.json.bridge"]
+DMOJ_QUEUED_LOGGERS = []
+# Options for judge.utils.queue_logging.BatchingQueueHandler: maxsize, batch_size and flush_interval
+DMOJ_LOG_QUEUE_OPTIONS = {}
+# Where uploaded contest data archives wait to be imported; must be shared with the Celery workers
+DMOJ_CONTEST_DATA_UPLOAD_DIR = tempfile.gettempdir()
 DMOJ_COMMENT_VOTE_HIDE_THRESHOLD = -5
 PDF_PROBLEM_CACHE = ""
 PDF_CONTEST_CACHE = ""
 PDF_PROBLEM_TEMP_DIR = tempfile.gettempdir()
+# PDFs are rendered by Celery; seconds before an in-flight render may be queued again, and how long a failed
+# render's log is served before retrying
+DMOJ_PDF_RENDER_LOCK_TIMEOUT = 300
+DMOJ_PDF_RENDER_FAILURE_TIMEOUT = 60
+# Seconds between refreshes of the page shown while a PDF is rendering
+DMOJ_PDF_RENDER_REFRESH = 5
+# PDFs of contests starting within DMOJ_PDF_PREWARM_WINDOW seconds are rendered ahead of time, checked every
+# DMOJ_PDF_PREWARM_INTERVAL seconds
+DMOJ_PDF_PREWARM_WINDOW = 1800
+DMOJ_PDF_PREWARM_INTERVAL = 60
 DMOJ_STATS_SUBMISSION_RESULT_COLORS = {
     "TLE": "#a3bcbd",
     "AC": "#00a92a",
@@ -124,6 +151,10 @@ MATHOID_CACHE_URL = False
 TEXOID_GZIP = False
 TEXOID_META_CACHE = "default"
 TEXOID_META_CACHE_TTL = 86400
+# Seconds a formula stays queued for rendering before a page view may queue it again
+TEXOID_RENDER_LOCK_TIMEOUT = 300
+# Seconds a page fragment rendered with formula placeholders stays cached
+TEXOID_PENDING_CACHE_TIMEOUT = 30
 DMOJ_NEWSLETTER_ID_ON_REGISTER = None
 
 BAD_MAIL_PROVIDERS = ()
@@ -154,6 +185,17 @@ USE_SELENIUM = False
 SELENIUM_CUSTOM_CHROME_PATH = None
 SELENIUM_CHROMEDRIVER_PATH = "chromedriver"
 
+# Unix socket of the PDF render daemon (`manage.py runpdfd`); when set, it is used instead of the makers above
+PDF_RENDER_DAEMON_SOCKET = ""
+# Seconds a client waits for its render, once the daemon has started it
+PDF_RENDER_DAEMON_TIMEOUT = 60
+# Seconds a job waits for one of the daemon's browsers to be free before its render fails
+PDF_RENDER_DAEMON_QUEUE_TIMEOUT = 60
+# Browsers the daemon keeps warm; each renders one page at a time
+PDF_RENDER_DAEMON_BROWSERS = 2
+# Pages the daemon renders before restarting its browser
+PDF_RENDER_DAEMON_MAX_PAGES = 200
+
 PYGMENT_THEME = "pygment-github.css"
 INLINE_JQUERY = True
 INLINE_FONTAWESOME = True
@@ -207,6 +249,7 @@ INSTALLED_APPS = (
 MIDDLEWARE = (
     "django.middleware.security.SecurityMiddleware",
     "judge.middleware.RateLimitMiddleware",
+    "judge.middleware.ReplicaPinningMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.locale.LocaleMiddleware",
     "django.middleware.cache.UpdateCacheMiddleware",
@@ -296,6 +339,7 @@ TEMPLATES = [
                 "compressor.contrib.jinja2ext.CompressorExtension",
                 "judge.jinja2.CustomExtension",
                 "judge.jinja2.spaceless.SpacelessExtension",
+                "judge.jinja2.markdown.texoid.TexoidCacheExtension",
             ],
         },
     },
@@ -565,6 +609,15 @@ DATABASES = {
     },
 }
 
+# Reads are spread over these database aliases; writes, and reads that must see them, go to "default"
+DATABASE_READ_REPLICAS = []
+DATABASE_ROUTERS = ["judge.database_router.MasterSlaveRouter"]
+# Seconds a client reads from the primary after writing, covering the replicas' lag
+DMOJ_REPLICA_PIN_SECONDS = 5
+
+# Skips tests tagged "slow" unless they are asked for with --tag slow
+TEST_RUNNER = "judge.test_runner.TestRunner"
+
 ENABLE_FTS = False
 
 # Bridged configuration
@@ -639,6 +692,11 @@ SOCIAL_AUTH_SLUGIFY_FUNCTION = "judge.social_auth.slugify_username"
 JUDGE_AMQP_PATH = None
 
 MOSS_API_KEY = None
+# Plagiarism checker used by run_moss: judge.utils.moss.RemoteMossBackend submits to the MOSS service, while
+# judge.utils.moss.LocalMossBackend compares sources on the worker itself
+MOSS_BACKEND = 'judge.utils.moss.RemoteMossBackend'
+# Number of (problem, language) pairs checked at once
+MOSS_PARALLELISM = 4
 
 CELERY_WORKER_HIJACK_ROOT_LOGGER = False
 
@@ -652,6 +710,8 @@ RATE_LIMIT = {
     "TRUSTED_IP_HEADER": "CF-Connecting-IP",  # hoặc "X-Forwarded-For" / None
     "EXEMPT_PATHS": ["/healthz", "/static/", "/media/"],  # bỏ qua những path này
     "WHITELIST_IPS": ["127.0.0.1"],  # IP bỏ qua limit
+    # Path prefixes with their own (MAX_HITS, WINDOW_SECONDS), e.g. {"/api/": (30, 10)}
+    "ROUTES": {},
 }
 
 try:
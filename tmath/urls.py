@@ -235,7 +235,7 @@ urlpatterns = [
     path('contests/', paged_list_view(contests.ContestList, 'contest_list')),
     path('contests1/', paged_list_view(contests.ContestList, 'contest_new_list', 'contest/new_list.html')),
     # path('contests/create', contests.ContestAdd.as_view(), name='contest_add'),
-    path('contests/<slug:year>/<slug:month>/', contests.ContestCalendar.as_view(), name='contest_calendar'),
+    path('contests/<slug:year>/<slug:month>/', contests.CachedContestCalendar.as_view(), name='contest_calendar'),
     path('contests/tag/<slug:name>', include([
         path('', contests.ContestTagDetail.as_view(), name='contest_tag'),
         path('/ajax', contests.ContestTagDetailAjax.as_view(), name='contest_tag_ajax'),
@@ -246,6 +246,7 @@ urlpatterns = [
         path('/excel', contests.exportExcel, name="export_excel"),
         path('/moss', contests.ContestMossView.as_view(), name='contest_moss'),
         path('/moss/delete', contests.ContestMossDelete.as_view(), name='contest_moss_delete'),
+        path('/moss/<int:result>', contests.ContestMossReport.as_view(), name='contest_moss_report'),
         path('/clone', contests.ContestClone.as_view(), name='contest_clone'),
         path('/ranking/', contests.ContestRanking.as_view(), name='contest_ranking'),
         path('/ranking/ajax', contests.contest_ranking_ajax, name='contest_ranking_ajax'),